@@ -1,10 +1,24 @@
 import pandas as pd
 import json
+import logging
 from datetime import datetime, timedelta
 from URLtextProcessor import URLTextProcessor
-from gdeltdoc import GdeltDoc, Filters
+from gdeltdoc import GdeltDoc, DiskCache, RateLimiter, RequestStats, plan_queries
+from gdeltdoc.planner import load_country_names
+from scraping.failures import DEFAULT_FAILURE_REGISTRY
+from scraping.journal import RunJournal
+from scraping.seen import DEFAULT_SEEN_INDEX
+from scraping.store import ARTICLE_COLUMNS
+from scraping.urls import canonical_url
+
+# Riepiloghi per batch a livello INFO; DEBUG mostra anche i messaggi per singolo URL
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
 checkpoint_file = "raw_text_data/checkpoint.json"
+# Journal delle query completate e degli articoli salvati, per riprendere un run interrotto a metà finestra
+journal_file = "raw_text_data/journal.sqlite"
+cache_file = "gdelt_cache/responses.sqlite"
+countries_file = "1_Filters_list/countries.txt"
 
 countries = ['US', 'UK', 'IT']
 '''themes = [
@@ -19,17 +33,17 @@ countries = ['US', 'UK', 'IT']
 themes = ["ELECTION", "ELECTION_FRAUD","GOV_REFORM","GENERAL_GOVERNMENT","TAX_FNCACT_POLITICIANS"]
 
 tone = [">0", ">5", ">10", ">15", ">20", ">25"]
+# Articoli tenuti per bucket (paese, tema), nell'ordine di `order`, come il num_records del ciclo originale:
+# le query del piano ne uniscono più d'uno, quindi il limite si applica dopo averli riassegnati con assign_buckets
 limit = 100
 mode = 'artlist'
 order = 'toneabsasc'
-
-#read the checkpoint file
-with open(checkpoint_file, "r") as f:
-    data = json.load(f)
-    
-#YYYYMMDDHHMMSS
-start_timestamp = data.get("timeend") if data else (datetime.now() - timedelta(days=1)).strftime("%Y%m%d%H%M%S")
-end_timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+max_workers = 4
+# Download degli articoli: limite globale e tetto per singolo sito (la concorrenza di ogni sito è adattiva)
+fetch_concurrency = 64
+fetch_per_host = 4
+# Cache dell'HTML grezzo, per ripetere l'estrazione senza scaricare di nuovo (None per disattivarla)
+html_cache_file = "raw_text_data/html_cache.sqlite"
 
 def generate_timestamps(start: str, end: str):
     timestamps = []
@@ -42,44 +56,108 @@ def generate_timestamps(start: str, end: str):
     
     return timestamps
 
-sequence = generate_timestamps(start_timestamp, end_timestamp)
-print(f"Expected API calls: {len(sequence) * len(countries) * len(themes) * len(tone)}")
-print(f"Maximum documents if each result is unique and limit is {limit}: {len(sequence) * len(countries) * len(themes) * len(tone) * limit}")
-
-gd = GdeltDoc()
-
-#Loop
-for i in range(len(sequence) - 1):
-    timestart = sequence[i]
-    timeend = sequence[i + 1]
-    chunck=pd.DataFrame()
-    for country in countries:
-        for theme in themes:
-            for tone_value in tone:
-                
-                filters = Filters(
-                    start_date=timestart,
-                    end_date=timeend,
-                    country=country,
-                    theme=theme,
-                    num_records=limit,
-                    tone_abs=tone_value,
-                    mode=mode,
-                    sort=order
-                )
-                
-                articles = gd.article_search(filters)
-                if not articles.empty:
-                    link_extractor = URLTextProcessor()
-                    extracted_content = pd.DataFrame(link_extractor.process_links_save_text_save_link(articles))
-                    
-                    chunck=pd.concat([chunck, extracted_content], ignore_index=True)
-                    chunck.drop_duplicates(subset=["url"]).drop_duplicates(subset=["title"])
-
-    with open("raw_text_data/checkpoint.json", "w") as f:
-        json.dump({"timestart": timestart,"timeend": timeend}, f, indent=4)
-    print(f"Checkpoint reached: {timestart} - {timeend} completed.")
-    chunck.to_json(f"raw_text_data/{timestart}_{timeend}.json", orient='records', lines=False, force_ascii=False, indent=4)
-
-
-print("Processo completato e dati salvati con successo!")
+
+def main():
+    #read the checkpoint file
+    with open(checkpoint_file, "r") as f:
+        data = json.load(f)
+        
+    #YYYYMMDDHHMMSS
+    start_timestamp = data.get("timeend") if data else (datetime.now() - timedelta(days=1)).strftime("%Y%m%d%H%M%S")
+    end_timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+
+    sequence = generate_timestamps(start_timestamp, end_timestamp)
+    windows = list(zip(sequence[:-1], sequence[1:]))
+
+    # Paesi e temi uniti in query OR, scala dei toni ridotta alla soglia più larga
+    plan = plan_queries(windows, countries, themes, tone, mode=mode, sort=order)
+    # Le finestre più piene vengono divise ancora da article_search_all: le chiamate effettive possono essere di più
+    print(f"Query plan: {plan.summary()}")
+
+    request_stats = RequestStats()
+    gd = GdeltDoc(cache=DiskCache(cache_file), rate_limiter=RateLimiter(), observers=[request_stats], output="compact",
+                  url_key=canonical_url)
+    # Un solo processore per tutto il run: sessione HTTP e pool di download condivisi tra le query.
+    # Gli URL già scaricati vengono riletti dall'archivio: dopo un'interruzione anche gli articoli salvati
+    # ma non ancora registrati nel journal finiscono nel file della finestra
+    link_extractor = URLTextProcessor(max_concurrency=fetch_concurrency, max_per_host=fetch_per_host,
+                                      html_cache=html_cache_file, seen_index=DEFAULT_SEEN_INDEX, reuse_seen=True,
+                                      failures=DEFAULT_FAILURE_REGISTRY)
+
+    journal = RunJournal(journal_file)
+    # sourcecountry contiene il nome del paese; gli Stati Uniti non sono nella lista dei paesi europei
+    country_names = {**load_country_names(countries_file), "US": "United States"}
+
+    #Loop
+    for (timestart, timeend), planned in plan.by_window().items():
+        # Solo le unità (finestra, paese, tema, tono) non completate, anche se il run si è interrotto a metà finestra
+        pending = journal.pending(planned)
+        if len(pending) < len(planned):
+            print(f"Resuming {timestart} - {timeend}: {len(planned) - len(pending)} of {len(planned)} queries already completed.")
+        filters_list = [query.filters for query in pending]
+        failed = 0
+
+        # Le query girano in parallelo; ogni risultato arriva già senza gli URL visti nella finestra
+        for index, articles in gd.iter_article_search_many(filters_list, max_workers=max_workers, all_pages=True):
+            query = pending[index]
+            # Ogni articolo torna al suo bucket (paese, tema, tono) e ogni bucket tiene al più `limit` articoli
+            articles = query.assign_buckets(articles, country_names, limit=limit)
+            # URL già elaborati per la query prima di un'interruzione: salvati, falliti, vuoti o saltati
+            done = {link_extractor.url_key(url) for url in journal.fetched_urls(query)}
+            todo = articles[~articles["url"].map(link_extractor.url_key).isin(done)].drop_duplicates(subset=["title"])
+            # Gli articoli vengono salvati a blocchi e registrati nel journal solo dopo il salvataggio;
+            # gli URL senza articolo vengono registrati subito con il loro esito
+            extracted = link_extractor.stream_articles(
+                todo, save=True,
+                on_saved=lambda batch, query=query: journal.record_articles(query, batch),
+                on_outcome=lambda url, outcome, query=query: journal.record_outcomes(query, [(url, outcome)]),
+            )
+            try:
+                new_articles = sum(1 for _ in extracted)
+            except Exception as e:
+                # Un blocco non salvato: la query resta da completare e verrà ripresa al prossimo run
+                failed += 1
+                print(f"Query {index + 1}/{len(pending)} not completed, articles could not be saved: {e}")
+                continue
+            print(f"Query {index + 1}/{len(pending)}: {new_articles} new articles from {len(todo)} URLs "
+                  f"({len(articles) - len(todo)} skipped).")
+            journal.finish(query, len(articles))
+
+        if failed:
+            # Il checkpoint non avanza oltre una finestra incompleta
+            print(f"Stopping at {timestart} - {timeend}: {failed} queries not completed, rerun to resume.")
+            break
+
+        # Il file della finestra raccoglie gli articoli di tutte le sue query, anche di quelle completate prima di un riavvio
+        window_urls = journal.window_urls((timestart, timeend))
+        saved = link_extractor.store.get_many(window_urls)
+        chunck = pd.DataFrame([saved[url] for url in window_urls if url in saved], columns=ARTICLE_COLUMNS)
+        # Stesso articolo sotto URL diversi (mobile, AMP, tracciamento): conta la chiave canonica
+        chunck = chunck[~chunck["url"].map(link_extractor.url_key).duplicated()].drop_duplicates(subset=["title"])
+
+        with open("raw_text_data/checkpoint.json", "w") as f:
+            json.dump({"timestart": timestart,"timeend": timeend}, f, indent=4)
+        print(f"Checkpoint reached: {timestart} - {timeend} completed.")
+        chunck.to_json(f"raw_text_data/{timestart}_{timeend}.json", orient='records', lines=False, force_ascii=False, indent=4)
+
+
+    # Nuovi tentativi per gli URL con errori transitori già scaduti, dopo il flusso principale
+    link_extractor.retry_failed()
+    print(f"Download evitati (URL già scaricati): {link_extractor.skipped_fetches}")
+    print(f"Registro degli errori: {link_extractor.failures.stats()}")
+    print(f"Journal: {journal.stats()}")
+    journal.close()
+    print(link_extractor.scheduler.report())
+    link_extractor.scheduler.dump("raw_text_data/domain_stats.json")
+    print(link_extractor.metrics.report())
+    link_extractor.metrics.dump("raw_text_data/scrape_metrics.json")
+    link_extractor.close()
+    print(f"Rate limiter: {gd.rate_limiter.stats()}")
+    print(request_stats.report())
+    request_stats.dump("raw_text_data/request_stats.json")
+    print("Processo completato e dati salvati con successo!")
+
+
+if __name__ == "__main__":
+    # Il pool di estrazione avvia i processi con forkserver/spawn, che reimportano questo modulo
+    main()
@@ -1,5 +1,6 @@
 import streamlit as st
-from gdeltdoc import GdeltDoc, Filters, near, repeat
+from gdeltdoc import GdeltDoc, Filters, DiskCache, RateLimiter, near, repeat
+from gdeltdoc.themes import ThemeRegistry
 import pandas as pd
 import datetime
 import json
@@ -7,9 +8,17 @@ import os
 from urllib.parse import urlparse
 from datetime import datetime, timedelta
 from URLtextProcessor import URLTextProcessor # Assicurati che questa classe esista
+from scraping.failures import DEFAULT_FAILURE_REGISTRY
+from scraping.seen import DEFAULT_SEEN_INDEX
+from scraping.urls import canonical_url
 from keyword_extractor import get_keywords_from_article # Importa il nuovo modulo
 
 # --- Funzioni di utilità ---
+@st.cache_resource
+def get_gdelt_client():
+    # Un solo client per processo: connessioni persistenti e cache delle risposte condivisa tra i rerun
+    return GdeltDoc(cache=DiskCache("gdelt_cache/responses.sqlite"), rate_limiter=RateLimiter())
+
 def load_json_list(filename):
     try:
         with open(filename, 'r', encoding='utf-8') as file:
@@ -17,12 +26,19 @@ def load_json_list(filename):
     except (FileNotFoundError, json.JSONDecodeError):
         return []
 
-def load_tsv_first_column(filename):
+@st.cache_resource
+def get_url_processor():
+    # Un solo processore per processo per gli URL singoli: sessione HTTP, robots.txt e archivio condivisi
+    # tra i click. L'estrazione gira nel processo della dashboard, senza pool di processi da avviare
+    return URLTextProcessor(seen_index=DEFAULT_SEEN_INDEX, extract_workers=0)
+
+@st.cache_resource
+def load_theme_registry(filename):
+    # Temi GKG ordinati con indice precompilato (.idx), caricati una volta per processo
     try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            return [line.split('\t')[0].strip() for line in file if line.strip()]
+        return ThemeRegistry.load(filename)
     except FileNotFoundError:
-        return []
+        return None
 
 def save_search_to_log(search_details):
     log_dir = "search_logs"
@@ -112,8 +128,7 @@ def similarity_search_page():
         if input_url:
             with st.spinner("Estrazione del testo e delle keyword in corso..."):
                 try:
-                    processor = URLTextProcessor() 
-                    article_data = processor.fetch_and_process_single_url(input_url)
+                    article_data = get_url_processor().fetch_and_process_single_url(input_url)
                     
                     if article_data and article_data.get('text'): # Verifica che il testo sia stato estratto
                         # Imposta la lingua del dizionario con quella selezionata dall'utente
@@ -192,7 +207,7 @@ def similarity_search_page():
                         country=st.session_state.similarity_article_data['lang'] 
                     )
 
-                    gd = GdeltDoc()
+                    gd = get_gdelt_client()
                     similar_articles = gd.article_search(filters)
 
                     if not similar_articles.empty:
@@ -201,7 +216,7 @@ def similarity_search_page():
                         if input_url:
                             input_domain = extract_domain(input_url)
                             similar_articles_filtered = similar_articles[
-                                (similar_articles['url'] != input_url) &
+                                (similar_articles['url'].map(canonical_url) != canonical_url(input_url)) &
                                 (similar_articles['domain'] != input_domain)
                             ]
                         else:
@@ -251,8 +266,12 @@ def similarity_search_page():
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 memory_file_path_sim = os.path.join(raw_text_data_dir, f"sim_search_articles_{timestamp}.json")
                 
-                link_extractor = URLTextProcessor(memory_file=memory_file_path_sim)
-                scraped_articles = link_extractor.process_links_save_text_save_link(st.session_state.similarity_search_results)
+                # Poche decine di articoli per click: l'estrazione sui thread evita di avviare un pool di processi ogni volta
+                with URLTextProcessor(memory_file=memory_file_path_sim, seen_index=DEFAULT_SEEN_INDEX, reuse_seen=True,
+                                      failures=DEFAULT_FAILURE_REGISTRY, extract_workers=0) as link_extractor:
+                    scraped_articles = link_extractor.process_links_save_text_save_link(st.session_state.similarity_search_results)
+                    # Gli articoli sono nell'archivio SQLite; il JSON della ricerca resta per chi lo legge
+                    link_extractor.store.export_json(memory_file_path_sim)
                 
                 # Filtra gli articoli che hanno effettivamente estratto del testo
                 st.session_state.similarity_extracted_articles = [
@@ -383,7 +402,7 @@ def display_home_page():
 
     if st.sidebar.button("Carica dati dai file"):
         st.session_state.country_list = load_json_list(country_file)
-        st.session_state.themes_list = load_tsv_first_column(theme_file)
+        st.session_state.theme_registry = load_theme_registry(theme_file)
         st.session_state.domain_list = load_json_list(domain_file)
         st.sidebar.success("Filtri caricati correttamente")
     
@@ -453,7 +472,11 @@ def display_home_page():
     st.session_state.countries = st.sidebar.multiselect("Seleziona i paesi", st.session_state.country_list, default=st.session_state.countries)
     
     st.sidebar.subheader("Temi")
-    st.session_state.selected_themes = st.sidebar.multiselect("Seleziona i temi", st.session_state.themes_list, default=st.session_state.selected_themes)
+    # Il multiselect mostra solo i temi col prefisso cercato, ordinati per numero di articoli, invece di tutti i ~59k temi
+    theme_prefix = st.sidebar.text_input("Cerca temi per prefisso", help="es. WB_ o TAX_FNCACT_; vuoto per i temi più frequenti")
+    theme_options = st.session_state.theme_registry.search(theme_prefix, limit=500) if st.session_state.theme_registry else []
+    theme_options = list(dict.fromkeys(st.session_state.selected_themes + theme_options))
+    st.session_state.selected_themes = st.sidebar.multiselect("Seleziona i temi", theme_options, default=st.session_state.selected_themes)
     
 
     # HOME PAGE
@@ -568,7 +591,7 @@ def display_home_page():
         st.session_state.query_string = str(filters.query_string)
         
         # Perform the search
-        gd = GdeltDoc()
+        gd = get_gdelt_client()
         if st.session_state.mode == "artlist":
             articles = gd.article_search(filters)
         else:
@@ -657,8 +680,11 @@ def display_home_page():
                 else:
                     memory_file_path = os.path.join(raw_text_data_dir, f"user_search_{st.session_state.timespan}.json")
 
-                link_extractor = URLTextProcessor(memory_file=memory_file_path)
-                link_extractor.process_links_save_text_save_link(st.session_state.search_results)
+                with URLTextProcessor(memory_file=memory_file_path, seen_index=DEFAULT_SEEN_INDEX, reuse_seen=True,
+                                      failures=DEFAULT_FAILURE_REGISTRY, extract_workers=0) as link_extractor:
+                    link_extractor.process_links_save_text_save_link(st.session_state.search_results)
+                    # L'annotazione qui sotto legge il JSON della ricerca (lista di articoli), esportato dall'archivio
+                    link_extractor.store.export_json(memory_file_path)
                 st.session_state.extracted_file = memory_file_path
                 st.success("Contenuti estratti e salvati con successo!")
 
@@ -840,7 +866,7 @@ def main():
 
     # Inizializza session state variables
     if 'country_list' not in st.session_state: st.session_state.country_list = ['UK','US','IT','DE','FR','JP','CA','AU','GB']
-    if 'themes_list' not in st.session_state: st.session_state.themes_list = []
+    if 'theme_registry' not in st.session_state: st.session_state.theme_registry = None
     if 'keyword_list' not in st.session_state: st.session_state.keyword_list = []
     if 'domain_list' not in st.session_state: st.session_state.domain_list = []
     if 'search_results' not in st.session_state: st.session_state.search_results = None
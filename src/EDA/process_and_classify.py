@@ -1,3 +1,7 @@
+# Da eseguire come modulo dalla cartella src, così il pacchetto scraping è importabile:
+#   cd src && python -m EDA.process_and_classify
+# I percorsi sono relativi alla cartella di questo file, non alla directory corrente.
+
 # --- Import ---
 import os
 import re
@@ -5,18 +9,23 @@ import json
 import spacy
 from typing import List, Dict, Generator, Any
 
+# Stessa chiave canonica usata dallo scraping per deduplicare (versioni mobile, AMP, tracciamento)
+from scraping.urls import canonical_url
+
+EDA_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
 # --- Config: Preprocessing ---
 ALLOWED_LANGUAGES = {'English', 'Italian'}
-INPUT_DIRECTORY = '../raw_text_data'
-OUTPUT_FILE = './articles.jsonl'
-DEDUPLICATED_OUTPUT_FILE = './articles_deduplicated.jsonl'
+INPUT_DIRECTORY = os.path.join(EDA_DIRECTORY, '..', 'raw_text_data')
+OUTPUT_FILE = os.path.join(EDA_DIRECTORY, 'articles.jsonl')
+DEDUPLICATED_OUTPUT_FILE = os.path.join(EDA_DIRECTORY, 'articles_deduplicated.jsonl')
 FILENAME_REGEX = re.compile(r'^\d{14}_\d{14}\.json$')
 
 # --- Config: Classification ---
 THRESHOLD = 20
 OUTPUT_FILES = {
-    'elezioni': "topic/election_articles.jsonl",
-    'vaccini': "topic/vax_articles.jsonl"
+    'elezioni': os.path.join(EDA_DIRECTORY, "topic", "election_articles.jsonl"),
+    'vaccini': os.path.join(EDA_DIRECTORY, "topic", "vax_articles.jsonl")
 }
 LANGUAGES = {'italian', 'english'}
 BAD_DOMAINS = ["https://www.zazoom.it/"]
@@ -110,7 +119,8 @@ def deduplicate_jsonl(input_path: str, output_path: str):
         for line in infile:
             try:
                 entry = json.loads(line)
-                url = entry.get("url")
+                # Chiave canonica: versioni mobile, AMP o con tracciamento dello stesso articolo coincidono
+                url = canonical_url(entry.get("url"))
                 title = entry.get("title")
 
                 # Se già visto l'url o il title, salta
@@ -1,172 +1,649 @@
 import pandas as pd
-import requests
+import asyncio
 import os
-import trafilatura
 import concurrent.futures
-import json
-import traceback # Importa il modulo traceback
+import itertools
+import logging
+import sqlite3
+import threading
+import time
+
+from concurrent.futures.process import BrokenProcessPool
+from scraping.extract import extract_article, extraction_context
+from scraping.failures import EMPTY, FailureRegistry, classify
+from scraping.fetcher import AsyncFetcher, FetchResult
+from scraping.html_cache import HtmlCache
+from scraping.metrics import ScrapeMetrics, error_kind
+from scraping.politeness import DomainScheduler, RobotsCache
+from scraping.seen import SeenIndex
+from scraping.store import ArticleStore, ARTICLE_COLUMNS, store_path_for
+from scraping.urls import canonical_url, duplicated_urls
+
+logger = logging.getLogger(__name__)
+
+# Righe controllate insieme nell'indice degli URL già visti, articoli salvati insieme in streaming
+# ed errori registrati insieme nel registro degli URL falliti
+_SEEN_BATCH = 500
+_SAVE_BATCH = 100
+_FAILURE_BATCH = 100
+
+
+def _batches(iterable, size):
+    """Divide un iterabile in liste di al più `size` elementi, leggendolo man mano."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _exact_url(url):
+    return url
+
+
+def _unique_rows(items, key=_exact_url):
+    """
+    Converte URL e righe in righe con almeno 'url', scartando gli articoli ripetuti: stessa chiave
+    canonica dell'URL o di 'url_mobile' di una riga precedente.
+    """
+    seen = set()
+    for item in items:
+        row = {"url": item} if isinstance(item, str) else item
+        keys = {key(row["url"])}
+        mobile = row.get("url_mobile")
+        if isinstance(mobile, str) and mobile:
+            keys.add(key(mobile))
+        if not seen.isdisjoint(keys):
+            continue
+        seen.update(keys)
+        yield row
+
+
+def _run_coroutine(coro):
+    """Esegue una coroutine da codice sincrono, anche da un thread con un event loop già attivo (es. Jupyter)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
 
 class URLTextProcessor:
     """Classe per la gestione di URL, estrazione di testo, pulizia e salvataggio di link unici."""
 
-    def __init__(self, memory_file="raw_text_data/raw.json"):
+    def __init__(self, memory_file="raw_text_data/raw.json", max_concurrency=64, max_per_host=4, timeout=15,
+                 extract_workers=None, extract_queue_size=32, seen_index=None, reuse_seen=False,
+                 html_cache=None, max_page_bytes=5 * 1024 * 1024, deadline=30, polite=True, metrics=None,
+                 failures=None, url_key=canonical_url):
         """
         Inizializza la classe con il file di memoria.
         
-        :param memory_file: Il nome del file JSON per memorizzare i link salvati.
+        :param memory_file: Il file in cui memorizzare gli articoli salvati. Un nome .json indica l'archivio
+            SQLite con lo stesso nome e estensione .sqlite, in cui il vecchio JSON viene importato.
+        :param max_concurrency: Numero massimo di download contemporanei.
+        :param max_per_host: Numero massimo di download contemporanei verso lo stesso sito. Con `polite`
+            è il tetto della concorrenza adattiva, che parte dalla metà.
+        :param timeout: Timeout delle richieste HTTP, in secondi.
+        :param extract_workers: Processi dedicati all'estrazione con trafilatura (default: numero di core).
+            Con 0 l'estrazione gira sui thread, nel processo corrente.
+        :param extract_queue_size: Pagine scaricate in attesa di estrazione oltre le quali i download si fermano.
+        :param seen_index: Indice degli URL già scaricati, condiviso tra run e applicazioni: un percorso o un
+            `SeenIndex` (es. `scraping.seen.DEFAULT_SEEN_INDEX`), None per disattivarlo. Gli URL presenti
+            non vengono scaricati di nuovo.
+        :param reuse_seen: Se True, per gli URL già scaricati restituisce l'articolo salvato (senza rete)
+            invece di saltarli; se l'articolo non è più disponibile l'URL viene scaricato.
+        :param html_cache: Cache dell'HTML grezzo scaricato: un percorso o un `HtmlCache`, None per disattivarla.
+            Permette di ripetere l'estrazione con `reextract_from_cache` senza scaricare di nuovo le pagine.
+        :param max_page_bytes: Dimensione massima di una pagina: i download più grandi vengono interrotti.
+        :param deadline: Durata massima di un download in secondi, lettura della pagina compresa.
+        :param polite: Se True rispetta robots.txt e crawl-delay dei siti e adatta la concorrenza di ogni
+            sito alle sue risposte (vedi `DomainScheduler`); le statistiche per sito sono in `self.scheduler`.
+        :param metrics: `ScrapeMetrics` in cui registrare contatori, latenze ed errori (default: uno nuovo,
+            in `self.metrics`). I messaggi per singolo URL vanno al logger `URLtextProcessor` a livello DEBUG.
+        :param failures: Registro degli URL falliti: un percorso o un `FailureRegistry` (es.
+            `scraping.failures.DEFAULT_FAILURE_REGISTRY`), None per disattivarlo.
+            Gli URL falliti di recente vengono saltati; quelli con errori transitori si ritentano con `retry_failed`.
+        :param url_key: Funzione che calcola la chiave canonica di un URL (es. un `URLNormalizer` con altre regole),
+            usata per riconoscere lo stesso articolo sotto URL diversi; None per confrontare gli URL esatti.
+            Vale anche per l'indice degli URL visti e il registro degli errori creati dall'istanza.
         """
         self.memory_file = memory_file
         # Assicurati che la directory esista per il file di memoria
         os.makedirs(os.path.dirname(self.memory_file) or '.', exist_ok=True)
+        # Archivio append-only con indice univoco sugli URL e sulle loro chiavi canoniche
+        self.store = ArticleStore(store_path_for(memory_file), legacy_json=memory_file, url_key=url_key)
+        self.url_key = url_key if url_key is not None else _exact_url
+        self._owns_seen_index = isinstance(seen_index, str)
+        self.seen_index = SeenIndex(seen_index, url_key=url_key) if isinstance(seen_index, str) else seen_index
+        self.reuse_seen = reuse_seen
+        self._owns_failures = isinstance(failures, str)
+        self.failures = FailureRegistry(failures, url_key=url_key) if isinstance(failures, str) else failures
+        # Download evitati grazie all'indice degli URL già visti, per tutta la vita dell'istanza
+        self.skipped_fetches = 0
+        self._owns_html_cache = isinstance(html_cache, str)
+        self.html_cache = HtmlCache(html_cache) if isinstance(html_cache, str) else html_cache
+        # Code per dominio, con regole robots.txt e concorrenza adattiva
+        self.scheduler = DomainScheduler(max_per_host, robots=RobotsCache(timeout=timeout), adaptive=True) if polite \
+            else DomainScheduler(max_per_host, adaptive=False)
+        # Sessione HTTP e pool di thread condivisi da tutte le chiamate dell'istanza
+        self.fetcher = AsyncFetcher(max_concurrency=max_concurrency, max_per_host=max_per_host, timeout=timeout,
+                                    html_cache=self.html_cache, max_bytes=max_page_bytes, deadline=deadline,
+                                    scheduler=self.scheduler)
+        self.extract_workers = (os.cpu_count() or 1) if extract_workers is None else extract_workers
+        self.extract_queue_size = extract_queue_size
+        self.metrics = metrics if metrics is not None else ScrapeMetrics()
+        # Pool di processi per l'estrazione, creato al primo utilizzo
+        self._extract_pool = None
+
+    def close(self):
+        """Chiude le connessioni e il pool di thread del fetcher, il pool di estrazione e l'archivio."""
+        self.fetcher.close()
+        self.scheduler.close()
+        self.store.close()
+        if self._owns_seen_index:
+            self.seen_index.close()
+        if self._owns_html_cache:
+            self.html_cache.close()
+        if self._owns_failures:
+            self.failures.close()
+        if self._extract_pool is not None:
+            self._extract_pool.shutdown(wait=True)
+            self._extract_pool = None
+
+    def _extraction_executor(self):
+        """Restituisce il pool di processi per l'estrazione, None per usare i thread dell'event loop."""
+        if self.extract_workers < 1:
+            return None
+        if self._extract_pool is None:
+            self._extract_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.extract_workers, mp_context=extraction_context()
+            )
+        return self._extract_pool
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
 
     def _load_saved_links(self):
-        """Carica gli URL già salvati nel file JSON utilizzando pandas, se esiste."""
-        if os.path.exists(self.memory_file):
-            try:
-                df = pd.read_json(self.memory_file, encoding="utf-8")
-                return df if not df.empty else pd.DataFrame(columns=['url', 'title', 'language', 'text'])
-            except (ValueError, json.JSONDecodeError) as e:
-                print(f"ERRORE: Impossibile caricare {self.memory_file}: {e}")
-                traceback.print_exc() # Stampa lo stack trace completo
-                return pd.DataFrame(columns=['url', 'title', 'language', 'text'])
-        return pd.DataFrame(columns=['url', 'title', 'language', 'text'])
-
-    def _save_links(self, new_links):
-        """Salva nuovi URL e titoli nel file JSON utilizzando pandas."""
+        """Carica gli articoli già salvati nell'archivio come DataFrame."""
+        return pd.DataFrame(self.store.articles(), columns=ARTICLE_COLUMNS)
+
+    def _save_links(self, new_links, replace=False, on_saved=None, raise_errors=False):
+        """
+        Aggiunge i nuovi articoli all'archivio, scartando le altre versioni (stessa chiave canonica)
+        di un articolo del batch o già salvato, anche in un batch o run precedente.
+
+        :param replace: Se True aggiorna gli articoli già salvati invece di scartarli.
+        :param on_saved: Funzione chiamata con gli articoli del batch, solo se il salvataggio è riuscito.
+        :param raise_errors: Se True un errore di salvataggio, dopo essere stato registrato, viene propagato.
+        :return: Il numero di articoli effettivamente aggiunti (o aggiornati).
+        """
         if not new_links:
-            return
+            return 0
+        duplicated = duplicated_urls((link["url"] for link in new_links), key=self.url_key)
+        new_links = [link for link, dup in zip(new_links, duplicated) if not dup]
 
-        saved_links_df = self._load_saved_links()
-        new_links_df = pd.DataFrame(new_links)
-        
-        combined_df = pd.concat([saved_links_df, new_links_df], ignore_index=True)
-        final_df = combined_df.drop_duplicates(subset=["url"], keep="first")
-        
-        os.makedirs(os.path.dirname(self.memory_file) or '.', exist_ok=True)
+        start = time.perf_counter()
         try:
-            final_df.to_json(self.memory_file, orient='records', lines=False, force_ascii=False, indent=4)
+            saved = self.store.add(new_links, replace=replace)
+            if self.seen_index is not None:
+                self.seen_index.add((link["url"] for link in new_links), self.store.path)
         except Exception as e:
-            print(f"ERRORE: Impossibile salvare i link in {self.memory_file}: {e}")
-            traceback.print_exc() # Stampa lo stack trace completo
+            self.metrics.count("save_errors")
+            self.metrics.error("save", type(e).__name__, self.store.path, str(e), exc=e)
+            logger.error("Impossibile salvare i link in %s: %s", self.store.path, e, exc_info=True,
+                         extra={"event": "save_error"})
+            if raise_errors:
+                raise
+            return 0
+        self.metrics.observe("save", time.perf_counter() - start)
+        self.metrics.count("saved", saved)
+        if on_saved is not None:
+            on_saved(new_links)
+        return saved
+
+    def _record_fetch(self, result):
+        """Registra nelle metriche l'esito di un download."""
+        self.metrics.observe("fetch", result.elapsed)
+        if result.ok:
+            self.metrics.count("fetched")
+            if result.status_code == 304:
+                self.metrics.count("not_modified")
+            logger.debug("HTML scaricato con successo da: %s", result.url)
+        else:
+            self.metrics.count("fetch_errors")
+            self.metrics.error("fetch", error_kind(result), result.url, result.error)
+            logger.debug("Errore HTTP: %s per URL: %s", result.error, result.url)
 
 
     def _fetch_text_from_url(self, url):
-        """Effettua una richiesta HTTP."""
-        try:
-            response = requests.get(url, timeout=15) # Aumentato il timeout a 15 secondi
-            response.raise_for_status() # Lancia un'eccezione per codici di stato HTTP errati
-            print(f"DEBUG: HTML scaricato con successo da: {url}")
-            return response.text
-        except requests.exceptions.Timeout as e:
-            print(f'ERRORE HTTP: Timeout raggiunto per URL: {url} - {e}')
-            traceback.print_exc() # Stampa lo stack trace completo
-            return None
-        except requests.exceptions.RequestException as e:
-            print(f'ERRORE HTTP: Richiesta fallita per URL: {url} - {e}')
-            traceback.print_exc() # Stampa lo stack trace completo
-            return None
-        except Exception as e:
-            print(f'ERRORE GENERICO in _fetch_text_from_url per URL: {url} - {e}')
-            traceback.print_exc() # Stampa lo stack trace completo
-            return None
+        """Effettua una richiesta HTTP con la sessione condivisa del fetcher."""
+        result = self.fetcher.fetch_sync(url)
+        self._record_fetch(result)
+        return result.html
 
 
     def _clean_text_and_extract_metadata(self, raw_html, url):
         """
         Utilizza trafilatura per pulire il testo estratto e recuperare metadati come titolo e lingua.
         """
-        if not raw_html:
-            print(f"DEBUG: Nessun HTML grezzo fornito per l'URL: {url}")
-            return None, None, None # testo, titolo, lingua
+        return extract_article(raw_html, url)
 
-        try:
-            extracted = trafilatura.extract(
-                raw_html,
-                url=url,
-                include_links=False,
-                include_comments=False,
-                favor_precision=True,
-                output_format="json"
-            )
-            
-            if extracted:
-                try:
-                    data = json.loads(extracted)
-                    text = data.get('text')
-                    title = data.get('title')
-                    language = data.get('language')
-                    print(f"DEBUG: Trafilatura ha estratto testo, titolo e lingua per {url}")
-                    return text, title, language
-                except json.JSONDecodeError as e:
-                    print(f"ERRORE JSON: Trafilatura ha restituito un JSON non valido per {url}. Errore: {e}")
-                    print(f"DEBUG: Output RAW di trafilatura (truncated): {extracted[:500]}...") # Stampa parte dell'output JSON
-                    traceback.print_exc()
-                    # Fallback a estrazione testo semplice se JSON decoding fallisce
-                    text_fallback = trafilatura.extract(raw_html, include_links=False, include_comments=False, favor_precision=True)
-                    return text_fallback, None, None 
-            else:
-                print(f"AVVISO: Trafilatura non ha estratto alcun contenuto per l'URL: {url}")
-                return None, None, None
-        except Exception as e:
-            print(f"ERRORE TRAFILATURA: Eccezione durante l'estrazione con Trafilatura per URL: {url} - {e}")
-            traceback.print_exc()
-            return None, None, None
 
+    def _make_entry(self, row, text, extracted_title, extracted_language):
+        """Costruisce l'articolo salvato a partire dalla riga GDELT e dai dati estratti, None se manca il testo."""
+        url = row["url"]
+        final_title = extracted_title if extracted_title else row.get("title")
+        final_language = (extracted_language if extracted_language else row.get("language") or 'en').lower()
+
+        if text: # Modifica: Rimuovi la condizione 'and final_title'
+            logger.debug("Estrazione testo riuscita per URL: %s", url)
+            return {"url": url, "title": final_title, "language": final_language, "text": text}
+        else:
+            logger.debug("Fallita estrazione testo per URL: %s", url)
+            return None
+
+    def _load_seen_articles(self, seen):
+        """
+        Rilegge dagli archivi gli articoli degli URL già scaricati, cercandoli per chiave canonica:
+        l'indice riconosce come già visto anche un'altra versione dell'URL salvato.
+
+        :param seen: Dizionario {url: archivio} restituito da `SeenIndex.lookup`.
+        :return: Un dizionario {url: articolo} con gli articoli ritrovati, che conservano l'URL salvato.
+        """
+        by_store = {}
+        for url, store_path in seen.items():
+            if store_path:
+                by_store.setdefault(store_path, []).append(url)
+
+        articles = {}
+        for store_path, urls in by_store.items():
+            if os.path.abspath(store_path) == os.path.abspath(self.store.path):
+                articles.update(self.store.find_many(urls))
+            elif os.path.exists(store_path):
+                with ArticleStore(store_path, url_key=self.url_key) as store:
+                    articles.update(store.find_many(urls))
+        return articles
+
+    def _split_seen(self, rows):
+        """
+        Controlla nell'indice, prima di qualsiasi richiesta di rete, gli URL già scaricati.
+
+        :return: Le righe da scaricare e gli articoli già salvati da riutilizzare (con `reuse_seen`).
+        """
+        if self.seen_index is None or not rows:
+            return rows, []
+
+        seen = self.seen_index.lookup(row["url"] for row in rows)
+        if not seen:
+            return rows, []
+
+        reused = self._load_seen_articles(seen) if self.reuse_seen else {}
+        to_fetch = [row for row in rows if row["url"] not in seen or (self.reuse_seen and row["url"] not in reused)]
+        skipped = len(rows) - len(to_fetch)
+        self.skipped_fetches += skipped
+        self.metrics.count("skipped_seen", skipped)
+        self.metrics.count("reused", len(reused))
+        logger.info("Saltati %d URL già scaricati (%d riletti dall'archivio).", skipped, len(reused))
+        return to_fetch, list(reused.values())
+
+    def _skip_failed(self, rows):
+        """
+        Scarta, prima di qualsiasi richiesta di rete, gli URL falliti di recente: in attesa del prossimo
+        tentativo, con errore permanente o di un dominio escluso.
+        """
+        if self.failures is None or not rows:
+            return rows
+
+        blocked = self.failures.blocked(row["url"] for row in rows)
+        if not blocked:
+            return rows
+
+        to_fetch = [row for row in rows if row["url"] not in blocked]
+        self.metrics.count("skipped_failed", len(rows) - len(to_fetch))
+        logger.info("Saltati %d URL falliti in precedenza.", len(rows) - len(to_fetch))
+        return to_fetch
+
+    def _record_outcomes(self, outcomes):
+        """
+        Salva un batch di esiti nel registro degli URL falliti, senza interrompere l'elaborazione.
+
+        :param outcomes: Tuple (url, classe di errore, motivo), con classe None per gli URL riusciti.
+        """
+        if self.failures is None or not outcomes:
+            return
+        try:
+            # Prima i successi, così la quota di errori di un dominio tiene conto anche di questo batch
+            self.failures.record_successes(url for url, failure_class, _ in outcomes if failure_class is None)
+            self.failures.record_failures(outcome for outcome in outcomes if outcome[1] is not None)
+        except sqlite3.Error as e:
+            logger.warning("Impossibile aggiornare il registro degli errori %s: %s", self.failures.path, e)
 
     def _process_texts(self, df):
         """
-        Estrae e pulisce il testo da una lista di URL parallelizzando le richieste HTTP.
+        Estrae e pulisce il testo da una lista di URL, scaricandoli in parallelo con il motore asincrono.
+        Gli URL già scaricati in precedenza non vengono richiesti di nuovo, così come le versioni
+        mobile, AMP o con parametri di tracciamento di un URL della lista (vedi `url_key`).
+        """
+        aliases = df["url_mobile"] if "url_mobile" in df.columns else None
+        duplicated = pd.Series(duplicated_urls(df["url"], aliases, key=self.url_key), index=df.index, dtype=bool)
+        df = df[~duplicated].drop_duplicates(subset=["title"])
+        rows = [row for _, row in df.iterrows()]
+        return _run_coroutine(self._process_texts_async(rows))
+
+    async def _process_texts_async(self, rows):
+        """
+        Versione asincrona di `_process_texts`, in due stadi: i download (I/O, limitati dal fetcher)
+        riempiono una coda limitata, svuotata dalle estrazioni (CPU) nel pool di processi.
+        Se le estrazioni sono in ritardo i download si fermano, invece di accumulare HTML in memoria.
+        """
+        return await self._extract_pipeline(rows, self._fetch_row, track=True)
+
+    def stream_articles(self, items, max_in_flight=None, save=False, on_saved=None, on_outcome=None):
+        """
+        Versione in streaming di `_process_texts`: legge gli URL man mano, tiene in lavorazione al più
+        `max_in_flight` righe e restituisce gli articoli appena estratti, così la memoria resta costante
+        anche su milioni di URL e chi chiama può scrivere i risultati un po' alla volta.
+
+        ```
+        with URLTextProcessor() as processor, open("articoli.jsonl", "w") as f:
+            for article in processor.stream_articles(urls):
+                f.write(json.dumps(article) + "\\n")
+        ```
+
+        La pipeline gira in un event loop su un thread dedicato: non va usata insieme ad altre
+        chiamate della stessa istanza.
+
+        :param items: Un iterabile (anche un generatore) di URL o di righe con almeno 'url', oppure un DataFrame.
+            Gli URL ripetuti, anche in un'altra versione (vedi `url_key`), vengono elaborati una sola volta.
+        :param max_in_flight: Righe in lavorazione contemporaneamente (default: il doppio di `max_concurrency`).
+        :param save: Se True salva gli articoli nell'archivio a blocchi, man mano che vengono estratti.
+        :param on_saved: Con `save`, funzione chiamata con ogni blocco di articoli dopo che è stato salvato
+            (es. `RunJournal.record_articles`); gli articoli vengono restituiti prima di essere salvati.
+            Se un blocco non può essere salvato l'eccezione viene propagata e lo stream si interrompe.
+        :param on_outcome: Funzione `on_outcome(url, esito)` chiamata, dal thread della pipeline, per ogni URL
+            che non produce un articolo: 'failed' (download fallito), 'empty' (nessun testo estratto),
+            'error' (eccezione durante download o estrazione) o 'skipped' (già scaricato o fallito di recente).
+            Con `on_saved` ogni URL elaborato ha un esito registrato (es. `RunJournal.record_outcomes`).
+        :return: Un generatore di articoli, nell'ordine in cui vengono completati.
+        """
+        if isinstance(items, pd.DataFrame):
+            items = (row for _, row in items.iterrows())
+        max_in_flight = max_in_flight or 2 * self.fetcher.max_concurrency
+        results = asyncio.Queue(maxsize=max_in_flight)
+        finished = object()
+
+        async def produce():
+            error = None
+            try:
+                await self._extract_pipeline(_unique_rows(items, self.url_key), self._fetch_row, emit=results.put,
+                                             max_in_flight=max_in_flight, track=True, on_outcome=on_outcome)
+            except Exception as e:
+                error = e
+            await results.put((finished, error))
+
+        async def start():
+            return asyncio.ensure_future(produce())
+
+        async def stop(task):
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name="stream-articles", daemon=True)
+        thread.start()
+        producer = asyncio.run_coroutine_threadsafe(start(), loop).result()
+        to_save = []
+        try:
+            while True:
+                item = asyncio.run_coroutine_threadsafe(results.get(), loop).result()
+                if isinstance(item, tuple) and item[0] is finished:
+                    if item[1] is not None:
+                        raise item[1]
+                    return
+                if save:
+                    to_save.append(item)
+                    if len(to_save) >= _SAVE_BATCH:
+                        batch, to_save = to_save, []
+                        self._save_links(batch, on_saved=on_saved, raise_errors=True)
+                yield item
+        finally:
+            # Anche se chi chiama interrompe l'iterazione: si annullano i task e si salva quanto già estratto
+            asyncio.run_coroutine_threadsafe(stop(producer), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+            if to_save:
+                self._save_links(to_save, on_saved=on_saved, raise_errors=True)
+
+    async def _fetch_row(self, row, put):
+        """Sorgente della pipeline che scarica la pagina della riga."""
+        async def record_and_put(result):
+            self._record_fetch(result)
+            await put(result)
+
+        await self.fetcher.fetch(row["url"], on_result=record_and_put)
+
+    async def _load_cached_row(self, row, put):
+        """Sorgente della pipeline che legge la pagina della riga dalla cache HTML, senza rete."""
+        url = row["url"]
+        page = await asyncio.get_running_loop().run_in_executor(None, self.html_cache.get, url)
+        if page is None:
+            self.metrics.count("cache_misses")
+            logger.debug("HTML non presente nella cache per URL: %s", url)
+            await put(FetchResult(url, error="HTML non presente nella cache"))
+        else:
+            await put(FetchResult(url, 200, page.html))
+
+    async def _extract_pipeline(self, rows, load, emit=None, max_in_flight=None, track=False, on_outcome=None):
         """
-        df = df.drop_duplicates(subset=["url"]).drop_duplicates(subset=["title"])
+        Esegue lo stadio di estrazione sulle pagine prodotte da `load`, attraverso una coda limitata.
 
+        :param rows: Le righe (con almeno 'url') da elaborare: un iterabile qualsiasi, letto man mano.
+        :param load: Coroutine `load(row, put)` che ottiene la pagina della riga e la passa a `put`
+            come `FetchResult`, es. `_fetch_row` o `_load_cached_row`.
+        :param emit: Coroutine chiamata con ogni articolo estratto. Se assente gli articoli vengono
+            raccolti e restituiti in una lista.
+        :param max_in_flight: Righe in lavorazione (dal download alla fine dell'estrazione) al massimo;
+            None per avviarle tutte subito.
+        :param track: Se True salta, a blocchi, le righe già scaricate (indice degli URL visti) o fallite
+            di recente, e registra gli errori nel registro degli URL falliti.
+        :param on_outcome: Funzione `on_outcome(url, esito)` per le righe che non producono un articolo,
+            vedi `stream_articles`.
+        :return: Gli articoli estratti, o una lista vuota se è indicato `emit`.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.extract_queue_size)
+        in_flight = asyncio.Semaphore(max_in_flight) if max_in_flight else None
         new_entries = []
+        outcomes = []
+        if emit is None:
+            async def emit(entry):
+                new_entries.append(entry)
+
+        def release():
+            if in_flight is not None:
+                in_flight.release()
 
-        def process_row(row):
+        def dropped(row, kind):
+            if on_outcome is not None:
+                on_outcome(row["url"], kind)
+
+        def outcome(url, failure_class=None, reason=None):
+            nonlocal outcomes
+            if not track:
+                return
+            outcomes.append((url, failure_class, reason))
+            if len(outcomes) >= _FAILURE_BATCH:
+                self._record_outcomes(outcomes)
+                outcomes = []
+
+        async def fetch_row(row):
             url = row["url"]
-            original_title = row.get("title")
-            original_language = row.get("language")
+            queued = False
 
-            print(f"DEBUG: Processo URL: {url}") # Logga l'URL che sta per essere processato
-            raw_text = self._fetch_text_from_url(url)
-            text, extracted_title, extracted_language = self._clean_text_and_extract_metadata(raw_text, url)
-            
-            final_title = extracted_title if extracted_title else original_title
-            final_language = (extracted_language if extracted_language else original_language or 'en').lower()
+            async def put(result):
+                nonlocal queued
+                await queue.put((row, result))
+                queued = True
 
-            if text: # Modifica: Rimuovi la condizione 'and final_title'
-                print(f"DEBUG: Estrazione testo riuscita per URL: {url}")
-                return {"url": url, "title": final_title, "language": final_language, "text": text}
-            else:
-                print(f"AVVISO: Fallita estrazione testo per URL: {url}")
-                return None
+            try:
+                logger.debug("Processo URL: %s", url)
+                await load(row, put)
+            except Exception as e:
+                self.metrics.count("task_errors")
+                self.metrics.error("fetch", type(e).__name__, url, str(e), exc=e)
+                logger.warning("Eccezione durante il recupero della pagina dell'URL: %s - %s", url, e,
+                               exc_info=logger.isEnabledFor(logging.DEBUG), extra={"event": "task_error", "url": url})
+                if not queued:
+                    dropped(row, "error")
+            finally:
+                # Se la pagina è in coda, lo slot viene liberato a fine estrazione
+                if not queued:
+                    release()
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            futures = {executor.submit(process_row, row): row for _, row in df.iterrows()}
-            for future in concurrent.futures.as_completed(futures):
+        async def extract_rows():
+            while True:
+                row, result = await queue.get()
                 try:
-                    result = future.result()
-                    if result is not None:
-                        new_entries.append(result)
+                    # Senza HTML non c'è niente da estrarre: l'errore è già nelle metriche
+                    if not result.ok:
+                        outcome(result.url, classify(result), error_kind(result))
+                        dropped(row, "failed")
+                        continue
+                    start = time.perf_counter()
+                    executor = self._extraction_executor()
+                    text, extracted_title, extracted_language = await loop.run_in_executor(
+                        executor, extract_article, result.html, result.url
+                    )
+                    self.metrics.observe("extract", time.perf_counter() - start)
+                    entry = self._make_entry(row, text, extracted_title, extracted_language)
+                    if entry is None:
+                        self.metrics.count("extract_empty")
+                        outcome(result.url, EMPTY, "nessun testo estratto")
+                        dropped(row, "empty")
+                    else:
+                        self.metrics.count("extracted")
+                        outcome(result.url)
+                        await emit(entry)
+                except BrokenProcessPool as e:
+                    # Un processo di estrazione è terminato in modo anomalo: il pool viene ricreato
+                    self.metrics.count("extract_errors")
+                    self.metrics.error("extract", "BrokenProcessPool", result.url, str(e))
+                    logger.error("Pool di processi interrotto durante l'URL: %s", result.url,
+                                 extra={"event": "extract_error", "url": result.url})
+                    dropped(row, "error")
+                    # Il pool interrotto va chiuso, per liberare processi e thread di gestione; un'altra
+                    # estrazione potrebbe averlo già sostituito con uno nuovo
+                    if self._extract_pool is executor:
+                        self._extract_pool = None
+                    executor.shutdown(wait=False, cancel_futures=True)
                 except Exception as e:
-                    error_row = futures[future]
-                    error_url = error_row.get("url", "<URL non disponibile>")
-                    print(f"ERRORE THREAD: Eccezione nel thread per URL: {error_url}")
-                    traceback.print_exc() # Stampa lo stack trace completo
-                    
+                    self.metrics.count("extract_errors")
+                    self.metrics.error("extract", type(e).__name__, result.url, str(e), exc=e)
+                    logger.warning("Eccezione durante l'estrazione dell'URL: %s - %s", result.url, e,
+                                   exc_info=logger.isEnabledFor(logging.DEBUG),
+                                   extra={"event": "extract_error", "url": result.url})
+                    dropped(row, "error")
+                finally:
+                    queue.task_done()
+                    release()
+
+        # Un'estrazione in corso per processo del pool
+        extractors = [asyncio.ensure_future(extract_rows()) for _ in range(max(1, self.extract_workers))]
+        tasks = set()
+        try:
+            batches = _batches(rows, _SEEN_BATCH) if track else [rows]
+            for batch in batches:
+                if track:
+                    to_fetch, reused = self._split_seen(self._skip_failed(batch))
+                    if on_outcome is not None:
+                        # Le righe riutilizzate arrivano con l'URL salvato, che ha la stessa chiave canonica
+                        kept = {id(row) for row in to_fetch}
+                        reused_keys = {self.url_key(entry["url"]) for entry in reused}
+                        for row in batch:
+                            if id(row) not in kept and self.url_key(row["url"]) not in reused_keys:
+                                dropped(row, "skipped")
+                    batch = to_fetch
+                    for entry in reused:
+                        await emit(entry)
+                for row in batch:
+                    if in_flight is not None:
+                        await in_flight.acquire()
+                    task = asyncio.ensure_future(fetch_row(row))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+            await queue.join()
+        finally:
+            for task in [*tasks, *extractors]:
+                task.cancel()
+            self._record_outcomes(outcomes)
+
         return new_entries
 
     def process_links_save_text_save_link(self, df):
         """Esegue l'intero stack: estrazione, pulizia e salvataggio dei dati."""
-        print("Inizio elaborazione e pulizia...")
+        logger.info("Inizio elaborazione e pulizia di %d URL...", len(df))
         new_entries = self._process_texts(df)
         
         if new_entries:
-            self._save_links(new_entries)
-            print(f"Salvato {len(new_entries)} nuovi articoli in {self.memory_file}.")
+            saved = self._save_links(new_entries)
+            logger.info("Salvato %d nuovi articoli in %s.", saved, self.store.path)
         else:
-            print("Nessun nuovo articolo trovato.")
+            logger.info("Nessun nuovo articolo trovato.")
+
+        return new_entries
+
+    def reextract_from_cache(self, urls=None, save=True):
+        """
+        Ripete l'estrazione con trafilatura sull'HTML salvato nella cache, senza scaricare nulla,
+        ad esempio dopo aver cambiato le impostazioni di estrazione o corretto un errore.
+
+        :param urls: Gli URL da rielaborare (default: tutte le pagine in cache).
+        :param save: Se True aggiorna nell'archivio gli articoli già salvati e aggiunge quelli nuovi.
+        :return: Gli articoli estratti.
+        """
+        if self.html_cache is None:
+            raise ValueError("Nessuna cache HTML configurata: passare `html_cache` a URLTextProcessor.")
+
+        urls = self.html_cache.urls() if urls is None else list(dict.fromkeys(urls))
+        # Titolo e lingua salvati restano il ripiego se trafilatura non li estrae
+        saved = self.store.get_many(urls)
+        rows = [saved.get(url) or {"url": url} for url in urls]
+        logger.info("Nuova estrazione di %d pagine dalla cache %s...", len(rows), self.html_cache.path)
+        new_entries = _run_coroutine(self._extract_pipeline(rows, self._load_cached_row))
+
+        if save and new_entries:
+            updated = self._save_links(new_entries, replace=True)
+            logger.info("Aggiornati %d articoli in %s.", updated, self.store.path)
+        return new_entries
+
+    def retry_failed(self, limit=None):
+        """
+        Ritenta gli URL con errore transitorio il cui nuovo tentativo è scaduto (vedi `FailureRegistry`),
+        fuori dal flusso principale, e salva gli articoli estratti.
 
+        :param limit: Numero massimo di URL ritentati (default: tutti quelli scaduti).
+        :return: Gli articoli estratti.
+        """
+        if self.failures is None:
+            return []
+        urls = self.failures.due(limit)
+        if not urls:
+            return []
+
+        logger.info("Nuovo tentativo per %d URL falliti in precedenza...", len(urls))
+        self.metrics.count("retried", len(urls))
+        new_entries = _run_coroutine(self._extract_pipeline([{"url": url} for url in urls], self._fetch_row, track=True))
+        if new_entries:
+            saved = self._save_links(new_entries)
+            logger.info("Salvato %d nuovi articoli in %s.", saved, self.store.path)
         return new_entries
 
     def fetch_and_process_single_url(self, url: str):
@@ -174,20 +651,31 @@ class URLTextProcessor:
         Scarica, pulisce ed estrae testo, titolo e lingua da un singolo URL.
         Restituisce un dizionario con 'url', 'title', 'lang', 'text'.
         """
-        print(f"DEBUG: Avvio fetch_and_process_single_url per: {url}") # Logga l'inizio
+        logger.debug("Avvio fetch_and_process_single_url per: %s", url)
         try:
+            if self.seen_index is not None:
+                stored = self._load_seen_articles(self.seen_index.lookup([url])).get(url)
+                if stored and stored.get("text"):
+                    self.skipped_fetches += 1
+                    self.metrics.count("reused")
+                    logger.debug("Articolo già scaricato, riletto dall'archivio: %s", url)
+                    return {"url": url, "title": stored.get("title"), "lang": stored.get("language") or 'en', "text": stored["text"]}
+
             raw_html = self._fetch_text_from_url(url)
             if not raw_html:
-                print(f"AVVISO: Nessun HTML scaricato per l'URL: {url}. Impossibile procedere con l'estrazione.")
+                logger.warning("Nessun HTML scaricato per l'URL: %s. Impossibile procedere con l'estrazione.", url)
                 return None
 
             # `_clean_text_and_extract_metadata` tenterà di estrarre titolo e lingua, ma non è obbligatorio per il successo.
+            start = time.perf_counter()
             text, title, language = self._clean_text_and_extract_metadata(raw_html, url)
+            self.metrics.observe("extract", time.perf_counter() - start)
             
             # Qui il successo dipende SOLO dalla presenza del testo.
             # Il titolo può essere None, e la lingua sarà quella scelta dall'utente.
             if text:
-                print(f"DEBUG: Testo estratto con successo da URL: {url}. Titolo: {title if title else 'Non estratto'}")
+                self.metrics.count("extracted")
+                logger.debug("Testo estratto con successo da URL: %s. Titolo: %s", url, title if title else 'Non estratto')
                 return {
                     "url": url,
                     # Il titolo sarà None se non estratto da trafilatura, ma è accettabile.
@@ -196,10 +684,11 @@ class URLTextProcessor:
                     "text": text.strip()
                 }
             else:
-                print(f"AVVISO: Impossibile estrarre TESTO dall'URL: {url} dopo lo scraping HTML. Il titolo non è un requisito.")
+                self.metrics.count("extract_empty")
+                logger.warning("Impossibile estrarre TESTO dall'URL: %s dopo lo scraping HTML. Il titolo non è un requisito.", url)
                 return None
         except Exception as e:
-            print(f"ERRORE GENERALE in fetch_and_process_single_url per URL: {url} - {e}")
-            traceback.print_exc() # Stampa lo stack trace completo
+            self.metrics.error("extract", type(e).__name__, url, str(e), exc=e)
+            logger.error("Errore generale in fetch_and_process_single_url per URL: %s - %s", url, e, exc_info=True)
             return None
 
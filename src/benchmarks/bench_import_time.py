@@ -0,0 +1,107 @@
+"""
+Import time regression benchmark for the gdeltdoc package and the scripts using it.
+
+Every case runs in a fresh interpreter under `python -X importtime`, a few times, and reports
+the median total import time and the slowest top level imports. Cases which must stay light
+list the heavy modules they must not import: loading one of them is a regression and makes
+the benchmark exit with status 1, as does going over `--max-ms`.
+
+Run from the `src` directory:
+
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --runs 10 --max-ms 150
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from typing import Dict, List, Tuple
+
+HEAVY_MODULES = ["pandas", "numpy", "requests", "pyarrow", "trafilatura"]
+
+# (name, code, modules it must not import)
+CASES = [
+    ("import gdeltdoc", "import gdeltdoc", HEAVY_MODULES),
+    ("Filters query string",
+     "from gdeltdoc import Filters; Filters(timespan='1d', keyword='climate', country=['US', 'IT']).query_string",
+     HEAVY_MODULES),
+    ("plan_queries",
+     "from gdeltdoc import plan_queries; plan_queries([('20250101000000', '20250101080000')], ['US'], ['ELECTION'], ['>5'])",
+     HEAVY_MODULES),
+    ("cache + rate limiter", "from gdeltdoc import DiskCache, MemoryCache, RateLimiter, RequestStats", HEAVY_MODULES),
+    ("GdeltDoc client", "from gdeltdoc import GdeltDoc", []),
+    ("URLTextProcessor", "from URLtextProcessor import URLTextProcessor", []),
+]
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Dict[str, float], List[str]]:
+    """
+    Parse the `-X importtime` report into the total import time (ms), the cumulative time
+    of every top level import (ms) and the names of all the imported modules.
+    """
+    top_level: Dict[str, float] = {}
+    modules: List[str] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit():
+            # The header line
+            continue
+        modules.append(name.strip())
+        if not name[1:].startswith(" "):
+            top_level[name.strip()] = int(cumulative) / 1000
+    return sum(top_level.values()), top_level, modules
+
+
+def run_case(code: str, runs: int) -> Tuple[List[float], Dict[str, float], List[str], str]:
+    totals = []
+    top_level: Dict[str, float] = {}
+    modules: List[str] = []
+    for _ in range(runs):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True, text=True, cwd=os.getcwd(),
+        )
+        if process.returncode != 0:
+            return [], {}, [], process.stderr.strip().splitlines()[-1]
+        total, top_level, modules = parse_importtime(process.stderr)
+        totals.append(total)
+    return totals, top_level, modules, ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="interpreter starts per case")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="fail if a case with forbidden modules takes longer than this, in ms")
+    parser.add_argument("--top", type=int, default=3, help="slowest top level imports shown per case")
+    args = parser.parse_args()
+
+    failures = []
+    for name, code, forbidden in CASES:
+        totals, top_level, modules, error = run_case(code, args.runs)
+        if error:
+            print(f"{name:<24} skipped: {error}")
+            continue
+
+        median = statistics.median(totals)
+        slowest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        print(f"{name:<24} {median:>8.1f} ms  (min {min(totals):.1f})  "
+              + ", ".join(f"{module} {ms:.1f}" for module, ms in slowest))
+
+        loaded = [module for module in forbidden if module in modules]
+        if loaded:
+            failures.append(f"{name} imports {', '.join(loaded)}")
+        if forbidden and args.max_ms is not None and median > args.max_ms:
+            failures.append(f"{name} takes {median:.1f} ms, more than {args.max_ms:.0f} ms")
+
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark of gdeltdoc.helpers.load_json against the previous recursive implementation.
+
+The payloads are GDELT artlist responses rebuilt from the articles saved in `similarity_results/`,
+with the faults found in real responses injected into a share of the titles: invalid escapes
+(`\\'`, `\\x`) and raw control characters. Raw responses saved to disk can be benchmarked too.
+
+Run from the `src` directory:
+
+    python -m benchmarks.bench_load_json
+    python -m benchmarks.bench_load_json --payload path/to/response.json
+"""
+import argparse
+import csv
+import glob
+import json
+import random
+import sys
+import time
+
+from gdeltdoc.helpers import load_json
+
+FAULTS = ["\\'", "\\x", "\t", "\n", "\x01"]
+
+
+def load_json_recursive(json_message, max_recursion_depth: int = 100, recursion_depth: int = 0):
+    """
+    The previous implementation of `load_json`, which replaces one offending character per
+    call and recurses.
+    """
+    try:
+        result = json.loads(json_message)
+    except Exception as e:
+        if recursion_depth >= max_recursion_depth:
+            raise ValueError("Max Recursion depth is reached. JSON can´t be parsed!")
+        idx_to_replace = int(e.pos)
+        json_message = list(json_message)
+        json_message[idx_to_replace] = ' '
+        new_message = ''.join(str(m) for m in json_message)
+        return load_json_recursive(json_message=new_message, max_recursion_depth=max_recursion_depth,
+                                   recursion_depth=recursion_depth+1)
+    return result
+
+
+def read_articles(pattern: str):
+    articles = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, encoding="utf-8", newline="") as f:
+            articles.extend(csv.DictReader(f))
+    return articles
+
+
+def build_payload(articles, n_articles: int, fault_rate: float, rng: random.Random) -> str:
+    """
+    Serialize `n_articles` articles as an artlist response, then inject a fault in the title
+    of a share `fault_rate` of them.
+    """
+    rows = [articles[i % len(articles)] for i in range(n_articles)]
+    parts = []
+    for row in rows:
+        encoded = json.dumps(row, ensure_ascii=False)
+        if rng.random() < fault_rate:
+            title = json.dumps(row["title"], ensure_ascii=False)[1:-1]
+            cut = rng.randint(0, len(title))
+            encoded = encoded.replace(title, title[:cut] + rng.choice(FAULTS) + title[cut:], 1)
+        parts.append(encoded)
+    return '{"articles": [' + ",\n".join(parts) + "]}"
+
+
+def timed(func, *args, repeat: int = 3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            result = func(*args)
+        except (ValueError, RecursionError) as e:
+            result = e
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench(name: str, payload: str) -> None:
+    new_time, new_result = timed(load_json, payload)
+    # Every recursion keeps a copy of the payload alive, so the old version is only run once
+    old_time, old_result = timed(load_json_recursive, payload, 10 ** 6, repeat=1)
+
+    if isinstance(old_result, Exception):
+        verdict = f"old failed ({type(old_result).__name__})"
+    else:
+        verdict = "same result" if old_result == new_result else "DIFFERENT result"
+
+    print(f"{name:<28} {len(payload) / 1024:>9.0f} KiB  old {old_time * 1000:>10.1f} ms  "
+          f"new {new_time * 1000:>8.2f} ms  {verdict}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", default="similarity_results/*.csv",
+                        help="glob of CSV files of articles returned by GDELT")
+    parser.add_argument("--payload", action="append", default=[],
+                        help="raw API response to benchmark, can be repeated")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sys.setrecursionlimit(100000)
+    rng = random.Random(args.seed)
+
+    for path in args.payload:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            bench(path, f.read())
+
+    articles = read_articles(args.articles)
+    if not articles:
+        if not args.payload:
+            parser.error(f"No articles found in {args.articles}")
+        return
+
+    for n_articles, fault_rate in [(250, 0.0), (250, 0.05), (250, 0.2), (250, 0.5), (1000, 0.2), (1000, 0.5)]:
+        payload = build_payload(articles, n_articles, fault_rate, rng)
+        bench(f"{n_articles} articles, {fault_rate:.0%} faulty", payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+How many downloads the canonical URL keys of `scraping.urls` save on a recorded AutoScraper run,
+compared to the previous exact-string dedupe, and what each normalization rule contributes.
+
+The articles are read, in order, from the responses recorded by `gdeltdoc.replay.RecordingSession`,
+from the `DiskCache` file of AutoScraper (`gdelt_cache/responses.sqlite`) or, by default, from the
+CSV files saved in `similarity_results/`. Every article whose key was already seen is a download
+AutoScraper no longer makes.
+
+Run from the `src` directory:
+
+    python -m benchmarks.bench_url_dedupe
+    python -m benchmarks.bench_url_dedupe --cache gdelt_cache/responses.sqlite --examples 20
+    python -m benchmarks.bench_url_dedupe --recordings recordings
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+from gdeltdoc.helpers import parse_json
+from gdeltdoc.replay import INDEX_FILE
+from scraping.urls import URLNormalizer, duplicated_urls
+
+# One rule turned off at a time, to see how many duplicates each of them finds
+ABLATIONS = [
+    ("no www./m./amp. hosts", {"host_prefixes": ()}),
+    ("no AMP markers", {"strip_amp": False}),
+    ("no tracking params", {"tracking_params": (), "tracking_prefixes": ()}),
+    ("no .html suffixes", {"path_suffixes": ()}),
+    ("no trailing slash", {"strip_trailing_slash": False}),
+    ("no http/https", {"ignore_scheme": False}),
+]
+
+
+def read_csv_articles(pattern: str):
+    articles = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, encoding="utf-8", newline="") as f:
+            articles.extend(csv.DictReader(f))
+    return articles
+
+
+def read_recorded_articles(directory: str):
+    articles = []
+    with open(os.path.join(directory, INDEX_FILE), "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry["status"] != 200:
+                continue
+            with open(os.path.join(directory, entry["body_file"]), "rb") as body:
+                try:
+                    result, _ = parse_json(body.read())
+                except ValueError:
+                    continue
+            if isinstance(result, dict):
+                articles.extend(result.get("articles", []))
+    return articles
+
+
+def read_cached_articles(path: str):
+    articles = []
+    conn = sqlite3.connect(path)
+    try:
+        for (body,) in conn.execute("SELECT body FROM responses ORDER BY rowid"):
+            result = json.loads(zlib.decompress(body).decode("utf-8"))
+            if isinstance(result, dict):
+                articles.extend(result.get("articles", []))
+    finally:
+        conn.close()
+    return articles
+
+
+def count_fetches(urls, aliases, key) -> int:
+    return sum(not duplicated for duplicated in duplicated_urls(urls, aliases, key=key))
+
+
+def timed_keys(normalizer, urls, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for url in urls:
+            normalizer(url)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", default="similarity_results/*.csv",
+                        help="glob of CSV files of articles returned by GDELT")
+    parser.add_argument("--recordings", help="directory of responses recorded with RecordingSession")
+    parser.add_argument("--cache", help="DiskCache SQLite file of a run")
+    parser.add_argument("--examples", type=int, default=10, help="merged URL pairs to print")
+    args = parser.parse_args()
+
+    if args.recordings:
+        source, articles = args.recordings, read_recorded_articles(args.recordings)
+    elif args.cache:
+        source, articles = args.cache, read_cached_articles(args.cache)
+    else:
+        source, articles = args.articles, read_csv_articles(args.articles)
+    articles = [a for a in articles if a.get("url")]
+    if not articles:
+        parser.error(f"No articles found in {source}")
+
+    urls = [a["url"] for a in articles]
+    aliases = [a.get("url_mobile") or None for a in articles]
+    normalizer = URLNormalizer()
+
+    exact = len(set(urls))
+    canonical = count_fetches(urls, None, normalizer)
+    with_mobile = count_fetches(urls, aliases, normalizer)
+    print(f"{source}: {len(articles)} articles, {sum(a is not None for a in aliases)} with url_mobile")
+    print(f"{'dedupe':<36}{'fetches':>9}{'saved':>8}{'saved %':>9}")
+    for name, fetches in [("exact url (before)", exact), ("canonical url", canonical),
+                          ("canonical url + url_mobile", with_mobile)]:
+        print(f"{name:<36}{fetches:>9}{exact - fetches:>8}{(exact - fetches) / exact:>9.1%}")
+
+    print("\nrules turned off one at a time (canonical url + url_mobile)")
+    for name, options in ABLATIONS:
+        fetches = count_fetches(urls, aliases, URLNormalizer(**options))
+        print(f"{name:<36}{fetches:>9}{exact - fetches:>8}  ({fetches - with_mobile:+d} vs all rules)")
+
+    cold = timed_keys(URLNormalizer(cache_size=0), urls)
+    warm_normalizer = URLNormalizer()
+    timed_keys(warm_normalizer, urls, repeat=1)
+    warm = timed_keys(warm_normalizer, urls)
+    print(f"\nkey cost: {cold / len(urls) * 1e6:.2f} us/url uncached, {warm / len(urls) * 1e6:.2f} us/url cached")
+
+    if args.examples:
+        print("\nmerged URLs (first kept):")
+        first = {}
+        shown = set()
+        for url, alias in zip(urls, aliases):
+            keys = [normalizer(url)] + ([normalizer(alias)] if alias else [])
+            kept = next((first[key] for key in keys if key in first), None)
+            if kept is not None and kept != url and (kept, url) not in shown and len(shown) < args.examples:
+                print(f"  {kept}\n    = {url}")
+                shown.add((kept, url))
+            for key in keys:
+                first.setdefault(key, url)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,65 @@
-from gdeltdoc.api_client import GdeltDoc
-from gdeltdoc.filters import Filters, near, repeat, multi_repeat, VALID_TIMESPAN_UNITS
+"""
+Client for the GDELT DOC 2.0 API.
+
+The public names below are imported from their submodule on first access, so that
+`from gdeltdoc import Filters` doesn't pay for pandas and requests, which are only loaded
+with the clients (`GdeltDoc`, `AsyncGdeltDoc`) and the planner.
+"""
+import importlib
+
+from typing import TYPE_CHECKING
+
 from gdeltdoc._version import version
 
 __version__ = version
+
+# Public name -> submodule defining it
+_LAZY_ATTRIBUTES = {
+    "GdeltDoc": "gdeltdoc.api_client",
+    "AsyncGdeltDoc": "gdeltdoc.async_client",
+    "ResponseCache": "gdeltdoc.cache",
+    "MemoryCache": "gdeltdoc.cache",
+    "DiskCache": "gdeltdoc.cache",
+    "RateLimitError": "gdeltdoc.errors",
+    "RateLimiter": "gdeltdoc.rate_limit",
+    "RequestEvent": "gdeltdoc.hooks",
+    "RequestStats": "gdeltdoc.hooks",
+    "plan_queries": "gdeltdoc.planner",
+    "QueryPlan": "gdeltdoc.planner",
+    "PlannedQuery": "gdeltdoc.planner",
+    "ThemeRegistry": "gdeltdoc.themes",
+    "get_theme_registry": "gdeltdoc.themes",
+    "Filters": "gdeltdoc.filters",
+    "near": "gdeltdoc.filters",
+    "repeat": "gdeltdoc.filters",
+    "multi_repeat": "gdeltdoc.filters",
+    "VALID_TIMESPAN_UNITS": "gdeltdoc.filters",
+}
+
+__all__ = [*_LAZY_ATTRIBUTES, "version", "__version__"]
+
+if TYPE_CHECKING:
+    from gdeltdoc.api_client import GdeltDoc
+    from gdeltdoc.async_client import AsyncGdeltDoc
+    from gdeltdoc.cache import ResponseCache, MemoryCache, DiskCache
+    from gdeltdoc.errors import RateLimitError
+    from gdeltdoc.rate_limit import RateLimiter
+    from gdeltdoc.hooks import RequestEvent, RequestStats
+    from gdeltdoc.planner import plan_queries, QueryPlan, PlannedQuery
+    from gdeltdoc.themes import ThemeRegistry, get_theme_registry
+    from gdeltdoc.filters import Filters, near, repeat, multi_repeat, VALID_TIMESPAN_UNITS
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module), name)
+    # Cache it so that the next lookups don't go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
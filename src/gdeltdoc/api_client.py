@@ -1,14 +1,33 @@
+import logging
+import threading
+import time
+import warnings
 import requests
+import concurrent.futures
 import pandas as pd
 
-from gdeltdoc.filters import Filters
+from requests.adapters import HTTPAdapter
 
-from typing import Dict
+from gdeltdoc.cache import ResponseCache, cache_key
+from gdeltdoc.errors import RateLimitError
+from gdeltdoc.filters import Filters, MAX_RECORDS
+from gdeltdoc.hooks import RequestEvent, RequestObserver
+from gdeltdoc.rate_limit import RateLimiter, is_throttled
 
-from gdeltdoc.helpers import load_json
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from gdeltdoc.helpers import (
+    parse_json, parse_gdelt_datetime, format_gdelt_datetime, timespan_to_timedelta, compact_articles, ARTICLE_OUTPUTS,
+    CATEGORICAL_ARTICLE_COLUMNS,
+)
 
 from gdeltdoc._version import version
 
+DEFAULT_BASE_URL = "https://api.gdeltproject.org/api/v2/doc/doc"
+
+logger = logging.getLogger(__name__)
+
 class GdeltDoc:
     """
     API client for the GDELT 2.0 Doc API
@@ -51,15 +70,108 @@ class GdeltDoc:
         for more information about the tone metric.
     """
 
-    def __init__(self, json_parsing_max_depth: int = 100) -> None:
+    def __init__(
+        self,
+        json_parsing_max_depth: Optional[int] = 100,
+        session: Optional[requests.Session] = None,
+        pool_maxsize: int = 10,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        observers: Optional[List[RequestObserver]] = None,
+        base_url: str = DEFAULT_BASE_URL,
+        output: str = "object",
+        url_key: Optional[Callable[[str], str]] = None,
+    ) -> None:
         """
         Params
         ------
         json_parsing_max_depth
             A parameter for the json parsing function that removes illegal character. If 100 it will remove at max
-            100 characters before exiting with an exception
+            100 characters before exiting with an exception. If None, there is no limit. All the characters are
+            replaced in a single pass, so the parsing time doesn't grow with this limit.
+
+        session
+            An optional `requests.Session` to send the queries with. If not given, the client creates its
+            own session so that consecutive queries reuse the same keep-alive connections to the API.
+
+        pool_maxsize
+            The number of connections kept open to the API by the default session. Should be at least
+            the number of threads sharing this client.
+
+        cache
+            An optional `gdeltdoc.cache.ResponseCache` (eg. `MemoryCache` or `DiskCache`). Parsed
+            responses are looked up there before calling the API and stored there afterwards.
+
+        rate_limiter
+            An optional `gdeltdoc.rate_limit.RateLimiter` shared by every thread using this client.
+            When set, requests are paced by the limiter and throttled requests are retried with
+            backoff instead of failing straight away.
+
+        observers
+            Callables receiving a `gdeltdoc.hooks.RequestEvent` after every query, eg. a
+            `gdeltdoc.hooks.RequestStats` aggregator. More can be added with `add_observer`.
+
+        base_url
+            The DOC API endpoint. Point it at a `gdeltdoc.replay.ReplayServer` to run offline.
+
+        output
+            The dtypes of the article DataFrames. "object" keeps every column as returned by the API.
+            "compact" makes `domain`, `language` and `sourcecountry` categoricals and parses `seendate`
+            into a UTC datetime, which uses much less memory on large result sets. "arrow" does the
+            same with pyarrow-backed dtypes and requires `pyarrow`.
+
+        url_key
+            An optional function mapping a URL to the key articles are deduplicated by across windows
+            and filters, eg. `scraping.urls.canonical_url`, so the mobile, AMP or tracking variants of an
+            article count as the same article. When set, the key of `url_mobile` is matched as well.
+            By default articles are deduplicated by their exact `url`.
         """
+        if output not in ARTICLE_OUTPUTS:
+            raise ValueError(f"output must be one of {', '.join(ARTICLE_OUTPUTS)}, not {output}")
+
         self.max_depth_json_parsing = json_parsing_max_depth
+        self._owns_session = session is None
+        self.session = session if session is not None else self._build_session(pool_maxsize)
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.observers: List[RequestObserver] = list(observers) if observers else []
+        self.base_url = base_url
+        self.output = output
+        self.url_key = url_key
+
+        # Futures of the queries being fetched, by cache key, shared with threads asking for the same search
+        self._in_flight: Dict[str, concurrent.futures.Future] = {}
+        self._in_flight_lock = threading.Lock()
+
+    def add_observer(self, observer: RequestObserver) -> None:
+        """
+        Register a callable to receive a `RequestEvent` after every query.
+        """
+        self.observers.append(observer)
+
+    @staticmethod
+    def _build_session(pool_maxsize: int) -> requests.Session:
+        """
+        Build a `requests.Session` with a connection pool sized for `pool_maxsize` concurrent queries.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def close(self) -> None:
+        """
+        Close the pooled connections, unless the session was supplied by the caller.
+        """
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self) -> "GdeltDoc":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     def article_search(self, filters: Filters) -> pd.DataFrame:
         """
@@ -76,12 +188,181 @@ class GdeltDoc:
         pd.DataFrame
             A pandas DataFrame of the articles returned from the API.
         """
-        articles = self._query("artlist", filters.query_string)
+        articles = self._query("artlist", filters.query_string, filters.fingerprint())
         if "articles" in articles:
-            return pd.DataFrame(articles["articles"])
+            return compact_articles(pd.DataFrame(articles["articles"]), self.output)
         else:
             return pd.DataFrame()
 
+    def article_search_all(
+        self, filters: Filters, min_window: timedelta = timedelta(minutes=15)
+    ) -> pd.DataFrame:
+        """
+        Return every article matching the filters over their whole date range, getting past the
+        limit of 250 articles per query.
+
+        The range is queried with `num_records=250`. Whenever a window returns a full page, which
+        means some articles were cut off, it's split in two halves which are queried in turn,
+        recursively. The results are merged and deduplicated by `url` (see `url_key`).
+
+        Params
+        ------
+        filters
+            A `gdelt-doc.Filters` object containing the filter parameters for this query. A `timespan`
+            is converted to the window ending now.
+
+        min_window
+            Windows shorter than this are not split any further. GDELT indexes articles every
+            15 minutes, so smaller windows don't help.
+
+        Returns
+        -------
+        pd.DataFrame
+            A pandas DataFrame of the articles returned from the API, in the same format as
+            `article_search`.
+        """
+        pages = list(self.iter_article_search_all(filters, min_window))
+        return self._concat_articles(pages)
+
+    def iter_article_search_all(
+        self, filters: Filters, min_window: timedelta = timedelta(minutes=15)
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Streaming version of `article_search_all`. Yields a DataFrame of new articles for each
+        window as soon as it's queried, from the oldest window to the most recent one. Articles
+        already yielded for an earlier window are left out.
+        """
+        start, end = self._search_window(filters)
+        seen_urls: Set[str] = set()
+        windows = [(start, end)]
+
+        while windows:
+            window_start, window_end = windows.pop()
+            page = self.article_search(
+                filters.replace(
+                    start_date=format_gdelt_datetime(window_start),
+                    end_date=format_gdelt_datetime(window_end),
+                    timespan=None,
+                    num_records=MAX_RECORDS,
+                )
+            )
+
+            if len(page) >= MAX_RECORDS:
+                if window_end - window_start > min_window:
+                    middle = (window_start + (window_end - window_start) / 2).replace(microsecond=0)
+                    # The earlier half is popped first
+                    windows.append((middle, window_end))
+                    windows.append((window_start, middle))
+                    continue
+                warnings.warn(
+                    f"The window {format_gdelt_datetime(window_start)} - {format_gdelt_datetime(window_end)} "
+                    f"still returns {MAX_RECORDS} articles and can't be split further, some articles may be missing"
+                )
+
+            if page.empty:
+                continue
+
+            page = self._new_articles(page, seen_urls)
+            if not page.empty:
+                yield page.reset_index(drop=True)
+
+    def article_search_many(
+        self, filters_list: List[Filters], max_workers: int = 4, all_pages: bool = False
+    ) -> pd.DataFrame:
+        """
+        Run an article search for each of the filters concurrently and combine the results.
+
+        Params
+        ------
+        filters_list
+            The `gdelt-doc.Filters` objects to search for.
+
+        max_workers
+            The number of queries in flight at the same time. The queries still go through the
+            client's rate limiter, if it has one.
+
+        all_pages
+            If True, each search uses `article_search_all` instead of `article_search`.
+
+        Returns
+        -------
+        pd.DataFrame
+            The articles returned for all the filters, deduplicated by `url` (see `url_key`), with an extra
+            `filter_index` column holding the position in `filters_list` of the filters which
+            returned the article first.
+        """
+        pages = [page for _, page in self.iter_article_search_many(filters_list, max_workers, all_pages)]
+        return self._concat_articles(pages)
+
+    def iter_article_search_many(
+        self, filters_list: List[Filters], max_workers: int = 4, all_pages: bool = False
+    ) -> Iterator[Tuple[int, pd.DataFrame]]:
+        """
+        Streaming version of `article_search_many`. Yields `(filter_index, articles)` for each of the
+        filters as soon as its search finishes, leaving out the articles already yielded for other
+        filters. Filters with no new articles are skipped.
+        """
+        search = self.article_search_all if all_pages else self.article_search
+        seen_urls: Set[str] = set()
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gdeltdoc")
+        try:
+            futures = {executor.submit(search, f): i for i, f in enumerate(filters_list)}
+            for future in concurrent.futures.as_completed(futures):
+                articles = future.result()
+                if articles.empty:
+                    continue
+
+                articles = self._new_articles(articles, seen_urls)
+                if not articles.empty:
+                    articles = articles.assign(filter_index=futures[future]).reset_index(drop=True)
+                    yield futures[future], articles
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _new_articles(self, articles: pd.DataFrame, seen_urls: Set[str]) -> pd.DataFrame:
+        """
+        Drop the articles whose URL is in `seen_urls`, then add the URLs of the remaining ones.
+        With a `url_key` the keys of `url` and `url_mobile` are compared instead.
+        """
+        if self.url_key is None:
+            articles = articles[~articles["url"].isin(seen_urls)]
+            seen_urls.update(articles["url"])
+            return articles
+
+        keys = articles["url"].map(self.url_key)
+        if "url_mobile" in articles.columns:
+            mobile_keys = articles["url_mobile"].map(lambda url: self.url_key(url) if isinstance(url, str) and url else None)
+        else:
+            mobile_keys = pd.Series(None, index=articles.index, dtype=object)
+        new = ~(keys.isin(seen_urls) | mobile_keys.isin(seen_urls))
+        seen_urls.update(keys[new])
+        seen_urls.update(mobile_keys[new].dropna())
+        return articles[new]
+
+    def _concat_articles(self, pages: List[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Concatenate pages of articles. Categoricals with different categories are concatenated as
+        plain objects, so the output dtypes are applied again to the result.
+        """
+        if not pages:
+            return pd.DataFrame()
+        articles = pd.concat(pages, ignore_index=True)
+        if self.output == "compact":
+            for column in articles.columns.intersection(CATEGORICAL_ARTICLE_COLUMNS):
+                articles[column] = articles[column].astype("category")
+        return articles
+
+    @staticmethod
+    def _search_window(filters: Filters) -> Tuple[datetime, datetime]:
+        """
+        Return the (start, end) datetimes covered by the filters.
+        """
+        if filters.timespan:
+            end = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+            return end - timespan_to_timedelta(filters.timespan), end
+        return parse_gdelt_datetime(filters.start_date), parse_gdelt_datetime(filters.end_date)
+
     def timeline_search(self, mode: str, filters: Filters) -> pd.DataFrame:
         """
         Make a query using one of the API's timeline modes.
@@ -103,7 +384,7 @@ class GdeltDoc:
         pd.DataFrame
             A pandas DataFrame of the articles returned from the API.
         """
-        timeline = self._query(mode, filters.query_string)
+        timeline = self._query(mode, filters.query_string, filters.fingerprint())
         #print(timeline)
         results = {"datetime": [entry["date"] for entry in timeline["timeline"][0]["data"]]}
 
@@ -120,10 +401,13 @@ class GdeltDoc:
 
         return formatted
 
-    def _query(self, mode: str, query_string: str) -> Dict:
+    def _query(self, mode: str, query_string: str, fingerprint: Optional[str] = None) -> Dict:
         """
         Submit a query to the GDELT API and return the results as a parsed JSON object.
 
+        If another thread is already fetching the same search, this call waits for its result
+        instead of sending the query again.
+
         Params
         ------
         mode
@@ -133,6 +417,9 @@ class GdeltDoc:
         query_string
             The query parameters and date range to call the API with.
 
+        fingerprint
+            The `Filters.fingerprint` of the query, used as the cache key when given.
+
         Returns
         -------
         Dict
@@ -148,27 +435,126 @@ class GdeltDoc:
         ]:
             raise ValueError(f"Mode {mode} not in supported API modes")
 
+        event = RequestEvent(mode, query_string)
+        start = time.perf_counter()
+        key = cache_key(mode, query_string, fingerprint)
+        with self._in_flight_lock:
+            pending = self._in_flight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._in_flight[key] = concurrent.futures.Future()
+
+        try:
+            if not owner:
+                event.shared = True
+                result = pending.result()
+                event.rows = self._count_rows(result)
+                return result
+
+            try:
+                result = self._fetch(mode, query_string, fingerprint, event)
+            except BaseException as e:
+                pending.set_exception(e)
+                raise
+            pending.set_result(result)
+            return result
+        except Exception as e:
+            event.error = e
+            raise
+        finally:
+            if owner:
+                with self._in_flight_lock:
+                    del self._in_flight[key]
+            event.latency = time.perf_counter() - start
+            self._notify(event)
+
+    def _fetch(self, mode: str, query_string: str, fingerprint: Optional[str], event: RequestEvent) -> Dict:
+        """
+        Get the parsed response for the query from the cache or the API, recording what happened in `event`.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(mode, query_string, fingerprint)
+            if cached is not None:
+                event.cache_hit = True
+                event.rows = self._count_rows(cached)
+                return cached
+
         headers = {
             "User-Agent": f"GDELT DOC Python API client {version} - https://github.com/alex9smith/gdelt-doc-api"
         }
 
-        #print(f"Querying API with URL: https://api.gdeltproject.org/api/v2/doc/doc?query={query_string}&format=json")
+        url = f"{self.base_url}?query={query_string}&format=json"
+        #print(f"Querying API with URL: {url}")
 
-        response = requests.get(
-            f"https://api.gdeltproject.org/api/v2/doc/doc?query={query_string}&format=json",
-            headers=headers
-        )
+        response = self._get(url, headers, event)
+        event.status_code = response.status_code
+        event.response_bytes = len(response.content)
 
         if response.status_code not in [200, 202]:
-            raise ValueError(f"The gdelt api returned a non-successful statuscode. This is the response message: {response.text}, the API endpoint is: \n  https://api.gdeltproject.org/api/v2/doc/doc?query={query_string}&format=json")
+            raise ValueError(f"The gdelt api returned a non-successful statuscode. This is the response message: {response.text}, the API endpoint is: \n  {url}")
 
         # Response is text/html if it's an error and application/json if it's ok
         if "text/html" in response.headers["content-type"]:
-            raise ValueError(f"The query was not valid. The API error message was: {response.text.strip()}, the API endpoint is: \n  https://api.gdeltproject.org/api/v2/doc/doc?query={query_string}&format=json")
+            raise ValueError(f"The query was not valid. The API error message was: {response.text.strip()}, the API endpoint is: \n  {url}")
         
         try:
-            result = load_json(response.content.decode("utf-8"), self.max_depth_json_parsing)
-            return result
-        except ValueError:
-            print("JSON parsing failed, trying again with a higher max depth")
+            result, event.parse_repairs = parse_json(response.content, self.max_depth_json_parsing)
+        except ValueError as e:
+            # Recorded in the request event as well, for the observers
+            logger.warning("Could not parse the response to %s, returning an empty result: %s", url, e)
+            event.parse_failed = True
             return {}
+
+        event.rows = self._count_rows(result)
+        if self.cache is not None:
+            self.cache.set(mode, query_string, result, fingerprint)
+        return result
+
+    @staticmethod
+    def _count_rows(result: Dict) -> int:
+        """
+        Count the articles, or the timeline data points, in a parsed response.
+        """
+        if "articles" in result:
+            return len(result["articles"])
+        if result.get("timeline"):
+            return len(result["timeline"][0].get("data", []))
+        return 0
+
+    def _notify(self, event: RequestEvent) -> None:
+        for observer in self.observers:
+            try:
+                observer(event)
+            except Exception as e:
+                # A broken observer must not break the query
+                warnings.warn(f"Request observer {observer!r} failed: {e!r}")
+
+    def _get(self, url: str, headers: Dict[str, str], event: RequestEvent) -> requests.Response:
+        """
+        Send the request through the rate limiter, if there is one, retrying while the API throttles it.
+        The number of retries is recorded in `event`.
+
+        Returns
+        -------
+        requests.Response
+            The first response which was not throttled.
+        """
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+
+            response = self.session.get(url, headers=headers)
+
+            if not is_throttled(response.status_code, response.headers.get("content-type", ""), response.content):
+                if self.rate_limiter is not None:
+                    self.rate_limiter.on_success()
+                return response
+
+            event.status_code = response.status_code
+            # The limiter only slows down for a response which is going to be retried: the last one of
+            # a chain raises, and must not cut the rate of the other threads
+            if self.rate_limiter is None or event.retries >= self.rate_limiter.max_retries:
+                raise RateLimitError(f"The gdelt api is throttling requests (status code {response.status_code}, retries {event.retries}). This is the response message: {response.text.strip()}, the API endpoint is: \n  {url}")
+
+            time.sleep(self.rate_limiter.on_throttle(event.retries))
+            event.retries += 1
@@ -0,0 +1,105 @@
+import asyncio
+import functools
+import pandas as pd
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from gdeltdoc.api_client import GdeltDoc
+from gdeltdoc.filters import Filters
+
+
+class AsyncGdeltDoc:
+    """
+    asyncio API client for the GDELT 2.0 Doc API
+
+    ```
+    import asyncio
+    from gdeltdoc import AsyncGdeltDoc, Filters
+
+    async def main():
+        async with AsyncGdeltDoc(max_concurrency=8) as gd:
+            f1 = Filters(keyword="climate change", timespan="24h")
+            f2 = Filters(keyword="heatwave", timespan="24h")
+            return await asyncio.gather(gd.article_search(f1), gd.article_search(f2))
+
+    articles, more_articles = asyncio.run(main())
+    ```
+
+    The queries are sent by a `GdeltDoc` client through its pooled session, on a thread pool of
+    `max_concurrency` workers, so at most `max_concurrency` requests are in flight at the same time.
+    The results are the same DataFrames returned by `GdeltDoc`.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        json_parsing_max_depth: Optional[int] = 100,
+        client: Optional[GdeltDoc] = None,
+    ) -> None:
+        """
+        Params
+        ------
+        max_concurrency
+            The maximum number of queries in flight at the same time.
+
+        json_parsing_max_depth
+            Passed to the underlying `GdeltDoc` client. Ignored if `client` is given.
+
+        client
+            An optional `GdeltDoc` client to send the queries with. If not given, one is created with a
+            connection pool of `max_concurrency` connections.
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, not {max_concurrency}")
+
+        self.max_concurrency = max_concurrency
+        self._owns_client = client is None
+        self.client = client if client is not None else GdeltDoc(
+            json_parsing_max_depth=json_parsing_max_depth, pool_maxsize=max_concurrency
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="gdeltdoc")
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def article_search(self, filters: Filters) -> pd.DataFrame:
+        """
+        Coroutine version of `GdeltDoc.article_search`.
+        """
+        return await self._run(self.client.article_search, filters)
+
+    async def article_search_all(self, filters: Filters) -> pd.DataFrame:
+        """
+        Coroutine version of `GdeltDoc.article_search_all`. The windows are queried one after the
+        other, in a single slot.
+        """
+        return await self._run(self.client.article_search_all, filters)
+
+    async def timeline_search(self, mode: str, filters: Filters) -> pd.DataFrame:
+        """
+        Coroutine version of `GdeltDoc.timeline_search`.
+        """
+        return await self._run(self.client.timeline_search, mode, filters)
+
+    async def _run(self, func, *args):
+        """
+        Run a blocking client call on the thread pool, waiting for a free slot first so that
+        cancelled tasks never reach the API.
+        """
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    async def aclose(self) -> None:
+        """
+        Shut down the thread pool and close the client, unless it was supplied by the caller.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, functools.partial(self._executor.shutdown, wait=True))
+        if self._owns_client:
+            self.client.close()
+
+    async def __aenter__(self) -> "AsyncGdeltDoc":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
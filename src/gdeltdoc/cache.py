@@ -0,0 +1,336 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+_DATETIME_PARAM = re.compile(r"^(startdatetime|enddatetime)=(\d{8,14})$")
+
+
+def cache_key(mode: str, query_string: str, fingerprint: Optional[str] = None) -> str:
+    """
+    Build the canonical cache key for a query.
+
+    When the `Filters.fingerprint` of the query is known it is used as the key, so that
+    equivalent searches built differently share their cached response. Otherwise the query
+    terms (everything before the first `&`) have their whitespace collapsed and the
+    `&name=value` parameters are sorted, so the same search built with the arguments in a
+    different order maps to the same key.
+
+    eg. cache_key("artlist", 'theme:ELECTION  &maxrecords=250&timespan=1d')
+        == 'artlist|theme:ELECTION|maxrecords=250&timespan=1d'
+    """
+    if fingerprint is not None:
+        return f"{mode}|{fingerprint}"
+    terms, _, params = query_string.partition("&")
+    terms = " ".join(terms.split())
+    params = "&".join(sorted(p.strip() for p in params.split("&") if p.strip()))
+    return f"{mode}|{terms}|{params}"
+
+
+def query_ttl(query_string: str, default_ttl: float) -> Optional[float]:
+    """
+    Return how long, in seconds, the response to `query_string` can be cached.
+
+    Relative `timespan` queries return different articles as time passes, so they get
+    `default_ttl`. Queries over a `startdatetime`/`enddatetime` window that is already closed
+    always return the same articles, so they never expire (`None`). A window ending in the future
+    is still being filled by GDELT and is treated like a relative query.
+    """
+    end = None
+    for param in query_string.split("&"):
+        match = _DATETIME_PARAM.match(param.strip())
+        if match and match.group(1) == "enddatetime":
+            end = match.group(2).ljust(14, "0")
+
+    if end is None:
+        return default_ttl
+
+    try:
+        end_dt = datetime.strptime(end, "%Y%m%d%H%M%S")
+    except ValueError:
+        return default_ttl
+
+    # GDELT datetimes are in UTC
+    if end_dt <= datetime.now(timezone.utc).replace(tzinfo=None):
+        return None
+    return default_ttl
+
+
+class ResponseCache:
+    """
+    Base class for the response caches used by `GdeltDoc`.
+
+    Subclasses store the parsed JSON responses by implementing `_get`, `_set` and `clear`;
+    this class takes care of the canonical keys, the expiry policy and the hit/miss counters.
+    """
+
+    def __init__(self, timespan_ttl: float = 900) -> None:
+        """
+        Params
+        ------
+        timespan_ttl
+            How long, in seconds, responses to relative `timespan` queries (or windows which
+            are not closed yet) are kept.
+        """
+        self.timespan_ttl = timespan_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._counter_lock = threading.Lock()
+
+    def get(self, mode: str, query_string: str, fingerprint: Optional[str] = None) -> Optional[Dict]:
+        """
+        Return the cached response for the query, or `None` if it's missing or expired.
+        """
+        result = self._get(cache_key(mode, query_string, fingerprint), time.time())
+        with self._counter_lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def set(self, mode: str, query_string: str, result: Dict, fingerprint: Optional[str] = None) -> None:
+        """
+        Store the parsed response for the query.
+        """
+        ttl = query_ttl(query_string, self.timespan_ttl)
+        expires = None if ttl is None else time.time() + ttl
+        self._set(cache_key(mode, query_string, fingerprint), result, expires)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return the hit/miss counters for this process.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def _get(self, key: str, now: float) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def _set(self, key: str, result: Dict, expires: Optional[float]) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(ResponseCache):
+    """
+    In-process LRU cache holding at most `max_entries` responses.
+    """
+
+    def __init__(self, max_entries: int = 1024, timespan_ttl: float = 900) -> None:
+        super().__init__(timespan_ttl)
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be at least 1, not {max_entries}")
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Dict, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str, now: float) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            result, expires = entry
+            if expires is not None and expires <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def _set(self, key: str, result: Dict, expires: Optional[float]) -> None:
+        with self._lock:
+            self._entries[key] = (result, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCache(ResponseCache):
+    """
+    Persistent LRU cache stored in a SQLite file, so cached responses survive restarts and are
+    shared by every process pointing at the same file.
+
+    Responses are stored as zlib-compressed JSON. When the stored responses exceed `max_bytes`
+    the least recently used ones are evicted. The total size is kept in a `meta` row updated in
+    the same transaction as every write, so storing a response doesn't scan the whole table.
+    """
+
+    def __init__(
+        self,
+        path: str = "gdelt_cache/responses.sqlite",
+        max_bytes: int = 512 * 1024 * 1024,
+        timespan_ttl: float = 900,
+    ) -> None:
+        """
+        Params
+        ------
+        path
+            The SQLite file to store the responses in. Its directory is created if missing.
+
+        max_bytes
+            The maximum total size of the stored (compressed) responses.
+
+        timespan_ttl
+            How long, in seconds, responses to relative `timespan` queries are kept.
+        """
+        super().__init__(timespan_ttl)
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # The body comes last, so reading the other columns doesn't walk its overflow pages
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " expires REAL,"
+            " last_access REAL NOT NULL,"
+            " body BLOB NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access, size)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_expiry ON responses (expires) WHERE expires IS NOT NULL"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._transaction(self._seed_total)
+
+    def _transaction(self, body):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = body()
+                self._conn.execute("COMMIT")
+                return result
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _seed_total(self) -> None:
+        """
+        Store the total size of the responses the first time the file is opened.
+        """
+        if self._conn.execute("SELECT 1 FROM meta WHERE name = 'total_bytes'").fetchone() is None:
+            self._conn.execute(
+                "INSERT INTO meta (name, value) SELECT 'total_bytes', COALESCE(SUM(size), 0) FROM responses"
+            )
+
+    def _add_bytes(self, delta: int) -> None:
+        if delta:
+            self._conn.execute("UPDATE meta SET value = value + ? WHERE name = 'total_bytes'", (delta,))
+
+    def _total_bytes(self) -> int:
+        return self._conn.execute("SELECT value FROM meta WHERE name = 'total_bytes'").fetchone()[0]
+
+    def _get(self, key: str, now: float) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, expires FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            body, expires = row
+            fresh = expires is None or expires > now
+            if fresh:
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        if fresh:
+            return json.loads(zlib.decompress(body).decode("utf-8"))
+
+        def drop_expired():
+            size = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if size is not None:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._add_bytes(-size[0])
+
+        self._transaction(drop_expired)
+        return None
+
+    def _set(self, key: str, result: Dict, expires: Optional[float]) -> None:
+        body = zlib.compress(json.dumps(result, ensure_ascii=False).encode("utf-8"))
+
+        def store():
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, size, expires, last_access, body) VALUES (?, ?, ?, ?, ?)",
+                (key, len(body), expires, time.time(), body),
+            )
+            self._add_bytes(len(body) - (previous[0] if previous else 0))
+            self._evict()
+
+        self._transaction(store)
+
+    def _evict(self) -> None:
+        """
+        Drop expired responses, then the least recently used ones until the cache fits in `max_bytes`.
+        Runs inside the transaction of `_set`.
+        """
+        expired = self._conn.execute(
+            "SELECT rowid, size FROM responses WHERE expires IS NOT NULL AND expires <= ?", (time.time(),)
+        ).fetchall()
+        if expired:
+            self._conn.executemany("DELETE FROM responses WHERE rowid = ?", [(rowid,) for rowid, _ in expired])
+            self._add_bytes(-sum(size for _, size in expired))
+
+        total = self._total_bytes()
+        freed = 0
+        while total - freed > self.max_bytes:
+            # Victims are read from the (last_access, size) index, a few at a time
+            victims = self._conn.execute(
+                "SELECT rowid, size FROM responses ORDER BY last_access LIMIT 32"
+            ).fetchall()
+            if not victims:
+                break
+            for rowid, size in victims:
+                if total - freed <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE rowid = ?", (rowid,))
+                freed += size
+                self.evictions += 1
+        self._add_bytes(-freed)
+
+    def total_bytes(self) -> int:
+        """
+        Return the total size of the stored (compressed) responses.
+        """
+        with self._lock:
+            return self._total_bytes()
+
+    def clear(self) -> None:
+        def body():
+            self._conn.execute("DELETE FROM responses")
+            self._conn.execute("UPDATE meta SET value = 0 WHERE name = 'total_bytes'")
+
+        self._transaction(body)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
@@ -0,0 +1,5 @@
+class RateLimitError(ValueError):
+    """
+    Raised when the GDELT API is still throttling a query after all the retries allowed by the
+    client's `RateLimiter`. Subclasses `ValueError`, which the client raises for other failed queries.
+    """
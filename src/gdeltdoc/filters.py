@@ -1,10 +1,24 @@
-from typing import Optional, List, Union, Tuple
+import hashlib
+import json
+
+from typing import TYPE_CHECKING, Optional, List, Union, Tuple
 from string import ascii_lowercase, digits
 
+from gdeltdoc.helpers import format_gdelt_datetime, parse_gdelt_datetime
+
+if TYPE_CHECKING:
+    from gdeltdoc.themes import ThemeRegistry
+
 Filter = Union[List[str], str]
 
 VALID_TIMESPAN_UNITS = ["min", "h", "hours", "d", "days", "w", "weeks", "m", "months"]
 
+# The most articles the API returns for a single artlist query
+MAX_RECORDS = 250
+
+# Canonical spelling of each timespan unit, used by `Filters.fingerprint`
+_TIMESPAN_UNITS = {"hours": "h", "days": "d", "weeks": "w", "months": "m"}
+
 def near(n: int, *args) -> str:
     """
     Build the filter to find articles containing words that occur within
@@ -57,7 +71,49 @@ def multi_repeat(repeats: List[Tuple[int, str]], method: str) -> str:
         return "(" + f"{method} ".join(to_repeat) + ")"
 
 
+def _collapse(value: str) -> str:
+    return " ".join(str(value).split())
+
+
+def _canonical_terms(f: Optional[Filter]) -> Optional[List[str]]:
+    """
+    Canonical form of a Filter: a single string and a one element list mean the same, and
+    so do OR lists holding the same terms in a different order.
+    """
+    if not f:
+        return None
+    values = [f] if isinstance(f, str) else f
+    return sorted({_collapse(v) for v in values})
+
+
+def _canonical_date(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    try:
+        return format_gdelt_datetime(parse_gdelt_datetime(value))
+    except ValueError:
+        return _collapse(value)
+
+
+def _canonical_timespan(timespan: Optional[str]) -> Optional[str]:
+    if not timespan:
+        return None
+    value = timespan.rstrip(ascii_lowercase)
+    unit = timespan[len(value):]
+    return value + _TIMESPAN_UNITS.get(unit, unit)
+
+
+def _single_or_list(terms: List[str]) -> Filter:
+    return terms[0] if len(terms) == 1 else terms
+
+
 class Filters:
+    """
+    An immutable set of search filters. Filters are hashable and compare equal when they
+    describe the same search, see `fingerprint`, so they can be used as dict keys or to
+    deduplicate searches. Use `replace` to derive a different search.
+    """
+
     def __init__(
         self,
         start_date: Optional[str] = None,
@@ -128,6 +184,7 @@ class Filters:
         theme
             Return articles that cover one of GDELT's GKG Themes. A full list of themes can be
             found here: http://data.gdeltproject.org/api/v2/guides/LOOKUP-GKGTHEMES.TXT
+            Themes aren't checked when the filters are built, call `validate_themes` to do so.
 
         tone
             Return articles with a tone value greater than `tone`
@@ -135,9 +192,33 @@ class Filters:
         tone_abs
             eqaule to tone but absolute values, from neutral to higly positive/negative
         """
-        self.query_params: List[str] = []
-        self._valid_countries: List[str] = []
-        self._valid_themes: List[str] = []
+        # Lists are stored as tuples so that the arguments can't be changed afterwards
+        self._arguments = dict(
+            start_date=start_date,
+            end_date=end_date,
+            timespan=timespan,
+            num_records=num_records,
+            keyword=keyword,
+            domain=domain,
+            domain_exact=domain_exact,
+            near=near,
+            repeat=repeat,
+            country=country,
+            theme=theme,
+            tone=tone,
+            tone_abs=tone_abs,
+            mode=mode,
+            sort=sort,
+        )
+        self._arguments = {name: tuple(value) if isinstance(value, list) else value
+                           for name, value in self._arguments.items()}
+        self.start_date = start_date
+        self.end_date = end_date
+        self.timespan = timespan
+        self.num_records = num_records
+
+        query_params: List[str] = []
+        self._valid_countries: Tuple[str, ...] = ()
 
         # Check we have either start/end date or timespan, but not both
         if not start_date and not end_date and not timespan:
@@ -148,52 +229,122 @@ class Filters:
                 "Can only provide either start_date and end_date, or timespan"
             )
 
+        if num_records > MAX_RECORDS:
+            raise ValueError(f"num_records must {MAX_RECORDS} or less, not {num_records}")
+
+        # The query is rendered from the canonical form of the arguments, so that filters with
+        # the same fingerprint also send the same query string (and share recordings and caches)
+        canonical = dict(self._canonical_items())
+
         if keyword:
-            self.query_params.append(self._keyword_to_string(keyword))
+            query_params.append(self._keyword_to_string(_single_or_list(canonical["keyword"])))
 
         if domain:
-            self.query_params.append(self._filter_to_string("domain", domain))
+            query_params.append(self._filter_to_string("domain", _single_or_list(canonical["domain"])))
 
         if domain_exact:
-            self.query_params.append(self._filter_to_string("domainis", domain_exact))
+            query_params.append(self._filter_to_string("domainis", _single_or_list(canonical["domain_exact"])))
 
         if country:
-            self.query_params.append(self._filter_to_string("sourcecountry", country))
+            query_params.append(self._filter_to_string("sourcecountry", _single_or_list(canonical["country"])))
 
         if theme:
-            self.query_params.append(self._filter_to_string("theme", theme))
+            query_params.append(self._filter_to_string("theme", _single_or_list(canonical["theme"])))
 
         if near:
-            self.query_params.append(near)
+            query_params.append(canonical["near"] + " ")
 
         if repeat:
-            self.query_params.append(repeat)
+            query_params.append(canonical["repeat"] + " ")
 
         if start_date:
-            if len(start_date)>8:
-                self.query_params.append(f'&startdatetime={start_date.replace("-", "")}')
-                self.query_params.append(f'&enddatetime={end_date.replace("-", "")}')
-            else:
-                self.query_params.append(f'&startdatetime={start_date.replace("-", "")}000000')
-                self.query_params.append(f'&enddatetime={end_date.replace("-", "")}000000')
+            query_params.append(f'&startdatetime={canonical.get("start_date")}')
+            query_params.append(f'&enddatetime={canonical.get("end_date")}')
         else:
             # Use timespan
             self._validate_timespan(timespan)
-            self.query_params.append(f"&timespan={timespan}")
+            query_params.append(f'&timespan={canonical["timespan"]}')
 
-        if num_records > 250:
-            raise ValueError(f"num_records must 250 or less, not {num_records}")
+        query_params.append(f"&maxrecords={str(num_records)}")
+        query_params.append(f'&tone={str(canonical.get("tone"))}')
+        query_params.append(f'&toneabs={str(canonical.get("tone_abs"))}')
+        query_params.append(f"&sort={str(sort)}")
+        query_params.append(f"&mode={str(mode)}")
 
-        self.query_params.append(f"&maxrecords={str(num_records)}")
-        self.query_params.append(f"&tone={str(tone)}")
-        self.query_params.append(f"&toneabs={str(tone_abs)}")
-        self.query_params.append(f"&sort={str(sort)}")
-        self.query_params.append(f"&mode={str(mode)}")
+        self.query_params: Tuple[str, ...] = tuple(query_params)
+        self._fingerprint = self._build_fingerprint()
+        self._frozen = True
 
     @property
     def query_string(self) -> str:
         return "".join(self.query_params)
 
+    def replace(self, **changes) -> "Filters":
+        """
+        Return a new `Filters` with the same parameters as this one, except for `changes`.
+
+        eg. f.replace(start_date="20250101000000", end_date="20250101080000", timespan=None)
+        runs the same search over a different window.
+        """
+        return Filters(**{**self._arguments, **changes})
+
+    def fingerprint(self) -> str:
+        """
+        Return a canonical fingerprint of the search described by these filters.
+
+        Filters which only differ in the order of their OR lists, in the format of their dates
+        (eg. "2025-01-01" and "20250101000000"), in the spelling of their timespan unit
+        ("24hours" and "24h") or in whitespace describe the same search and have the same
+        fingerprint. `GdeltDoc` uses it as the cache key and to share identical queries running
+        at the same time. Such filters also render the same `query_string`.
+        """
+        return self._fingerprint
+
+    def _canonical_items(self) -> List[Tuple[str, object]]:
+        arguments = self._arguments
+        items = [
+            ("keyword", _canonical_terms(arguments["keyword"])),
+            ("domain", _canonical_terms(arguments["domain"])),
+            ("domain_exact", _canonical_terms(arguments["domain_exact"])),
+            ("country", _canonical_terms(arguments["country"])),
+            ("theme", _canonical_terms(arguments["theme"])),
+            ("near", _collapse(arguments["near"]) if arguments["near"] else None),
+            ("repeat", _collapse(arguments["repeat"]) if arguments["repeat"] else None),
+            ("start_date", _canonical_date(arguments["start_date"])),
+            ("end_date", _canonical_date(arguments["end_date"])),
+            ("timespan", None if arguments["start_date"] else _canonical_timespan(arguments["timespan"])),
+            ("num_records", int(arguments["num_records"])),
+            # "> 5" and ">5" are the same threshold
+            ("tone", "".join(str(arguments["tone"]).split()) if arguments["tone"] is not None else None),
+            ("tone_abs", "".join(str(arguments["tone_abs"]).split()) if arguments["tone_abs"] is not None else None),
+            ("mode", arguments["mode"]),
+            ("sort", arguments["sort"]),
+        ]
+        return [(name, value) for name, value in items if value is not None]
+
+    def _build_fingerprint(self) -> str:
+        canonical = json.dumps(self._canonical_items(), separators=(",", ":"), sort_keys=True)
+        return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+    def __setattr__(self, name: str, value) -> None:
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"Filters are immutable, use replace({name}=...) instead")
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("Filters are immutable")
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Filters):
+            return NotImplemented
+        return self._fingerprint == other._fingerprint
+
+    def __hash__(self) -> int:
+        return hash(self._fingerprint)
+
+    def __repr__(self) -> str:
+        return f"Filters({', '.join(f'{name}={value!r}' for name, value in self._canonical_items())})"
+
     @staticmethod
     def _filter_to_string(name: str, f: Filter) -> str:
         """
@@ -283,5 +434,32 @@ class Filters:
         if unit == "min" and int(value) < 15:
             raise ValueError(f"Timespan {timespan} is invalid. Period must be at least 15 minutes")
 
+    def validate_themes(self, registry: Optional["ThemeRegistry"] = None) -> None:
+        """
+        Validate that the `theme` filter only holds GKG themes listed in LOOKUP-GKGTHEMES.TXT.
+        Raises a `ValueError` listing the unknown themes.
+
+        Params
+        ------
+        registry
+            The themes to check against. Defaults to `gdeltdoc.themes.get_theme_registry()`,
+            which raises `FileNotFoundError` if the lookup file isn't available.
+
+        Returns
+        -------
+        None
+        """
+        themes = _canonical_terms(self._arguments["theme"])
+        if not themes:
+            return
+
+        if registry is None:
+            from gdeltdoc.themes import get_theme_registry
+            registry = get_theme_registry()
+
+        unknown = registry.unknown(themes)
+        if unknown:
+            raise ValueError(f"Unknown GKG themes: {', '.join(unknown)}. Valid themes are listed in {registry.path}")
+
     def __str__(self) -> str:
         return "Filters applied: " + "\n".join(self.query_params)
@@ -1,29 +1,168 @@
 import json
+import re
 
+from datetime import datetime, timedelta
+from string import ascii_lowercase
+from typing import Any, Optional, Tuple
 
-def load_json(json_message, max_recursion_depth: int = 100, recursion_depth: int = 0):
+
+# A JSON string literal, allowing anything after a backslash and raw control characters,
+# which are exactly the mistakes found in GDELT responses
+_STRING_LITERAL = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_NEEDS_REPAIR = re.compile(r"[\\\x00-\x1f]")
+_ESCAPE_OR_CONTROL = re.compile(r'\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})|[\\\x00-\x1f]')
+
+
+def sanitize_json(json_message: str) -> Tuple[str, int]:
+    """
+    Replace the invalid escapes and control characters inside the string literals of a JSON
+    document with spaces, in a single pass.
+
+    Valid escapes such as `\\"`, `\\n` or `\\u00e8` are kept, while a backslash starting an invalid
+    escape (eg. `\\'`) and raw control characters (eg. a newline in a title) are replaced with a
+    space, which is what `json.loads` needs to parse the document.
+
+    Returns
+    -------
+    Tuple[str, int]
+        The sanitized document and the number of characters replaced.
+    """
+    repairs = 0
+
+    def repair_char(match: re.Match) -> str:
+        nonlocal repairs
+        if len(match.group(0)) > 1:
+            return match.group(0)
+        repairs += 1
+        return " "
+
+    def repair_string(match: re.Match) -> str:
+        literal = match.group(0)
+        if not _NEEDS_REPAIR.search(literal):
+            return literal
+        return _ESCAPE_OR_CONTROL.sub(repair_char, literal)
+
+    sanitized = _STRING_LITERAL.sub(repair_string, json_message)
+    return sanitized, repairs
+
+
+def load_json(json_message, max_repairs: Optional[int] = 100):
     """
-    tries to load a json formatted string and removes offending characters if present
+    Load a json formatted string or bytes, replacing offending characters if present.
     https://stackoverflow.com/questions/37805751/simplejson-scanner-jsondecodeerror-invalid-x-escape-sequence-us-line-1-colu
 
-    :param json_message:
-    :param max_recursion_depth:
-    :param recursion_depth:
-    :return:
+    Valid documents are parsed directly. Otherwise the invalid escapes and control characters are
+    replaced by `sanitize_json` in one pass and the result is parsed, so the cost stays linear in
+    the size of the document however many characters need replacing.
+
+    :param json_message: the JSON document, as str or UTF-8 bytes
+    :param max_repairs: the maximum number of characters which can be replaced, or None for no limit
+    :return: the parsed document
+    """
+    return parse_json(json_message, max_repairs)[0]
+
+
+def parse_json(json_message, max_repairs: Optional[int] = None) -> Tuple[Any, int]:
+    """
+    Same as `load_json`, but also returns the number of characters which were replaced.
     """
+    if isinstance(json_message, bytes):
+        json_message = json_message.decode("utf-8")
+
     try:
-        result = json.loads(json_message)
-    except Exception as e:
-        if recursion_depth >= max_recursion_depth:
-            raise ValueError("Max Recursion depth is reached. JSON can´t be parsed!")
-        # Find the offending character index:
-        idx_to_replace = int(e.pos)
-        # Remove the offending character:
-        if isinstance(json_message, bytes):
-            json_message.decode("utf-8")
-        json_message = list(json_message)
-        json_message[idx_to_replace] = ' '
-        new_message = ''.join(str(m) for m in json_message)
-        return load_json(json_message=new_message, max_recursion_depth=max_recursion_depth,
-                         recursion_depth=recursion_depth+1)
-    return result
+        return json.loads(json_message), 0
+    except json.JSONDecodeError:
+        pass
+
+    sanitized, repairs = sanitize_json(json_message)
+    if max_repairs is not None and repairs > max_repairs:
+        raise ValueError(f"{repairs} characters need replacing, more than the maximum of {max_repairs}. JSON can´t be parsed!")
+
+    try:
+        return json.loads(sanitized), repairs
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON can´t be parsed after replacing {repairs} characters: {e}")
+
+
+def parse_gdelt_datetime(value: str) -> datetime:
+    """
+    Parse a date accepted by `Filters` (YYYY-MM-DD, YYYYMMDD or YYYYMMDDHHMMSS) into a datetime.
+    """
+    digits = value.replace("-", "").replace(":", "").replace(" ", "")
+    return datetime.strptime(digits.ljust(14, "0"), "%Y%m%d%H%M%S")
+
+
+def format_gdelt_datetime(value: datetime) -> str:
+    """
+    Format a datetime as the YYYYMMDDHHMMSS string used by the API.
+    """
+    return value.strftime("%Y%m%d%H%M%S")
+
+
+def timespan_to_timedelta(timespan: str) -> timedelta:
+    """
+    Convert a `Filters` timespan such as 15min, 24h, 7d, 2w or 3m into a timedelta.
+    Months are counted as 30 days.
+    """
+    value = timespan.rstrip(ascii_lowercase)
+    unit = timespan[len(value):]
+    amount = int(value)
+
+    if unit == "min":
+        return timedelta(minutes=amount)
+    if unit in ("h", "hours"):
+        return timedelta(hours=amount)
+    if unit in ("d", "days"):
+        return timedelta(days=amount)
+    if unit in ("w", "weeks"):
+        return timedelta(weeks=amount)
+    if unit in ("m", "months"):
+        return timedelta(days=30 * amount)
+    raise ValueError(f"Timespan {timespan} is invalid. {unit} is not a supported unit")
+
+
+# Columns of the artlist results holding a few values repeated over many articles
+CATEGORICAL_ARTICLE_COLUMNS = ["domain", "language", "sourcecountry"]
+ARTICLE_OUTPUTS = ["object", "compact", "arrow"]
+
+
+def compact_articles(articles, output: str = "compact"):
+    """
+    Convert a DataFrame of artlist results to compact dtypes.
+
+    With `output="compact"`, `domain`, `language` and `sourcecountry` become categoricals and
+    `seendate` (eg. 20250528T004500Z) a UTC datetime. With `output="arrow"`, the same columns use
+    pyarrow dictionary and timestamp types and the other text columns pyarrow strings, which
+    requires `pyarrow`. With `output="object"` the DataFrame is returned unchanged.
+    """
+    if output not in ARTICLE_OUTPUTS:
+        raise ValueError(f"output must be one of {', '.join(ARTICLE_OUTPUTS)}, not {output}")
+    if output == "object" or articles.empty:
+        return articles
+
+    import pandas as pd
+
+    articles = articles.copy()
+    if "seendate" in articles:
+        articles["seendate"] = pd.to_datetime(articles["seendate"], format="%Y%m%dT%H%M%SZ", utc=True, errors="coerce")
+
+    if output == "compact":
+        for column in CATEGORICAL_ARTICLE_COLUMNS:
+            if column in articles:
+                articles[column] = articles[column].astype("category")
+        return articles
+
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("output='arrow' requires pyarrow: pip install pyarrow")
+
+    dtypes = {}
+    for column in articles.columns:
+        if column == "seendate":
+            dtypes[column] = pd.ArrowDtype(pa.timestamp("s", tz="UTC"))
+        elif column in CATEGORICAL_ARTICLE_COLUMNS:
+            dtypes[column] = pd.ArrowDtype(pa.dictionary(pa.int32(), pa.string()))
+        elif articles[column].dtype == object or pd.api.types.is_string_dtype(articles[column]):
+            dtypes[column] = pd.ArrowDtype(pa.string())
+    return articles.astype(dtypes)
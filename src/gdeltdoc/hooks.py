@@ -0,0 +1,180 @@
+import json
+import math
+import threading
+
+from typing import Callable, Dict, List, Optional
+
+PERCENTILES = [50, 90, 95, 99]
+
+
+class RequestEvent:
+    """
+    What happened during a single `GdeltDoc._query` call. Passed to the client's observers once
+    the call finishes, successfully or not.
+
+    Attributes
+    ----------
+    mode
+        The API mode queried.
+    query_string
+        The query string sent to the API.
+    latency
+        The time spent in `_query`, in seconds, including rate limiting, retries and parsing.
+    response_bytes
+        The size of the response body. 0 for cache hits.
+    status_code
+        The HTTP status code of the response, or None for cache hits and network errors.
+    retries
+        The number of retries after throttled responses.
+    cache_hit
+        Whether the response came from the client's cache.
+    shared
+        Whether the call waited for the same query sent by another thread instead of sending it.
+    parse_repairs
+        The number of invalid characters replaced to parse the response.
+    parse_failed
+        Whether the response couldn't be parsed, in which case `_query` returned an empty dict.
+    rows
+        The number of articles, or of timeline data points, in the response.
+    error
+        The exception raised by `_query`, if any.
+    """
+
+    __slots__ = [
+        "mode", "query_string", "latency", "response_bytes", "status_code", "retries",
+        "cache_hit", "shared", "parse_repairs", "parse_failed", "rows", "error",
+    ]
+
+    def __init__(self, mode: str, query_string: str) -> None:
+        self.mode = mode
+        self.query_string = query_string
+        self.latency = 0.0
+        self.response_bytes = 0
+        self.status_code: Optional[int] = None
+        self.retries = 0
+        self.cache_hit = False
+        self.shared = False
+        self.parse_repairs = 0
+        self.parse_failed = False
+        self.rows = 0
+        self.error: Optional[BaseException] = None
+
+    def as_dict(self) -> Dict:
+        event = {name: getattr(self, name) for name in self.__slots__}
+        event["error"] = repr(self.error) if self.error is not None else None
+        return event
+
+    def __repr__(self) -> str:
+        return f"RequestEvent({self.as_dict()})"
+
+
+# Observers are plain callables taking a RequestEvent
+RequestObserver = Callable[[RequestEvent], None]
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(percentile / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class RequestStats:
+    """
+    Observer aggregating the request events of one or more clients, by mode.
+
+    ```
+    from gdeltdoc import GdeltDoc, RequestStats
+
+    stats = RequestStats()
+    gd = GdeltDoc(observers=[stats])
+    ...
+    print(stats.report())
+    stats.dump("request_stats.json")
+    ```
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, List[float]] = {}
+        self._sizes: Dict[str, List[int]] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def __call__(self, event: RequestEvent) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(event.mode, {
+                "requests": 0, "errors": 0, "cache_hits": 0, "shared": 0, "retries": 0,
+                "parse_repairs": 0, "parse_failures": 0, "rows": 0, "bytes": 0,
+            })
+            counters["requests"] += 1
+            counters["errors"] += event.error is not None
+            counters["cache_hits"] += event.cache_hit
+            counters["shared"] += event.shared
+            counters["retries"] += event.retries
+            counters["parse_repairs"] += event.parse_repairs
+            counters["parse_failures"] += event.parse_failed
+            counters["rows"] += event.rows
+            counters["bytes"] += event.response_bytes
+
+            self._latencies.setdefault(event.mode, []).append(event.latency)
+            if not event.cache_hit and event.error is None:
+                self._sizes.setdefault(event.mode, []).append(event.response_bytes)
+
+    def summary(self) -> Dict[str, Dict]:
+        """
+        Return the counters and the latency (seconds) and response size (bytes) percentiles of
+        every mode, plus the totals over all modes under "all".
+        """
+        with self._lock:
+            modes = {mode: (list(self._latencies.get(mode, [])), list(self._sizes.get(mode, [])), dict(counters))
+                     for mode, counters in self._counters.items()}
+
+        if modes:
+            total_counters = {name: sum(c[name] for _, _, c in modes.values()) for name in next(iter(modes.values()))[2]}
+            modes["all"] = (
+                [latency for latencies, _, _ in modes.values() for latency in latencies],
+                [size for _, sizes, _ in modes.values() for size in sizes],
+                total_counters,
+            )
+
+        summary = {}
+        for mode, (latencies, sizes, counters) in modes.items():
+            latencies.sort()
+            sizes.sort()
+            summary[mode] = {
+                **counters,
+                "latency": {f"p{p}": _percentile(latencies, p) for p in PERCENTILES},
+                "response_bytes": {f"p{p}": _percentile(sizes, p) for p in PERCENTILES},
+            }
+            summary[mode]["latency"]["max"] = latencies[-1] if latencies else 0.0
+        return summary
+
+    def report(self) -> str:
+        """
+        Return the summary as a text table, one line per mode.
+        """
+        lines = [f"{'mode':<22}{'requests':>9}{'errors':>8}{'cache':>7}{'retries':>9}{'repairs':>9}"
+                 f"{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'p50 KiB':>10}"]
+        for mode, stats in self.summary().items():
+            lines.append(
+                f"{mode:<22}{stats['requests']:>9}{stats['errors']:>8}{stats['cache_hits']:>7}{stats['retries']:>9}"
+                f"{stats['parse_repairs']:>9}{stats['latency']['p50']:>9.3f}{stats['latency']['p95']:>9.3f}"
+                f"{stats['latency']['p99']:>9.3f}{stats['response_bytes']['p50'] / 1024:>10.1f}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, path: str) -> None:
+        """
+        Write the summary to a JSON file.
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=4)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._latencies.clear()
+            self._sizes.clear()
+            self._counters.clear()
@@ -0,0 +1,271 @@
+import re
+
+from itertools import product
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+from gdeltdoc.filters import Filters
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+Window = Tuple[str, str]
+
+_THRESHOLD = re.compile(r"^\s*([<>])\s*(-?\d+(?:\.\d+)?)\s*$")
+
+
+def load_country_names(path: str) -> Dict[str, str]:
+    """
+    Load a tab separated file of FIPS country codes and country names, like
+    `1_Filters_list/countries.txt`, into a `{code: name}` dict.
+    """
+    names = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if "\t" in line:
+                code, name = line.split("\t", 1)
+                names[code.strip()] = name.strip()
+    return names
+
+
+def _loosest_thresholds(tones: List[Optional[str]]) -> List[Optional[str]]:
+    """
+    Reduce a ladder of tone thresholds to the loosest threshold in each direction.
+
+    eg. [">0", ">5", ">10", "<-5", "<-10"] -> [">0", "<-5"]
+
+    The articles matching `>5` are a subset of the ones matching `>0`, so querying `>0` alone
+    returns every article of the ladder. Values which aren't a simple threshold can't be
+    compared and are kept as they are.
+    """
+    loosest: Dict[str, Tuple[float, str]] = {}
+    others: List[Optional[str]] = []
+
+    for tone in tones:
+        match = _THRESHOLD.match(tone) if tone else None
+        if not match:
+            if tone not in others:
+                others.append(tone)
+            continue
+
+        direction, value = match.group(1), float(match.group(2))
+        current = loosest.get(direction)
+        if current is None or (value < current[0] if direction == ">" else value > current[0]):
+            loosest[direction] = (value, tone)
+
+    return [tone for _, tone in loosest.values()] + others
+
+
+def _covers(loose: Optional[str], tone: Optional[str]) -> bool:
+    """
+    Return True if every article matching the `tone` threshold also matches `loose`.
+    """
+    if loose == tone:
+        return True
+    loose_match = _THRESHOLD.match(loose) if loose else None
+    tone_match = _THRESHOLD.match(tone) if tone else None
+    if not loose_match or not tone_match or loose_match.group(1) != tone_match.group(1):
+        return False
+    if loose_match.group(1) == ">":
+        return float(loose_match.group(2)) <= float(tone_match.group(2))
+    return float(loose_match.group(2)) >= float(tone_match.group(2))
+
+
+def _chunks(values: List, size: int) -> List[List]:
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+class PlannedQuery:
+    """
+    A single API query produced by `plan_queries`, with the buckets of the original
+    `window × country × theme × tone` loop that it covers.
+    """
+
+    def __init__(
+        self,
+        window: Window,
+        countries: List[str],
+        themes: List[str],
+        tone_abs: Optional[str],
+        tones: List[Optional[str]],
+        filter_arguments: Dict,
+    ) -> None:
+        self.window = window
+        self.countries = countries
+        self.themes = themes
+        self.tone_abs = tone_abs
+        self.tones = tones
+
+        self.filters = Filters(
+            start_date=window[0],
+            end_date=window[1],
+            country=countries[0] if len(countries) == 1 else countries,
+            theme=themes[0] if len(themes) == 1 else themes,
+            tone_abs=tone_abs,
+            **filter_arguments,
+        )
+
+    @property
+    def buckets(self) -> List[Tuple[Window, str, str, Optional[str]]]:
+        """
+        The `(window, country, theme, tone)` buckets of the original loop covered by this query.
+        """
+        return [(self.window, c, t, tone) for c, t, tone in product(self.countries, self.themes, self.tones)]
+
+    def assign_buckets(
+        self,
+        articles: "pd.DataFrame",
+        country_names: Optional[Dict[str, str]] = None,
+        limit: Optional[int] = None,
+    ) -> "pd.DataFrame":
+        """
+        Label the articles returned by this query with the finer bucket they belong to.
+
+        Adds the columns `country`, `theme` and `tone_abs`. The country is resolved from the
+        `sourcecountry` column, which holds the country name, using `country_names`
+        (`{FIPS code: name}`). The artlist results don't include the themes or the tone of the
+        articles, so `theme` is only set when the query covers a single theme and `tone_abs` is
+        the loosest threshold which matched. Values which can't be resolved are left missing.
+
+        Params
+        ------
+        articles
+            The articles returned by this query.
+
+        country_names
+            The `{FIPS code: name}` dict returned by `load_country_names`.
+
+        limit
+            Keep at most `limit` articles per bucket, in the order they were returned (see the
+            `sort` filter), like the `num_records` of one query per bucket. An unresolved country
+            or theme stands for every value the query merged, and gets that many times `limit`.
+        """
+        articles = articles.copy()
+
+        if len(self.countries) == 1:
+            articles["country"] = self.countries[0]
+        elif country_names and "sourcecountry" in articles:
+            codes = {country_names[c].lower(): c for c in self.countries if c in country_names}
+            articles["country"] = articles["sourcecountry"].astype(object).map(
+                lambda name: codes.get(name.lower()) if isinstance(name, str) else None
+            )
+        else:
+            articles["country"] = None
+
+        articles["theme"] = self.themes[0] if len(self.themes) == 1 else None
+        articles["tone_abs"] = self.tone_abs
+
+        if limit is not None and not articles.empty:
+            rank = articles.groupby(["country", "theme"], dropna=False, sort=False).cumcount()
+            merged = articles["country"].isna().map({True: len(self.countries), False: 1})
+            merged *= len(self.themes) if articles["theme"].isna().all() else 1
+            articles = articles[rank < merged * limit]
+        return articles
+
+    def __repr__(self) -> str:
+        return f"PlannedQuery({self.filters.query_string!r}, buckets={len(self.buckets)})"
+
+
+class QueryPlan:
+    """
+    The queries produced by `plan_queries`, in window order.
+    """
+
+    def __init__(self, queries: List[PlannedQuery], naive_calls: int) -> None:
+        self.queries = queries
+        self.naive_calls = naive_calls
+
+    @property
+    def planned_calls(self) -> int:
+        return len(self.queries)
+
+    @property
+    def calls_saved(self) -> int:
+        """
+        The estimated number of API calls saved compared to one call per bucket. Windows split
+        by `article_search_all` cost extra calls, which aren't known in advance.
+        """
+        return self.naive_calls - self.planned_calls
+
+    def by_window(self) -> Dict[Window, List[PlannedQuery]]:
+        """
+        Group the queries by window, keeping the window order.
+        """
+        grouped: Dict[Window, List[PlannedQuery]] = {}
+        for query in self.queries:
+            grouped.setdefault(query.window, []).append(query)
+        return grouped
+
+    def summary(self) -> str:
+        saved = self.calls_saved / self.naive_calls if self.naive_calls else 0
+        return f"{self.naive_calls} naive API calls -> {self.planned_calls} planned calls ({self.calls_saved} saved, {saved:.0%})"
+
+    def __iter__(self) -> Iterator[PlannedQuery]:
+        return iter(self.queries)
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+
+def plan_queries(
+    windows: List[Window],
+    countries: List[str],
+    themes: List[str],
+    tones: List[Optional[str]],
+    max_or_terms: int = 10,
+    merge_countries: bool = True,
+    merge_themes: bool = True,
+    merge_tones: bool = True,
+    **filter_arguments,
+) -> QueryPlan:
+    """
+    Plan the API queries needed to cover every `window × country × theme × tone_abs` bucket
+    with as few calls as possible.
+
+    ```
+    plan = plan_queries(
+        windows=[("20250101000000", "20250101080000")],
+        countries=["US", "UK", "IT"],
+        themes=["ELECTION", "ELECTION_FRAUD"],
+        tones=[">0", ">5", ">10"],
+        mode="artlist",
+    )
+    print(plan.summary())  # 18 naive API calls -> 1 planned calls (17 saved, 94%)
+    ```
+
+    Countries and themes are merged into OR lists of at most `max_or_terms` terms each, and a
+    ladder of nested tone thresholds is reduced to its loosest threshold. Set `merge_countries`,
+    `merge_themes` or `merge_tones` to False to keep that dimension as one query per value,
+    eg. when the results need to be labelled by theme.
+
+    Merged queries return more articles, so they should be run with
+    `GdeltDoc.article_search_all` to avoid the 250 articles cap.
+
+    Params
+    ------
+    windows
+        The (start_date, end_date) windows to search.
+
+    countries, themes, tones
+        The values of the `country`, `theme` and `tone_abs` filters in the original loop.
+
+    filter_arguments
+        Other arguments passed to every `Filters`, eg. `mode` or `sort`.
+    """
+    if "num_records" not in filter_arguments:
+        filter_arguments["num_records"] = 250
+
+    country_groups = _chunks(countries, max_or_terms) if merge_countries else [[c] for c in countries]
+    theme_groups = _chunks(themes, max_or_terms) if merge_themes else [[t] for t in themes]
+    if merge_tones:
+        tone_groups = [(tone, [t for t in tones if _covers(tone, t)]) for tone in _loosest_thresholds(tones)]
+    else:
+        tone_groups = [(tone, [tone]) for tone in tones]
+
+    queries = [
+        PlannedQuery(window, country_group, theme_group, tone, covered, filter_arguments)
+        for window in windows
+        for country_group in country_groups
+        for theme_group in theme_groups
+        for tone, covered in tone_groups
+    ]
+    return QueryPlan(queries, len(windows) * len(countries) * len(themes) * len(tones))
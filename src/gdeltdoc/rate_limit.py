@@ -0,0 +1,161 @@
+import random
+import threading
+import time
+
+from typing import Dict
+
+# GDELT answers over-eager clients with a plain text message starting with this sentence
+THROTTLE_MESSAGE = "please limit requests"
+THROTTLE_STATUS_CODES = [429, 503]
+
+
+def is_throttled(status_code: int, content_type: str, body: bytes) -> bool:
+    """
+    Return True if an API response means the client is being throttled.
+    """
+    if status_code in THROTTLE_STATUS_CODES:
+        return True
+    if "json" in content_type:
+        return False
+    return THROTTLE_MESSAGE in body[:500].decode("utf-8", "ignore").lower()
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter with adaptive backoff, shared by every thread (and every
+    `AsyncGdeltDoc` task) using the same `GdeltDoc` client.
+
+    ```
+    from gdeltdoc import GdeltDoc, RateLimiter
+
+    gd = GdeltDoc(rate_limiter=RateLimiter(rate=0.2, max_rate=1))
+    ```
+
+    Requests wait for a token before being sent. Every successful request raises the rate by
+    `increase_step`, up to `max_rate`; every throttled response divides it by two, down to
+    `min_rate`, and the throttled request is retried after a jittered exponential backoff.
+    The rate therefore settles just below the highest rate GDELT accepts.
+    """
+
+    def __init__(
+        self,
+        rate: float = 0.2,
+        max_rate: float = 1.0,
+        min_rate: float = 0.05,
+        burst: int = 1,
+        increase_step: float = 0.01,
+        max_retries: int = 5,
+        base_delay: float = 5.0,
+        max_delay: float = 120.0,
+    ) -> None:
+        """
+        Params
+        ------
+        rate
+            The initial number of requests per second. GDELT documents a limit of one request every
+            5 seconds, hence the default of 0.2.
+
+        max_rate
+            The highest rate the limiter will ramp up to while requests succeed.
+
+        min_rate
+            The lowest rate the limiter will slow down to while requests are throttled.
+
+        burst
+            The number of requests that can be sent back to back after an idle period.
+
+        increase_step
+            How much the rate grows, in requests per second, after each successful request.
+
+        max_retries
+            How many times a throttled request is retried before raising `RateLimitError`.
+
+        base_delay
+            The backoff before the first retry, in seconds. Doubles at every retry.
+
+        max_delay
+            The longest backoff before a retry, in seconds.
+        """
+        if not 0 < min_rate <= rate <= max_rate:
+            raise ValueError(f"Rates must satisfy 0 < min_rate <= rate <= max_rate, not {min_rate}, {rate}, {max_rate}")
+
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.increase_step = increase_step
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.held_back = 0
+        self.total_wait = 0.0
+        self.throttled = 0
+        self.retries = 0
+
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Block until the next request can be sent. Returns the number of seconds waited.
+
+        A caller that has to wait reserves its token straight away, so concurrent callers queue
+        up behind each other instead of all waking at the same time.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            wait = -self._tokens / self.rate
+            self.held_back += 1
+            self.total_wait += wait
+
+        time.sleep(wait)
+        return wait
+
+    def on_success(self) -> None:
+        """
+        Record a request accepted by the API and ramp the rate up.
+        """
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttle(self, attempt: int) -> float:
+        """
+        Record a throttled response to retry number `attempt` (0 for the first request) which is
+        going to be retried, halve the rate and return how long to wait before retrying. The backoff
+        is drawn uniformly up to the exponential bound ("full jitter") so that threads throttled
+        together don't retry together.
+        """
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            # Drain the bucket so that every thread slows down, not only the throttled one
+            self._tokens = min(self._tokens, 0.0)
+            self.throttled += 1
+            self.retries += 1
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(float(self.burst), self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return the limiter counters: requests held back and for how long, throttled responses,
+        retries and the current rate.
+        """
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "held_back": self.held_back,
+                "total_wait": self.total_wait,
+                "throttled": self.throttled,
+                "retries": self.retries,
+            }
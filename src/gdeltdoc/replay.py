@@ -0,0 +1,311 @@
+"""
+Record real DOC API responses and replay them from a local HTTP server, to load test the
+client, AutoScraper and the dashboard without hitting api.gdeltproject.org.
+
+Record while running normally:
+
+```
+from gdeltdoc import GdeltDoc
+from gdeltdoc.replay import RecordingSession
+
+gd = GdeltDoc(session=RecordingSession("recordings"))
+```
+
+Then replay, from the command line:
+
+```
+python -m gdeltdoc.replay recordings --port 8765 --latency 0.3 --error-rate 0.02 --max-rps 5
+```
+
+or from Python:
+
+```
+with ReplayServer("recordings", latency=0.3) as server:
+    gd = GdeltDoc(base_url=server.base_url)
+```
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote_plus, urlsplit
+
+import requests
+
+from gdeltdoc.rate_limit import THROTTLE_STATUS_CODES
+
+DOC_PATH = "/api/v2/doc/doc"
+THROTTLE_BODY = b"Please limit requests to one every 5 seconds or contact kalev.leetaru5@gmail.com for larger queries."
+INDEX_FILE = "index.jsonl"
+
+
+def replay_key(url: str) -> str:
+    """
+    Build the key a response is recorded and replayed under from the request URL.
+
+    The client sends its query string unencoded, so its `&name=value` parameters become URL
+    parameters. They are decoded, stripped of `format=json` and sorted.
+    """
+    query = urlsplit(url).query
+    params = []
+    for param in query.split("&"):
+        param = " ".join(unquote_plus(param).split())
+        if param and param != "format=json":
+            params.append(param)
+    return "&".join(sorted(params))
+
+
+class RecordingSession:
+    """
+    Wrapper around a `requests.Session` which saves every DOC API response it receives to
+    `directory`, to be served later by `ReplayServer`.
+
+    The bodies are saved as they are, including malformed JSON and error pages, in files named
+    after their hash, and listed in `index.jsonl` with their status code and content type.
+    """
+
+    def __init__(self, directory: str, session: Optional[requests.Session] = None) -> None:
+        self.directory = directory
+        self.session = session if session is not None else requests.Session()
+        self.recorded = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        response = self.session.get(url, **kwargs)
+        self.record(url, response.status_code, response.headers.get("content-type", ""), response.content)
+        return response
+
+    def record(self, url: str, status_code: int, content_type: str, body: bytes) -> None:
+        digest = hashlib.sha1(body).hexdigest()
+        body_file = f"{digest}.body"
+        entry = {
+            "key": replay_key(url),
+            "status": status_code,
+            "content_type": content_type,
+            "body_file": body_file,
+            "recorded_at": time.time(),
+        }
+
+        with self._lock:
+            body_path = os.path.join(self.directory, body_file)
+            if not os.path.exists(body_path):
+                with open(body_path, "wb") as f:
+                    f.write(body)
+            with open(os.path.join(self.directory, INDEX_FILE), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.recorded += 1
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __getattr__(self, name):
+        # Everything else (headers, mount, ...) is the wrapped session's
+        return getattr(self.session, name)
+
+
+def load_recordings(directory: str) -> Dict[str, Tuple[int, str, bytes]]:
+    """
+    Load the responses saved by `RecordingSession` as `{key: (status, content_type, body)}`.
+    Throttled responses are left out, and the last recording of a query wins.
+    """
+    recordings = {}
+    with open(os.path.join(directory, INDEX_FILE), "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry["status"] in THROTTLE_STATUS_CODES:
+                continue
+            with open(os.path.join(directory, entry["body_file"]), "rb") as body:
+                recordings[entry["key"]] = (entry["status"], entry["content_type"], body.read())
+    return recordings
+
+
+class ReplayServer:
+    """
+    Local HTTP server replaying recorded DOC API responses, with configurable latency, errors
+    and throttling.
+
+    Queries which weren't recorded get an empty result (`{}`), like a query matching no articles.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        max_rps: Optional[float] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        Params
+        ------
+        directory
+            A directory of recordings made by `RecordingSession`. If None, every query gets an empty result.
+
+        host, port
+            Where to listen. Port 0 picks a free port, see `base_url`.
+
+        latency
+            Seconds to wait before answering each request.
+
+        jitter
+            Extra random latency, uniformly distributed between 0 and `jitter` seconds.
+
+        error_rate
+            Share of requests answered with a 500 error.
+
+        throttle_rate
+            Share of requests answered with GDELT's throttling response, at random.
+
+        max_rps
+            Requests per second above which requests are answered with GDELT's throttling
+            response, measured over the last second.
+
+        seed
+            Seed for the random errors, throttling and jitter.
+        """
+        self.recordings = load_recordings(directory) if directory else {}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+
+        self.stats = {"requests": 0, "replayed": 0, "missing": 0, "errors": 0, "throttled": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent: deque = deque()
+        self._thread: Optional[threading.Thread] = None
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{DOC_PATH}"
+
+    def respond(self, url: str) -> Tuple[int, str, bytes]:
+        """
+        Decide the response to a request, as (status, content_type, body). The latency is applied
+        by the request handler.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.stats["requests"] += 1
+
+            self._recent.append(now)
+            while self._recent and self._recent[0] <= now - 1:
+                self._recent.popleft()
+            over_rate = self.max_rps is not None and len(self._recent) > self.max_rps
+
+            draw = self._random.random()
+            if over_rate or draw < self.throttle_rate:
+                self.stats["throttled"] += 1
+                return 429, "text/plain", THROTTLE_BODY
+            if draw < self.throttle_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return 500, "text/html", b"Internal Server Error"
+
+            recording = self.recordings.get(replay_key(url))
+            if recording is None:
+                self.stats["missing"] += 1
+                return 200, "application/json; charset=utf-8", b"{}"
+            self.stats["replayed"] += 1
+            return recording
+
+    def _delay(self) -> float:
+        with self._lock:
+            return self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if urlsplit(self.path).path != DOC_PATH:
+                    self.send_error(404)
+                    return
+
+                status, content_type, body = server.respond(self.path)
+                delay = server._delay()
+                if delay:
+                    time.sleep(delay)
+
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "ReplayServer":
+        """
+        Serve in a background thread.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, name="gdeltdoc-replay", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "ReplayServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded GDELT DOC API responses.")
+    parser.add_argument("directory", nargs="?", help="directory of recordings made by RecordingSession")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of random throttling responses")
+    parser.add_argument("--max-rps", type=float, default=None, help="throttle above this many requests per second")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = ReplayServer(
+        args.directory, args.host, args.port, args.latency, args.jitter,
+        args.error_rate, args.throttle_rate, args.max_rps, args.seed,
+    )
+    print(f"Replaying {len(server.recordings)} recorded responses at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(server.stats)
+
+
+if __name__ == "__main__":
+    main()
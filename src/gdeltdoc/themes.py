@@ -0,0 +1,321 @@
+"""
+Registry of the GKG themes accepted by the `theme` filter, built from GDELT's
+LOOKUP-GKGTHEMES.TXT (one `THEME<TAB>article count` line per theme).
+
+```
+from gdeltdoc.themes import get_theme_registry
+
+themes = get_theme_registry()
+"ELECTION" in themes                     # True, O(log n)
+themes.search("WB_", limit=10)           # the 10 WB_ themes with the most articles
+themes.search("TAX_FNCACT_*", by_volume=False)
+```
+
+The themes are kept as a sorted list with their counts in a parallel array, so that lookups
+and prefix searches are binary searches. The range of each theme family (the part before the
+first `_`, eg. `TAX` or `WB`) is remembered to narrow down the following searches.
+Parsing the lookup file and sorting it can be done once: the result is saved next to it as a
+compressed `.idx` file, which is loaded instead as long as the lookup file doesn't change.
+Loading never writes the index, so the package data stays read-only: after updating the
+lookup file, rebuild the index with
+
+    python -m gdeltdoc.themes 1_Filters_list/LOOKUP-GKGTHEMES.TXT
+"""
+import argparse
+import hashlib
+import heapq
+import json
+import os
+import sys
+import time
+import zlib
+
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_LOOKUP = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "1_Filters_list", "LOOKUP-GKGTHEMES.TXT"
+)
+
+INDEX_MAGIC = b"GKGTHEMES1\n"
+
+
+def _file_sha1(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _index_is_fresh(header: Dict, source_path: str) -> bool:
+    """
+    Whether an index header describes the current content of `source_path`. The size and
+    modification time are checked first, the file is only hashed when the modification time
+    changed (eg. after a fresh checkout) but the size didn't.
+    """
+    stat = os.stat(source_path)
+    if "source_size" in header and header["source_size"] != stat.st_size:
+        return False
+    if header.get("source_mtime_ns") == stat.st_mtime_ns:
+        return True
+    return header["source_sha1"] == _file_sha1(source_path)
+
+
+class ThemeRegistry:
+    """
+    Sorted, read-only set of GKG themes with their article counts.
+    """
+
+    def __init__(self, names: List[str], counts: array, path: Optional[str] = None) -> None:
+        """
+        Params
+        ------
+        names
+            The theme names, sorted and without duplicates.
+
+        counts
+            An `array("q")` of article counts, aligned with `names`.
+
+        path
+            The lookup file the themes were read from, if any.
+        """
+        if len(names) != len(counts):
+            raise ValueError(f"Got {len(names)} themes but {len(counts)} counts")
+
+        self.names = names
+        self.counts = counts
+        self.path = path
+        self._by_volume: Optional[List[int]] = None
+
+        # (start, end) range of the themes of each family in `names`, filled on first use
+        self._families: Dict[str, Tuple[int, int]] = {}
+
+    @classmethod
+    def from_lookup(cls, path: str) -> "ThemeRegistry":
+        """
+        Parse a LOOKUP-GKGTHEMES.TXT file. Lines without a count get a count of 0, and a
+        theme listed twice keeps its highest count.
+        """
+        themes: Dict[str, int] = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                name, _, count = line.partition("\t")
+                name = name.strip()
+                if not name:
+                    continue
+                count = int(count) if count.strip() else 0
+                themes[name] = max(count, themes.get(name, 0))
+
+        names = sorted(themes)
+        return cls(names, array("q", (themes[name] for name in names)), path)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_LOOKUP, index_path: Optional[str] = None) -> "ThemeRegistry":
+        """
+        Load the themes of the lookup file at `path`, from its prebuilt index when it's up to
+        date. Otherwise the lookup file is parsed; the index is only written by `write_index`,
+        see `python -m gdeltdoc.themes`.
+
+        Params
+        ------
+        path
+            The LOOKUP-GKGTHEMES.TXT file.
+
+        index_path
+            The prebuilt index. Defaults to `path` + ".idx".
+        """
+        index_path = index_path or path + ".idx"
+
+        try:
+            registry = cls.read_index(index_path, path)
+        except (OSError, ValueError, KeyError, zlib.error):
+            registry = None
+
+        if registry is None:
+            registry = cls.from_lookup(path)
+
+        registry.path = path
+        return registry
+
+    def write_index(self, index_path: str, source_path: str) -> None:
+        """
+        Serialize the registry, tagged with the hash, size and modification time of the lookup
+        file at `source_path` it was built from.
+        """
+        stat = os.stat(source_path)
+        header = json.dumps({
+            "source_sha1": _file_sha1(source_path),
+            "source_size": stat.st_size,
+            "source_mtime_ns": stat.st_mtime_ns,
+            "themes": len(self.names),
+            "byteorder": sys.byteorder,
+        })
+        payload = header.encode("utf-8") + b"\n" + "\n".join(self.names).encode("utf-8") + b"\0" + self.counts.tobytes()
+
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(INDEX_MAGIC)
+            f.write(zlib.compress(payload, 9))
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def read_index(cls, index_path: str, source_path: Optional[str] = None) -> Optional["ThemeRegistry"]:
+        """
+        Load a registry saved by `write_index`. Returns None if the index is out of date with
+        the lookup file at `source_path`.
+        """
+        with open(index_path, "rb") as f:
+            data = f.read()
+        if not data.startswith(INDEX_MAGIC):
+            raise ValueError(f"{index_path} is not a GKG themes index")
+
+        payload = zlib.decompress(data[len(INDEX_MAGIC):])
+        header, _, payload = payload.partition(b"\n")
+        header = json.loads(header)
+        if source_path is not None and not _index_is_fresh(header, source_path):
+            return None
+
+        # Theme names never contain NUL, so the first one ends the names
+        names, _, counts_bytes = payload.partition(b"\0")
+        counts = array("q")
+        counts.frombytes(counts_bytes)
+        if header["byteorder"] != sys.byteorder:
+            counts.byteswap()
+        names = names.decode("utf-8").split("\n") if names else []
+
+        if len(names) != header["themes"]:
+            raise ValueError(f"{index_path} is corrupted")
+        return cls(names, counts)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, theme: str) -> bool:
+        return self._position(theme) is not None
+
+    def _position(self, theme: str) -> Optional[int]:
+        i = bisect_left(self.names, theme)
+        if i < len(self.names) and self.names[i] == theme:
+            return i
+        return None
+
+    def count(self, theme: str) -> int:
+        """
+        Return the number of articles of `theme` in the lookup file, 0 if it's unknown.
+        """
+        i = self._position(theme)
+        return self.counts[i] if i is not None else 0
+
+    def unknown(self, themes: List[str]) -> List[str]:
+        """
+        Return the themes of `themes` which aren't in the registry.
+        """
+        return [theme for theme in themes if theme not in self]
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """
+        Return the (start, end) range of the themes starting with `prefix` in `names`.
+        A trailing `*`, as in `WB_*`, is ignored.
+        """
+        prefix = prefix.strip().rstrip("*").upper()
+        if not prefix:
+            return 0, len(self.names)
+
+        family, separator, _ = prefix.partition("_")
+        lo, hi = self._family_range(family) if separator else (0, len(self.names))
+        return self._range(prefix, lo, hi)
+
+    def _range(self, prefix: str, lo: int, hi: int) -> Tuple[int, int]:
+        start = bisect_left(self.names, prefix, lo, hi)
+        # Sorts after every character a theme name can contain
+        end = bisect_left(self.names, prefix + "\U0010ffff", start, hi)
+        return start, end
+
+    def _family_range(self, family: str) -> Tuple[int, int]:
+        """
+        Return the range of the themes starting with `family_`, which narrows down the search
+        of every longer prefix of the family.
+        """
+        if family not in self._families:
+            self._families[family] = self._range(family + "_", 0, len(self.names))
+        return self._families[family]
+
+    def search(self, prefix: str = "", limit: Optional[int] = None, by_volume: bool = True) -> List[str]:
+        """
+        Return the themes starting with `prefix`, eg. "WB_" or "TAX_FNCACT_*".
+
+        Params
+        ------
+        prefix
+            The start of the theme names. An empty prefix matches every theme.
+
+        limit
+            The maximum number of themes to return.
+
+        by_volume
+            Order the themes by number of articles, most covered first, instead of by name.
+        """
+        start, end = self.prefix_range(prefix)
+
+        if not by_volume:
+            end = end if limit is None else min(end, start + limit)
+            return self.names[start:end]
+
+        if start == 0 and end == len(self.names):
+            order = self._volume_order()
+            return [self.names[i] for i in (order if limit is None else order[:limit])]
+
+        positions = range(start, end)
+        if limit is not None and limit < end - start:
+            top = heapq.nlargest(limit, positions, key=self.counts.__getitem__)
+        else:
+            top = sorted(positions, key=self.counts.__getitem__, reverse=True)
+        return [self.names[i] for i in top]
+
+    def top(self, n: int) -> List[str]:
+        """
+        Return the `n` themes with the most articles.
+        """
+        return self.search("", limit=n)
+
+    def families(self) -> Dict[str, int]:
+        """
+        Return the number of themes of each family (the part of the name before the first `_`).
+        """
+        families: Dict[str, int] = {}
+        for name in self.names:
+            family = name.split("_", 1)[0]
+            families[family] = families.get(family, 0) + 1
+        return families
+
+    def _volume_order(self) -> List[int]:
+        if self._by_volume is None:
+            self._by_volume = sorted(range(len(self.names)), key=self.counts.__getitem__, reverse=True)
+        return self._by_volume
+
+    def __repr__(self) -> str:
+        return f"ThemeRegistry({len(self.names)} themes, path={self.path!r})"
+
+
+@lru_cache(maxsize=None)
+def get_theme_registry(path: str = DEFAULT_LOOKUP) -> ThemeRegistry:
+    """
+    Return the registry of the lookup file at `path`, loading it on the first call.
+    Raises `FileNotFoundError` if the file doesn't exist.
+    """
+    return ThemeRegistry.load(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the prebuilt index of a LOOKUP-GKGTHEMES.TXT file.")
+    parser.add_argument("lookup", nargs="?", default=DEFAULT_LOOKUP)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    registry = ThemeRegistry.from_lookup(args.lookup)
+    registry.write_index(args.lookup + ".idx", args.lookup)
+    print(f"Indexed {len(registry)} themes in {time.perf_counter() - start:.2f}s -> {args.lookup}.idx")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+from scraping.fetcher import AsyncFetcher, DownloadAborted, FetchResult, HTML_CONTENT_TYPES, host_of
+from scraping.extract import extract_article
+from scraping.seen import SeenIndex
+from scraping.store import ArticleStore
+from scraping.html_cache import HtmlCache, CachedPage
+from scraping.politeness import DomainScheduler, RobotsCache
+from scraping.metrics import ScrapeMetrics, LatencyHistogram
+from scraping.failures import FailureRegistry, classify
+from scraping.urls import URLNormalizer, canonical_url, duplicated_urls
+from scraping.journal import RunJournal
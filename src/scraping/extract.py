@@ -0,0 +1,65 @@
+import json
+import logging
+import multiprocessing
+
+import trafilatura
+
+logger = logging.getLogger(__name__)
+
+
+def extract_article(raw_html, url):
+    """
+    Utilizza trafilatura per pulire il testo estratto e recuperare metadati come titolo e lingua.
+
+    È una funzione di modulo, e non un metodo, perché deve poter girare in un processo separato.
+
+    :param raw_html: L'HTML scaricato.
+    :param url: L'URL della pagina, usato da trafilatura per i metadati.
+    :return: Una tupla (testo, titolo, lingua), con None per i valori non estratti.
+    """
+    if not raw_html:
+        logger.debug("Nessun HTML grezzo fornito per l'URL: %s", url)
+        return None, None, None # testo, titolo, lingua
+
+    try:
+        extracted = trafilatura.extract(
+            raw_html,
+            url=url,
+            include_links=False,
+            include_comments=False,
+            favor_precision=True,
+            output_format="json"
+        )
+    except Exception as e:
+        # Lo stack trace solo a livello DEBUG: a piena concorrenza renderebbe illeggibile il log
+        logger.warning("Eccezione durante l'estrazione con Trafilatura per URL: %s - %s", url, e,
+                       exc_info=logger.isEnabledFor(logging.DEBUG), extra={"event": "extract_error", "url": url})
+        return None, None, None
+
+    if not extracted:
+        logger.debug("Trafilatura non ha estratto alcun contenuto per l'URL: %s", url)
+        return None, None, None
+
+    try:
+        data = json.loads(extracted)
+    except json.JSONDecodeError as e:
+        # trafilatura serializza il JSON con json.dumps: non si ripete l'estrazione, costosa, in formato testo
+        logger.warning("Trafilatura ha restituito un JSON non valido per %s: %s", url, e,
+                       extra={"event": "extract_error", "url": url})
+        return None, None, None
+
+    logger.debug("Trafilatura ha estratto testo, titolo e lingua per %s", url)
+    return data.get('text'), data.get('title'), data.get('language')
+
+
+def extraction_context():
+    """
+    Contesto multiprocessing per il pool di estrazione.
+
+    Si usa "forkserver" dove disponibile, altrimenti "spawn": "fork" duplicherebbe un processo
+    con thread attivi (event loop, pool di download, connessioni SQLite). Con entrambi i processi
+    figli reimportano il modulo principale, quindi gli script vanno protetti da `if __name__ == "__main__"`.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
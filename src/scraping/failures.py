@@ -0,0 +1,258 @@
+import os
+import sqlite3
+import threading
+import time
+
+from scraping.fetcher import host_of
+from scraping.seen import url_hash
+from scraping.urls import canonical_url
+
+DEFAULT_FAILURE_REGISTRY = "raw_text_data/failures.sqlite"
+
+# Classi di errore: i transitori (timeout, errori di rete, 429, 5xx) vengono ritentati con backoff,
+# i permanenti (4xx, contenuti non supportati, robots.txt) e le pagine senza testo estraibile no
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+EMPTY = "empty"
+
+# Limite di SQLite ai parametri di una singola query, con margine
+_MAX_PARAMS = 500
+
+
+def classify(result):
+    """
+    Classe di errore di un `FetchResult` fallito.
+
+    :return: `TRANSIENT` o `PERMANENT`.
+    """
+    if result.permanent:
+        return PERMANENT
+    code = result.status_code
+    if code is None or code in (408, 425, 429) or code >= 500:
+        return TRANSIENT
+    return PERMANENT
+
+
+class FailureRegistry:
+    """
+    Registro persistente degli URL falliti, con la classe di errore per URL e per dominio, per non
+    sprecare tempo dei worker su URL che falliscono sempre allo stesso modo.
+
+    - Un URL con errore permanente o senza testo estraibile viene saltato per `permanent_ttl` secondi.
+    - Un URL con errore transitorio viene saltato fino al prossimo tentativo, programmato con backoff
+      esponenziale (`base_backoff`, raddoppiato a ogni errore, fino a `max_backoff`); `due` restituisce
+      quelli da ritentare. Dopo `max_attempts` errori diventa permanente.
+    - Un dominio i cui URL falliscono quasi sempre in modo permanente (es. paywall, 403) viene saltato
+      per intero per `domain_ttl` secondi, dopo almeno `domain_min_failures` errori.
+
+    Un URL scaricato con successo esce dal registro. Gli URL sono confrontati per chiave canonica
+    (vedi `URLNormalizer`), quindi un errore vale anche per le altre versioni dello stesso articolo.
+    """
+
+    def __init__(self, path=DEFAULT_FAILURE_REGISTRY, permanent_ttl=30 * 24 * 3600, base_backoff=3600,
+                 max_backoff=7 * 24 * 3600, max_attempts=5, domain_min_failures=20, domain_failure_ratio=0.9,
+                 domain_ttl=7 * 24 * 3600, url_key=canonical_url):
+        """
+        :param path: Il file SQLite del registro. La directory viene creata se manca.
+        :param permanent_ttl: Secondi per cui un URL con errore permanente viene saltato.
+        :param base_backoff: Secondi prima del primo nuovo tentativo di un URL con errore transitorio.
+        :param max_backoff: Attesa massima tra due tentativi, in secondi.
+        :param max_attempts: Errori transitori dopo cui l'URL viene trattato come permanente.
+        :param domain_min_failures: Errori permanenti di un dominio necessari per saltarlo.
+        :param domain_failure_ratio: Quota minima di errori permanenti sulle richieste del dominio per saltarlo.
+        :param domain_ttl: Secondi per cui un dominio viene saltato.
+        :param url_key: Funzione che calcola la chiave canonica di un URL; None per confrontare gli URL esatti.
+        """
+        self.path = path
+        self.permanent_ttl = permanent_ttl
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.domain_min_failures = domain_min_failures
+        self.domain_failure_ratio = domain_failure_ratio
+        self.domain_ttl = domain_ttl
+        self.url_key = url_key
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS failures ("
+            "hash INTEGER PRIMARY KEY, url TEXT NOT NULL, host TEXT NOT NULL, failure_class TEXT NOT NULL, "
+            "reason TEXT, attempts INTEGER NOT NULL, first_failed REAL NOT NULL, last_failed REAL NOT NULL, "
+            "retry_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS failures_due ON failures (failure_class, retry_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS domains ("
+            "host TEXT PRIMARY KEY, transient INTEGER NOT NULL DEFAULT 0, permanent INTEGER NOT NULL DEFAULT 0, "
+            "successes INTEGER NOT NULL DEFAULT 0, last_reason TEXT, blocked_until REAL)"
+        )
+
+    def _hash(self, url):
+        return url_hash(self.url_key(url) if self.url_key is not None else url)
+
+    def _transaction(self, body):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = body()
+                self._conn.execute("COMMIT")
+                return result
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def record_failures(self, failures):
+        """
+        Registra un batch di URL falliti e programma il prossimo tentativo.
+
+        :param failures: Tuple (url, classe di errore, motivo), con classe `TRANSIENT`, `PERMANENT` o `EMPTY`.
+        """
+        failures = list(failures)
+        if not failures:
+            return
+
+        def body():
+            now = time.time()
+            for url, failure_class, reason in failures:
+                key = self._hash(url)
+                host = host_of(url)
+                previous = self._conn.execute(
+                    "SELECT attempts, first_failed FROM failures WHERE hash = ?", (key,)
+                ).fetchone()
+                attempts = previous[0] + 1 if previous else 1
+                if failure_class == TRANSIENT and attempts >= self.max_attempts:
+                    failure_class = PERMANENT
+                if failure_class == TRANSIENT:
+                    delay = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+                else:
+                    delay = self.permanent_ttl
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO failures (hash, url, host, failure_class, reason, attempts, "
+                    "first_failed, last_failed, retry_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, url, host, failure_class, reason, attempts, previous[1] if previous else now, now, now + delay),
+                )
+                self._record_domain(host, failure_class, reason, now)
+
+        self._transaction(body)
+
+    def _record_domain(self, host, failure_class, reason, now):
+        column = "transient" if failure_class == TRANSIENT else "permanent"
+        self._conn.execute("INSERT OR IGNORE INTO domains (host) VALUES (?)", (host,))
+        self._conn.execute(
+            f"UPDATE domains SET {column} = {column} + 1, last_reason = ? WHERE host = ?", (reason, host)
+        )
+        if column != "permanent":
+            return
+        permanent, successes = self._conn.execute(
+            "SELECT permanent, successes FROM domains WHERE host = ?", (host,)
+        ).fetchone()
+        if permanent >= self.domain_min_failures and permanent >= self.domain_failure_ratio * (permanent + successes):
+            # I contatori ripartono da zero: alla scadenza il dominio viene rivalutato da capo
+            self._conn.execute(
+                "UPDATE domains SET transient = 0, permanent = 0, successes = 0, blocked_until = ? WHERE host = ?",
+                (now + self.domain_ttl, host),
+            )
+
+    def record_successes(self, urls):
+        """Toglie dal registro gli URL scaricati con successo e lo conta per il loro dominio."""
+        urls = list(urls)
+        if not urls:
+            return
+
+        def body():
+            self._conn.executemany("DELETE FROM failures WHERE hash = ?", [(self._hash(url),) for url in urls])
+            hosts = {}
+            for url in urls:
+                host = host_of(url)
+                hosts[host] = hosts.get(host, 0) + 1
+            self._conn.executemany("INSERT OR IGNORE INTO domains (host) VALUES (?)", [(host,) for host in hosts])
+            self._conn.executemany(
+                "UPDATE domains SET successes = successes + ? WHERE host = ?", [(n, host) for host, n in hosts.items()]
+            )
+
+        self._transaction(body)
+
+    def blocked(self, urls):
+        """
+        Restituisce gli URL di `urls` da saltare ora: quelli in attesa del prossimo tentativo e quelli
+        dei domini esclusi.
+
+        :param urls: Gli URL da verificare.
+        :return: Un dizionario {url: motivo}.
+        """
+        now = time.time()
+        by_hash = {}
+        by_host = {}
+        for url in urls:
+            by_hash.setdefault(self._hash(url), []).append(url)
+            by_host.setdefault(host_of(url), []).append(url)
+
+        found = {}
+        with self._lock:
+            keys = list(by_hash)
+            for i in range(0, len(keys), _MAX_PARAMS):
+                chunk = keys[i:i + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                for key, failure_class, reason in self._conn.execute(
+                    f"SELECT hash, failure_class, reason FROM failures WHERE retry_at > ? AND hash IN ({placeholders})",
+                    [now, *chunk],
+                ):
+                    for url in by_hash[key]:
+                        found[url] = f"{failure_class}: {reason}"
+
+            hosts = list(by_host)
+            for i in range(0, len(hosts), _MAX_PARAMS):
+                chunk = hosts[i:i + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                for host, reason in self._conn.execute(
+                    f"SELECT host, last_reason FROM domains WHERE blocked_until > ? AND host IN ({placeholders})",
+                    [now, *chunk],
+                ):
+                    for url in by_host[host]:
+                        found.setdefault(url, f"dominio escluso: {reason}")
+        return found
+
+    def due(self, limit=None):
+        """
+        Restituisce gli URL con errore transitorio il cui nuovo tentativo è scaduto, dal più vecchio.
+
+        :param limit: Numero massimo di URL restituiti.
+        """
+        with self._lock:
+            return [url for (url,) in self._conn.execute(
+                "SELECT url FROM failures WHERE failure_class = ? AND retry_at <= ? ORDER BY retry_at LIMIT ?",
+                (TRANSIENT, time.time(), -1 if limit is None else limit),
+            )]
+
+    def stats(self):
+        """
+        Restituisce il numero di URL per classe di errore, gli URL da ritentare e i domini esclusi.
+        """
+        now = time.time()
+        with self._lock:
+            by_class = dict(self._conn.execute("SELECT failure_class, COUNT(*) FROM failures GROUP BY failure_class"))
+            due = self._conn.execute(
+                "SELECT COUNT(*) FROM failures WHERE failure_class = ? AND retry_at <= ?", (TRANSIENT, now)
+            ).fetchone()[0]
+            blocked_domains = [host for (host,) in self._conn.execute(
+                "SELECT host FROM domains WHERE blocked_until > ? ORDER BY host", (now,)
+            )]
+        return {"failures": by_class, "due": due, "blocked_domains": blocked_domains}
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM failures").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
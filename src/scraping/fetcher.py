@@ -0,0 +1,329 @@
+import asyncio
+import functools
+import logging
+import sqlite3
+import time
+
+from email.utils import parsedate_to_datetime
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterable, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.compat import chardet
+
+from scraping.html_cache import HtmlCache
+from scraping.politeness import DomainScheduler
+
+logger = logging.getLogger(__name__)
+
+
+# Tipi di contenuto che trafilatura sa elaborare; le risposte senza Content-Type vengono accettate
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain", "application/xml", "text/xml")
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def _iter_body(response):
+    """
+    Itera sul corpo di una risposta in streaming. Con urllib3 >= 2.3 ogni blocco viene restituito
+    appena arriva, così la durata massima viene verificata anche sulle pagine che arrivano lentamente.
+    """
+    raw = response.raw
+    if not hasattr(raw, "read1"):
+        yield from response.iter_content(chunk_size=_CHUNK_SIZE)
+        return
+    while True:
+        chunk = raw.read1(_CHUNK_SIZE, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+
+class DownloadAborted(Exception):
+    """Download interrotto prima di leggere tutto il corpo della risposta."""
+
+    def __init__(self, message, status_code=None, permanent=True):
+        super().__init__(message)
+        self.status_code = status_code
+        self.permanent = permanent
+
+
+class FetchResult:
+    """
+    Esito del download di un URL.
+
+    :param url: L'URL richiesto.
+    :param status_code: Lo status HTTP della risposta, None se la richiesta non è arrivata al server.
+    :param html: Il corpo della risposta decodificato, None in caso di errore.
+    :param error: La descrizione dell'errore, None se il download è riuscito.
+    :param elapsed: I secondi impiegati dal download, attesa dello slot esclusa.
+    :param retry_after: I secondi indicati dall'header Retry-After di una risposta 429/503, se presente.
+    :param permanent: Se True l'errore non dipende dal momento (es. contenuto non supportato, robots.txt)
+        e ritentare non serve.
+    """
+
+    __slots__ = ["url", "status_code", "html", "error", "elapsed", "retry_after", "permanent"]
+
+    def __init__(self, url, status_code=None, html=None, error=None, elapsed=0.0, retry_after=None, permanent=False):
+        self.url = url
+        self.status_code = status_code
+        self.html = html
+        self.error = error
+        self.elapsed = elapsed
+        self.retry_after = retry_after
+        self.permanent = permanent
+
+    @property
+    def ok(self):
+        return self.html is not None
+
+    def __repr__(self):
+        return f"FetchResult({self.url!r}, status_code={self.status_code}, ok={self.ok}, error={self.error!r})"
+
+
+def host_of(url):
+    """Restituisce l'host di un URL in minuscolo, senza 'www.'."""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def parse_retry_after(value):
+    """Converte l'header Retry-After (secondi o data HTTP) in secondi di attesa, None se assente o non valido."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AsyncFetcher:
+    """
+    Motore di download asincrono con limite di concorrenza globale e per dominio.
+
+    Le richieste partono da una sessione `requests` con pool di connessioni condiviso, su un pool
+    di thread, e sono schedulate da asyncio: un task attende prima lo slot del proprio dominio
+    (nella coda del `DomainScheduler`) e poi quello globale, così i domini molto frequenti non
+    occupano slot globali mentre aspettano e i domini della coda lunga continuano a scaricare.
+
+    ```
+    fetcher = AsyncFetcher(max_concurrency=200, max_per_host=4)
+    async for result in fetcher.fetch_many(urls):
+        ...
+    ```
+
+    Con una `HtmlCache` l'HTML scaricato viene salvato in cache e le richieste per gli URL già
+    presenti sono condizionali (If-None-Match / If-Modified-Since): con un 304 Not Modified la
+    pagina viene letta dalla cache senza scaricarla di nuovo.
+    """
+
+    def __init__(self, max_concurrency=64, max_per_host=4, timeout=15, session=None, headers=None,
+                 html_cache: Optional[HtmlCache] = None, max_bytes=5 * 1024 * 1024, deadline=30,
+                 content_types=HTML_CONTENT_TYPES, scheduler: Optional[DomainScheduler] = None):
+        """
+        :param max_concurrency: Numero massimo di download contemporanei.
+        :param max_per_host: Numero massimo di download contemporanei verso lo stesso dominio.
+        :param timeout: Timeout di connessione e lettura delle richieste, in secondi.
+        :param session: Sessione `requests` opzionale. Se assente ne viene creata una con un pool
+            di connessioni dimensionato sui limiti.
+        :param headers: Header aggiuntivi inviati con ogni richiesta.
+        :param html_cache: Cache opzionale dell'HTML scaricato, usata anche per le richieste condizionali.
+        :param max_bytes: Dimensione massima del corpo di una risposta, in byte: le pagine più grandi
+            vengono scartate, senza scaricarle se lo dichiara già il Content-Length.
+        :param deadline: Durata massima di una richiesta in secondi, lettura del corpo compresa.
+            Il `timeout` limita invece ogni singola operazione sul socket. None per non limitarla.
+        :param content_types: Tipi di contenuto accettati; le altre risposte (PDF, video, ...)
+            vengono scartate dopo aver letto solo gli header. None per accettare tutto.
+        :param scheduler: `DomainScheduler` opzionale, con robots.txt e concorrenza adattiva per dominio.
+            Se assente ogni dominio ha un limite fisso di `max_per_host` download.
+        """
+        if max_concurrency < 1 or max_per_host < 1:
+            raise ValueError(f"I limiti di concorrenza devono essere almeno 1, non {max_concurrency} e {max_per_host}")
+
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+        self.scheduler = scheduler if scheduler is not None else DomainScheduler(max_per_host, adaptive=False)
+        self.timeout = timeout
+        self.headers = dict(headers) if headers else {}
+        self.html_cache = html_cache
+        self.max_bytes = max_bytes
+        self.deadline = deadline
+        self.content_types = tuple(content_types) if content_types else None
+
+        self._owns_session = session is None
+        self.session = session if session is not None else self._build_session(max_concurrency, max_per_host)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="fetcher")
+
+        # Il semaforo asyncio appartiene a un event loop: viene ricreato a ogni nuovo loop
+        self._loop = None
+        self._global_slots: Optional[asyncio.Semaphore] = None
+
+    @staticmethod
+    def _build_session(max_concurrency, max_per_host):
+        session = requests.Session()
+        # Un pool di connessioni keep-alive per dominio, per al massimo `max_concurrency` domini
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_per_host)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def fetch_sync(self, url):
+        """
+        Scarica un URL in modo bloccante, senza limiti di concorrenza.
+
+        :param url: L'URL da scaricare.
+        :return: Un `FetchResult`.
+        """
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, timeout=self.timeout, headers=self._request_headers(url), stream=True)
+            if response.status_code == 304:
+                response.close()
+                page = self.html_cache.get(url) if self.html_cache is not None else None
+                if page is not None:
+                    self.html_cache.touch(url)
+                    return FetchResult(url, 304, page.html, elapsed=time.perf_counter() - start)
+                # La pagina è uscita dalla cache dopo l'invio della richiesta: si scarica senza condizioni
+                response = self.session.get(url, timeout=self.timeout, headers=self.headers, stream=True)
+
+            with response:
+                response.raise_for_status()
+                html = self._read_text(response, start)
+            self._cache_response(url, html, response)
+            return FetchResult(url, response.status_code, html, elapsed=time.perf_counter() - start)
+        except DownloadAborted as e:
+            return FetchResult(url, e.status_code, error=str(e), elapsed=time.perf_counter() - start,
+                               permanent=e.permanent)
+        except requests.exceptions.HTTPError as e:
+            return FetchResult(url, e.response.status_code, error=str(e), elapsed=time.perf_counter() - start,
+                               retry_after=parse_retry_after(e.response.headers.get("Retry-After")))
+        except requests.exceptions.Timeout as e:
+            return FetchResult(url, error=f"Timeout raggiunto: {e}", elapsed=time.perf_counter() - start)
+        except Exception as e:
+            return FetchResult(url, error=f"Richiesta fallita: {e}", elapsed=time.perf_counter() - start)
+
+    def _read_text(self, response, start):
+        """
+        Legge e decodifica il corpo di una risposta in streaming, interrompendo il download appena
+        il tipo di contenuto, la dimensione o la durata superano i limiti del fetcher.
+        """
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if self.content_types is not None and content_type and content_type not in self.content_types:
+            raise DownloadAborted(f"Tipo di contenuto non supportato: {content_type}", response.status_code)
+
+        declared = response.headers.get("Content-Length")
+        if self.max_bytes is not None and declared and declared.isdigit() and int(declared) > self.max_bytes:
+            raise DownloadAborted(
+                f"Pagina troppo grande: {declared} byte dichiarati, limite {self.max_bytes}", response.status_code
+            )
+
+        body = bytearray()
+        for chunk in _iter_body(response):
+            body += chunk
+            if self.max_bytes is not None and len(body) > self.max_bytes:
+                raise DownloadAborted(f"Pagina troppo grande: oltre {self.max_bytes} byte", response.status_code)
+            if self.deadline is not None and time.perf_counter() - start > self.deadline:
+                raise DownloadAborted(f"Durata massima di {self.deadline}s superata", response.status_code, permanent=False)
+
+        # Come `response.text`: la codifica degli header, altrimenti quella rilevata dal contenuto
+        encoding = response.encoding or chardet.detect(bytes(body))["encoding"] or "utf-8"
+        try:
+            return body.decode(encoding, errors="replace")
+        except LookupError:
+            return body.decode("utf-8", errors="replace")
+
+    def _request_headers(self, url):
+        """Header della richiesta, con i validatori salvati in cache per una richiesta condizionale."""
+        if self.html_cache is None:
+            return self.headers
+        try:
+            validators = self.html_cache.validators(url)
+        except sqlite3.Error as e:
+            logger.warning("Cache HTML non leggibile per %s: %s", url, e, extra={"event": "cache_error", "url": url})
+            return self.headers
+        if validators is None:
+            return self.headers
+
+        etag, last_modified = validators
+        headers = dict(self.headers)
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def _cache_response(self, url, html, response):
+        if self.html_cache is None:
+            return
+        try:
+            self.html_cache.put(url, html, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        except sqlite3.Error as e:
+            # Un errore della cache non deve far perdere la pagina scaricata
+            logger.warning("Impossibile salvare l'HTML di %s in cache: %s", url, e,
+                           extra={"event": "cache_error", "url": url})
+
+    def _global_slot(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._global_slots = asyncio.Semaphore(self.max_concurrency)
+        return self._global_slots
+
+    async def fetch(self, url, on_result=None):
+        """
+        Scarica un URL rispettando i limiti di concorrenza.
+
+        :param url: L'URL da scaricare.
+        :param on_result: Coroutine opzionale chiamata col risultato prima di liberare lo slot,
+            es. `queue.put` di una coda limitata: se chi consuma i risultati è in ritardo, i
+            download rallentano invece di accumulare HTML in memoria.
+        :return: Un `FetchResult`.
+        """
+        host = host_of(url)
+        blocked = await self.scheduler.check(url, host, self._executor)
+        if blocked is not None:
+            result = FetchResult(url, error=blocked, permanent=True)
+            if on_result is not None:
+                await on_result(result)
+            return result
+
+        async with self.scheduler.slot(host):
+            async with self._global_slot():
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self._executor, functools.partial(self.fetch_sync, url))
+                self.scheduler.record(host, result)
+                if on_result is not None:
+                    await on_result(result)
+                return result
+
+    async def fetch_many(self, urls: Iterable[str]) -> AsyncIterator[FetchResult]:
+        """
+        Scarica tutti gli URL e restituisce i risultati man mano che arrivano.
+
+        :param urls: Gli URL da scaricare.
+        """
+        tasks = [asyncio.ensure_future(self.fetch(url)) for url in urls]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def close(self):
+        """Chiude il pool di thread e la sessione, se creata dal fetcher."""
+        self._executor.shutdown(wait=True)
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
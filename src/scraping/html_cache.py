@@ -0,0 +1,238 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+DEFAULT_HTML_CACHE = "raw_text_data/html_cache.sqlite"
+
+
+class CachedPage:
+    """
+    Pagina HTML salvata nella cache.
+
+    :param url: L'URL della pagina.
+    :param html: L'HTML decodificato.
+    :param etag: L'header ETag della risposta, se presente.
+    :param last_modified: L'header Last-Modified della risposta, se presente.
+    :param fetched_at: Timestamp dell'ultimo download (o conferma con 304) della pagina.
+    :param content_hash: SHA-1 dell'HTML, chiave del contenuto nella cache.
+    """
+
+    __slots__ = ["url", "html", "etag", "last_modified", "fetched_at", "content_hash"]
+
+    def __init__(self, url, html, etag=None, last_modified=None, fetched_at=None, content_hash=None):
+        self.url = url
+        self.html = html
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.content_hash = content_hash
+
+    def __repr__(self):
+        return f"CachedPage({self.url!r}, content_hash={self.content_hash!r}, etag={self.etag!r})"
+
+
+def content_hash(html):
+    """SHA-1 esadecimale dell'HTML, usato come chiave del contenuto."""
+    return hashlib.sha1(html.encode("utf-8")).hexdigest()
+
+
+class HtmlCache:
+    """
+    Cache compressa dell'HTML grezzo scaricato, in un file SQLite, per ripetere l'estrazione
+    (es. dopo aver cambiato le impostazioni di trafilatura) senza scaricare di nuovo gli articoli.
+
+    Le pagine sono indicizzate per URL e il contenuto è indirizzato per hash: URL diversi con
+    lo stesso HTML (versioni mobile, AMP, mirror) condividono un solo blob compresso con zlib.
+    Per ogni URL restano anche ETag e Last-Modified, usati dal fetcher per le richieste
+    condizionali. Superato `max_bytes` vengono eliminati i contenuti usati meno di recente: la
+    dimensione totale resta in una riga di `meta`, aggiornata nella stessa transazione di ogni
+    scrittura, così un salvataggio non somma tutti i blob.
+    """
+
+    def __init__(self, path=DEFAULT_HTML_CACHE, max_bytes=2 * 1024 ** 3):
+        """
+        :param path: Il file SQLite della cache. La directory viene creata se manca.
+        :param max_bytes: Dimensione massima dei contenuti compressi, in byte.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Il contenuto è l'ultima colonna: leggere le altre non attraversa le sue pagine di overflow
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            "hash TEXT PRIMARY KEY, size INTEGER NOT NULL, last_access REAL NOT NULL, body BLOB NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, hash TEXT NOT NULL, etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS blobs_lru ON blobs (last_access, size)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_hash ON pages (hash)")
+        # Il totale viene calcolato una sola volta, alla creazione della riga
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._conn.execute("SELECT 1 FROM meta WHERE name = 'total_bytes'").fetchone() is None:
+                self._conn.execute(
+                    "INSERT INTO meta (name, value) SELECT 'total_bytes', COALESCE(SUM(size), 0) FROM blobs"
+                )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def put(self, url, html, etag=None, last_modified=None):
+        """
+        Salva l'HTML di un URL, sostituendo la versione precedente.
+
+        :param url: L'URL della pagina.
+        :param html: L'HTML decodificato.
+        :param etag: L'header ETag della risposta.
+        :param last_modified: L'header Last-Modified della risposta.
+        :return: L'hash del contenuto.
+        """
+        key = content_hash(html)
+        now = time.time()
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (key,)).fetchone() is not None
+        # La compressione avviene fuori dal lock, e solo per i contenuti nuovi
+        body = None if exists else zlib.compress(html.encode("utf-8"))
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                previous = self._conn.execute("SELECT hash FROM pages WHERE url = ?", (url,)).fetchone()
+                if body is not None:
+                    inserted = self._conn.execute(
+                        "INSERT OR IGNORE INTO blobs (hash, size, last_access, body) VALUES (?, ?, ?, ?)",
+                        (key, len(body), now, body),
+                    ).rowcount
+                    self._add_bytes(len(body) if inserted else 0)
+                else:
+                    self._conn.execute("UPDATE blobs SET last_access = ? WHERE hash = ?", (now, key))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO pages (url, hash, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                    (url, key, etag, last_modified, now),
+                )
+                if previous is not None and previous[0] != key:
+                    self._drop_orphan(previous[0])
+                self._evict()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return key
+
+    def _add_bytes(self, delta):
+        if delta:
+            self._conn.execute("UPDATE meta SET value = value + ? WHERE name = 'total_bytes'", (delta,))
+
+    def _total_bytes(self):
+        return self._conn.execute("SELECT value FROM meta WHERE name = 'total_bytes'").fetchone()[0]
+
+    def _drop_orphan(self, key):
+        if self._conn.execute("SELECT 1 FROM pages WHERE hash = ?", (key,)).fetchone() is not None:
+            return
+        row = self._conn.execute("SELECT size FROM blobs WHERE hash = ?", (key,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM blobs WHERE hash = ?", (key,))
+            self._add_bytes(-row[0])
+
+    def _evict(self):
+        """
+        Elimina i contenuti usati meno di recente, con le relative pagine, finché la cache non rientra in `max_bytes`.
+        Va chiamata dentro la transazione di `put`.
+        """
+        total = self._total_bytes()
+        freed = 0
+        while total - freed > self.max_bytes:
+            # Le vittime vengono lette dall'indice (last_access, size), poche alla volta
+            victims = self._conn.execute("SELECT hash, size FROM blobs ORDER BY last_access LIMIT 32").fetchall()
+            if not victims:
+                break
+            for key, size in victims:
+                if total - freed <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM pages WHERE hash = ?", (key,))
+                self._conn.execute("DELETE FROM blobs WHERE hash = ?", (key,))
+                freed += size
+                self.evictions += 1
+        self._add_bytes(-freed)
+
+    def get(self, url):
+        """
+        Restituisce la pagina salvata per l'URL, None se assente.
+
+        :param url: L'URL della pagina.
+        :return: Un `CachedPage`.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pages.hash, pages.etag, pages.last_modified, pages.fetched_at, blobs.body "
+                "FROM pages JOIN blobs ON blobs.hash = pages.hash WHERE pages.url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE blobs SET last_access = ? WHERE hash = ?", (time.time(), row[0]))
+        key, etag, last_modified, fetched_at, body = row
+        return CachedPage(url, zlib.decompress(body).decode("utf-8"), etag, last_modified, fetched_at, key)
+
+    def validators(self, url):
+        """
+        Restituisce ETag e Last-Modified salvati per l'URL, senza leggere l'HTML.
+
+        :param url: L'URL della pagina.
+        :return: Una tupla (etag, last_modified), None se l'URL non è in cache o non ha validatori.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT etag, last_modified FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None or (row[0] is None and row[1] is None):
+            return None
+        return row
+
+    def touch(self, url):
+        """Segna la pagina come ancora valida (es. dopo una risposta 304 Not Modified)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (now, url))
+            self._conn.execute(
+                "UPDATE blobs SET last_access = ? WHERE hash = (SELECT hash FROM pages WHERE url = ?)", (now, url)
+            )
+
+    def urls(self):
+        """Restituisce gli URL presenti in cache, dal download più vecchio al più recente."""
+        with self._lock:
+            return [url for (url,) in self._conn.execute("SELECT url FROM pages ORDER BY fetched_at")]
+
+    def total_bytes(self):
+        """Dimensione dei contenuti compressi, in byte."""
+        with self._lock:
+            return self._total_bytes()
+
+    def __contains__(self, url):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM pages WHERE url = ?", (url,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,219 @@
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_RUN_JOURNAL = "raw_text_data/journal.sqlite"
+
+# Esito degli URL il cui articolo è stato salvato; gli altri esiti sono quelli di `URLTextProcessor.stream_articles`
+SAVED = "saved"
+
+# Un URL salvato resta salvato anche se poi arriva un altro esito (es. un duplicato saltato)
+_UPSERT_FETCH = (
+    "INSERT INTO fetches (query, url, window_start, window_end, fetched_at, outcome) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (query, url) DO UPDATE SET outcome = excluded.outcome, fetched_at = excluded.fetched_at "
+    f"WHERE excluded.outcome = '{SAVED}' AND fetches.outcome != '{SAVED}'"
+)
+
+
+class RunJournal:
+    """
+    Journal write-ahead di AutoScraper, per riprendere un run interrotto esattamente da dove si è fermato.
+
+    L'unità di lavoro è il bucket (finestra, paese, tema, tono) del ciclo originale; una query del piano
+    (`PlannedQuery` di `plan_queries`) ne copre uno o più. Il journal registra:
+
+    - gli articoli salvati da ogni query, man mano: `record_articles` li accumula in memoria e li scrive
+      a blocchi di `batch_size` (o dopo `flush_interval` secondi), in una sola transazione;
+    - gli URL della query elaborati senza salvare un articolo (download fallito, nessun testo, già visto),
+      con il loro esito: `record_outcomes`, con gli stessi blocchi;
+    - le query completate: `finish` scrive gli articoli ancora in memoria e i bucket della query nella
+      stessa transazione, quindi un'unità completata ha sempre tutti i suoi articoli nel journal.
+
+    Al riavvio `pending` restituisce solo le query con almeno un bucket da completare, e `fetched_urls`
+    gli URL già elaborati di una query interrotta a metà, con qualsiasi esito. Ogni scrittura è atomica (transazioni SQLite
+    in WAL): un'interruzione perde al più gli articoli non ancora scritti, che vanno registrati solo
+    dopo essere stati salvati nell'archivio.
+
+    ```
+    with RunJournal() as journal:
+        for query in journal.pending(plan):
+            ...
+            journal.record_articles(query, saved_articles)
+            journal.record_outcomes(query, [(url, "failed")])
+            ...
+            journal.finish(query, len(articles))
+    ```
+    """
+
+    def __init__(self, path=DEFAULT_RUN_JOURNAL, batch_size=200, flush_interval=5.0):
+        """
+        :param path: Il file SQLite del journal. La directory viene creata se manca.
+        :param batch_size: Articoli accumulati in memoria prima di scriverli.
+        :param flush_interval: Secondi dopo cui gli articoli accumulati vengono scritti anche se sono meno di `batch_size`.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS units ("
+            "window_start TEXT NOT NULL, window_end TEXT NOT NULL, country TEXT NOT NULL, theme TEXT NOT NULL, "
+            "tone TEXT NOT NULL, query TEXT NOT NULL, articles INTEGER, finished_at REAL NOT NULL, "
+            "PRIMARY KEY (window_start, window_end, country, theme, tone)) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fetches ("
+            "query TEXT NOT NULL, url TEXT NOT NULL, window_start TEXT NOT NULL, window_end TEXT NOT NULL, "
+            "fetched_at REAL NOT NULL, outcome TEXT NOT NULL DEFAULT 'saved', PRIMARY KEY (query, url)) WITHOUT ROWID"
+        )
+        # I journal creati prima degli esiti registravano solo gli articoli salvati
+        if "outcome" not in {row[1] for row in self._conn.execute("PRAGMA table_info(fetches)")}:
+            try:
+                self._conn.execute(f"ALTER TABLE fetches ADD COLUMN outcome TEXT NOT NULL DEFAULT '{SAVED}'")
+            except sqlite3.OperationalError:
+                # Aggiunta nel frattempo da un altro processo
+                pass
+        self._conn.execute("CREATE INDEX IF NOT EXISTS fetches_window ON fetches (window_start, window_end)")
+
+    @staticmethod
+    def _bucket_rows(query):
+        # Il tono può mancare (None): nella chiave primaria diventa una stringa vuota
+        return [(window[0], window[1], country, theme, tone or "") for window, country, theme, tone in query.buckets]
+
+    def _write(self, body=None):
+        """Scrive gli articoli accumulati ed esegue `body`, in un'unica transazione. Va chiamata con il lock."""
+        if not self._buffer and body is None:
+            return
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._buffer:
+                self._conn.executemany(_UPSERT_FETCH, self._buffer)
+            if body is not None:
+                body()
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def record_articles(self, query, articles):
+        """
+        Registra gli articoli salvati per una query, scrivendoli a blocchi.
+
+        :param query: La query del piano (`PlannedQuery`).
+        :param articles: Gli articoli (dizionari con almeno 'url') già salvati nell'archivio.
+        """
+        self.record_outcomes(query, ((article["url"], SAVED) for article in articles))
+
+    def record_outcomes(self, query, outcomes):
+        """
+        Registra l'esito degli URL elaborati per una query, scrivendoli a blocchi come gli articoli.
+        Al riavvio questi URL non vengono elaborati di nuovo (vedi `fetched_urls`).
+
+        :param query: La query del piano (`PlannedQuery`).
+        :param outcomes: Coppie (url, esito), es. (url, 'failed'); `SAVED` solo per gli articoli già salvati.
+        """
+        now = time.time()
+        key = query.filters.query_string
+        start, end = query.window
+        with self._lock:
+            self._buffer.extend((key, url, start, end, now, outcome) for url, outcome in outcomes)
+            if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._write()
+
+    def flush(self):
+        """Scrive gli articoli accumulati in memoria."""
+        with self._lock:
+            self._write()
+
+    def finish(self, query, articles=None):
+        """
+        Segna come completati i bucket della query, insieme agli articoli ancora in memoria.
+
+        :param query: La query del piano (`PlannedQuery`).
+        :param articles: Numero di articoli restituiti da GDELT per la query, per le statistiche.
+        """
+        key = query.filters.query_string
+        now = time.time()
+        rows = [(*bucket, key, articles, now) for bucket in self._bucket_rows(query)]
+
+        def body():
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO units (window_start, window_end, country, theme, tone, query, articles, "
+                "finished_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+        with self._lock:
+            self._write(body)
+
+    def is_finished(self, query):
+        """Indica se tutti i bucket della query sono già stati completati."""
+        buckets = self._bucket_rows(query)
+        with self._lock:
+            for bucket in buckets:
+                if self._conn.execute(
+                    "SELECT 1 FROM units WHERE window_start = ? AND window_end = ? AND country = ? AND theme = ? "
+                    "AND tone = ?", bucket
+                ).fetchone() is None:
+                    return False
+        return True
+
+    def pending(self, queries):
+        """Restituisce, nell'ordine, le query con almeno un bucket non ancora completato."""
+        return [query for query in queries if not self.is_finished(query)]
+
+    def fetched_urls(self, query):
+        """
+        Restituisce gli URL già elaborati per la query, es. dopo un'interruzione a metà: gli articoli
+        salvati e gli URL registrati con un altro esito.
+        """
+        with self._lock:
+            self._write()
+            return {url for (url,) in self._conn.execute(
+                "SELECT url FROM fetches WHERE query = ?", (query.filters.query_string,)
+            )}
+
+    def window_urls(self, window):
+        """
+        Restituisce gli URL degli articoli salvati per le query di una finestra, nell'ordine in cui
+        sono stati salvati, anche quelli dei run precedenti.
+
+        :param window: La finestra (start_date, end_date).
+        """
+        with self._lock:
+            self._write()
+            return list(dict.fromkeys(url for (url,) in self._conn.execute(
+                "SELECT url FROM fetches WHERE window_start = ? AND window_end = ? AND outcome = ? ORDER BY fetched_at",
+                (window[0], window[1], SAVED),
+            )))
+
+    def stats(self):
+        """
+        Restituisce il numero di bucket completati, di query completate, di articoli salvati e di URL
+        registrati con ogni altro esito.
+        """
+        with self._lock:
+            self._write()
+            units, queries = self._conn.execute("SELECT COUNT(*), COUNT(DISTINCT query) FROM units").fetchone()
+            outcomes = dict(self._conn.execute("SELECT outcome, COUNT(*) FROM fetches GROUP BY outcome"))
+        return {"units": units, "queries": queries, "articles": outcomes.pop(SAVED, 0), **outcomes}
+
+    def close(self):
+        with self._lock:
+            self._write()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,162 @@
+import bisect
+import json
+import threading
+import traceback
+
+# Limiti superiori, in secondi, dei bucket degli istogrammi di latenza
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGES = ("fetch", "extract", "save")
+
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """
+    Istogramma delle latenze a bucket fissi: ogni osservazione costa una ricerca binaria e la
+    memoria non cresce col numero di URL. I percentili sono approssimati al limite del bucket.
+    """
+
+    __slots__ = ["counts", "count", "total", "max"]
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percentile):
+        """Limite superiore del bucket che contiene il percentile richiesto, senza superare il massimo osservato."""
+        if not self.count:
+            return 0.0
+        rank = percentile / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(LATENCY_BUCKETS[i], self.max) if i < len(LATENCY_BUCKETS) else self.max
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            **{f"p{p}": self.percentile(p) for p in PERCENTILES},
+            "max": self.max,
+            "buckets": {str(bound): count for bound, count in zip((*LATENCY_BUCKETS, "inf"), self.counts)},
+        }
+
+
+class ScrapeMetrics:
+    """
+    Contatori, istogrammi di latenza per stadio (download, estrazione, salvataggio) e campioni
+    degli errori di un `URLTextProcessor`, per tutta la vita dell'istanza.
+
+    Degli errori vengono conservati solo i primi `error_samples` per tipo (con URL e messaggio),
+    mentre il conteggio resta completo.
+
+    ```
+    processor = URLTextProcessor()
+    ...
+    print(processor.metrics.report())
+    processor.metrics.dump("scrape_metrics.json")
+    ```
+    """
+
+    def __init__(self, error_samples=5):
+        """
+        :param error_samples: Errori conservati per ogni coppia (stadio, tipo di errore).
+        """
+        self.error_samples = error_samples
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._latencies = {stage: LatencyHistogram() for stage in STAGES}
+        self._errors = {}
+
+    def count(self, name, n=1):
+        """Incrementa il contatore `name`."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe(self, stage, seconds):
+        """Registra la durata di un'operazione dello stadio `stage`."""
+        with self._lock:
+            histogram = self._latencies.get(stage)
+            if histogram is None:
+                histogram = self._latencies[stage] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def error(self, stage, kind, url, message, exc=None):
+        """
+        Registra un errore, conservandone i dettagli solo se è tra i primi `error_samples` del suo tipo.
+
+        :param stage: Lo stadio in cui si è verificato, es. "fetch".
+        :param kind: Il tipo di errore, usato per raggrupparli, es. "HTTP 404".
+        :param url: L'URL coinvolto.
+        :param message: La descrizione dell'errore.
+        :param exc: L'eccezione, se presente: dei campioni conservati si salva anche lo stack trace.
+        """
+        with self._lock:
+            entry = self._errors.setdefault((stage, kind), {"count": 0, "samples": []})
+            entry["count"] += 1
+            if len(entry["samples"]) >= self.error_samples:
+                return
+            sample = {"url": url, "message": message}
+            entry["samples"].append(sample)
+        # Lo stack trace viene formattato solo per i campioni, fuori dal lock
+        if exc is not None:
+            sample["traceback"] = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+
+    def summary(self):
+        """
+        Restituisce i contatori, le latenze per stadio (secondi) e gli errori per tipo con i campioni.
+        """
+        with self._lock:
+            return {
+                "counters": dict(sorted(self._counters.items())),
+                "latency": {stage: histogram.as_dict() for stage, histogram in self._latencies.items()},
+                "errors": {
+                    f"{stage}: {kind}": {"count": entry["count"], "samples": list(entry["samples"])}
+                    for (stage, kind), entry in sorted(self._errors.items(), key=lambda item: -item[1]["count"])
+                },
+            }
+
+    def report(self):
+        """Restituisce il riepilogo come testo: contatori, una riga di latenze per stadio ed errori più frequenti."""
+        summary = self.summary()
+        lines = ["  ".join(f"{name}={value}" for name, value in summary["counters"].items())]
+        lines.append(f"{'stadio':<10}{'n':>8}{'media s':>10}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'max s':>9}")
+        for stage, latency in summary["latency"].items():
+            lines.append(
+                f"{stage:<10}{latency['count']:>8}{latency['mean']:>10.3f}{latency['p50']:>9.3f}"
+                f"{latency['p95']:>9.3f}{latency['p99']:>9.3f}{latency['max']:>9.3f}"
+            )
+        for kind, entry in list(summary["errors"].items())[:10]:
+            example = entry["samples"][0]["url"] if entry["samples"] else ""
+            lines.append(f"{entry['count']:>8}  {kind}  (es. {example})")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """Scrive il riepilogo in un file JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=4)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._latencies = {stage: LatencyHistogram() for stage in STAGES}
+            self._errors.clear()
+
+
+def error_kind(result):
+    """Tipo di errore di un `FetchResult` fallito, per raggruppare gli errori: lo status HTTP o la causa."""
+    if result.status_code is not None and result.status_code >= 400:
+        return f"HTTP {result.status_code}"
+    return (result.error or "sconosciuto").split(":")[0]
@@ -0,0 +1,389 @@
+import asyncio
+import collections
+import contextlib
+import json
+import threading
+import time
+import urllib.robotparser
+
+from urllib.parse import urlsplit
+
+import requests
+
+
+class RobotsCache:
+    """
+    Regole robots.txt dei siti, scaricate una sola volta per origine (schema e host) e tenute
+    in memoria per `ttl` secondi.
+
+    Come da RFC 9309 un robots.txt assente (4xx) permette tutto; se invece il file non è
+    raggiungibile (errore di rete o 5xx) le pagine vengono scaricate, ma il robots.txt viene
+    richiesto di nuovo dopo `error_ttl` secondi.
+    """
+
+    def __init__(self, user_agent=None, timeout=10, ttl=24 * 3600, error_ttl=600, max_bytes=512 * 1024, session=None):
+        """
+        :param user_agent: Lo user agent con cui vengono valutate le regole (default: quello di `requests`).
+        :param timeout: Timeout del download di un robots.txt, in secondi.
+        :param ttl: Secondi per cui le regole di un sito restano valide.
+        :param error_ttl: Secondi dopo cui si riprova a scaricare un robots.txt non raggiungibile.
+        :param max_bytes: Byte letti al massimo da un robots.txt.
+        :param session: Sessione `requests` opzionale.
+        """
+        self.user_agent = user_agent or requests.utils.default_user_agent()
+        self.timeout = timeout
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.max_bytes = max_bytes
+        self._owns_session = session is None
+        self.session = session if session is not None else requests.Session()
+
+        self._lock = threading.Lock()
+        # origine -> (parser, o None se nessuna regola, scadenza)
+        self._rules = {}
+        # origine -> future del download in corso, per non scaricare lo stesso robots.txt più volte
+        self._pending = {}
+        self._loop = None
+
+    @staticmethod
+    def origin(url):
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def download(self, origin):
+        """
+        Scarica e interpreta il robots.txt di un'origine, in modo bloccante.
+
+        :return: Una tupla (parser, o None se non ci sono regole, secondi di validità).
+        """
+        try:
+            with self.session.get(f"{origin}/robots.txt", timeout=self.timeout, stream=True,
+                                  headers={"User-Agent": self.user_agent}) as response:
+                if response.status_code >= 500:
+                    return None, self.error_ttl
+                if response.status_code >= 400:
+                    return None, self.ttl
+                body = response.raw.read(self.max_bytes, decode_content=True) or b""
+        except Exception:
+            return None, self.error_ttl
+
+        parser = urllib.robotparser.RobotFileParser()
+        parser.parse(body.decode("utf-8", errors="replace").splitlines())
+        return parser, self.ttl
+
+    def _cached(self, origin):
+        with self._lock:
+            entry = self._rules.get(origin)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry
+        return None
+
+    async def rules(self, url, executor=None):
+        """
+        Restituisce le regole del sito dell'URL, scaricandole se non sono in cache.
+
+        :param url: Un URL del sito.
+        :param executor: Il pool di thread su cui scaricare il robots.txt (default: quello del loop).
+        :return: Il `RobotFileParser` del sito, None se il sito non ha regole.
+        """
+        origin = self.origin(url)
+        entry = self._cached(origin)
+        if entry is not None:
+            return entry[0]
+
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._pending = {}
+        if origin not in self._pending:
+            self._pending[origin] = loop.run_in_executor(executor, self.download, origin)
+        try:
+            parser, ttl = await asyncio.shield(self._pending[origin])
+        finally:
+            if self._pending.get(origin) is not None and self._pending[origin].done():
+                del self._pending[origin]
+
+        with self._lock:
+            self._rules[origin] = (parser, time.monotonic() + ttl)
+        return parser
+
+    def allowed(self, parser, url):
+        """Indica se le regole permettono di scaricare l'URL."""
+        return parser is None or parser.can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, parser):
+        """Secondi da attendere tra due richieste allo stesso sito secondo le regole, 0 se non indicati."""
+        if parser is None:
+            return 0.0
+        delay = parser.crawl_delay(self.user_agent)
+        if delay is not None:
+            return float(delay)
+        rate = parser.request_rate(self.user_agent)
+        if rate is not None and rate.requests:
+            return rate.seconds / rate.requests
+        return 0.0
+
+    def close(self):
+        if self._owns_session:
+            self.session.close()
+
+
+class DomainState:
+    """Limiti correnti e statistiche di un dominio nello `DomainScheduler`."""
+
+    __slots__ = [
+        "host", "limit", "active", "streak", "failures", "next_start", "min_interval", "waiters", "timer",
+        "requests", "ok", "errors", "throttled", "blocked", "elapsed", "chars", "first_start", "last_end",
+    ]
+
+    def __init__(self, host, limit):
+        self.host = host
+        self.limit = limit
+        self.active = 0
+        # Risposte veloci consecutive, e errori consecutivi per il backoff
+        self.streak = 0
+        self.failures = 0
+        # Istante (time.monotonic) prima del quale non partono nuove richieste
+        self.next_start = 0.0
+        self.min_interval = 0.0
+        # Coda FIFO dei task in attesa di uno slot, e timer della prossima partenza ritardata
+        self.waiters = collections.deque()
+        self.timer = None
+
+        self.requests = 0
+        self.ok = 0
+        self.errors = 0
+        self.throttled = 0
+        self.blocked = 0
+        self.elapsed = 0.0
+        self.chars = 0
+        self.first_start = None
+        self.last_end = None
+
+    def as_dict(self):
+        busy = (self.last_end - self.first_start) if self.first_start is not None and self.last_end is not None else 0.0
+        return {
+            "requests": self.requests,
+            "ok": self.ok,
+            "errors": self.errors,
+            "throttled": self.throttled,
+            "blocked": self.blocked,
+            "concurrency": self.limit,
+            "crawl_delay": self.min_interval,
+            "mean_latency": self.elapsed / self.requests if self.requests else 0.0,
+            "pages_per_second": self.ok / busy if busy > 0 else 0.0,
+            "chars": self.chars,
+        }
+
+
+class DomainScheduler:
+    """
+    Scheduler di cortesia per dominio, usato da `AsyncFetcher` al posto di un semplice limite per host.
+
+    Ogni dominio ha una propria coda FIFO: un task parte quando il dominio ha uno slot libero ed
+    è trascorso il crawl-delay dall'ultima partenza, così i domini molto frequenti aspettano in
+    coda mentre quelli della coda lunga continuano a scaricare. La concorrenza di ogni dominio è
+    adattiva: parte da `initial_per_host`, sale di uno dopo una serie di risposte veloci fino a
+    `max_per_host`, scende di uno dopo un errore di rete o 5xx e si dimezza con un 429/503, che
+    sospende anche il dominio per il tempo indicato da Retry-After (o un backoff esponenziale).
+
+    ```
+    scheduler = DomainScheduler(max_per_host=8, robots=RobotsCache())
+    fetcher = AsyncFetcher(scheduler=scheduler)
+    ...
+    print(scheduler.report())
+    ```
+    """
+
+    def __init__(self, max_per_host=4, initial_per_host=None, adaptive=True, fast_response=1.0, robots=None,
+                 max_crawl_delay=30.0, base_backoff=5.0, max_backoff=300.0):
+        """
+        :param max_per_host: Numero massimo di download contemporanei verso lo stesso dominio.
+        :param initial_per_host: Concorrenza iniziale di un dominio (default: metà di `max_per_host`).
+        :param adaptive: Se False la concorrenza di ogni dominio resta fissa a `max_per_host`.
+        :param fast_response: Durata in secondi sotto la quale una risposta è considerata veloce.
+        :param robots: `RobotsCache` opzionale: gli URL esclusi da robots.txt non vengono scaricati
+            e il crawl-delay del sito viene rispettato.
+        :param max_crawl_delay: Crawl-delay massimo accettato, in secondi: i siti che chiedono di più
+            vengono saltati invece di bloccare il run.
+        :param base_backoff: Sospensione di un dominio dopo il primo 429/503 senza Retry-After, in secondi.
+        :param max_backoff: Sospensione massima di un dominio, in secondi.
+        """
+        if max_per_host < 1:
+            raise ValueError(f"Il limite per dominio deve essere almeno 1, non {max_per_host}")
+
+        self.max_per_host = max_per_host
+        self.adaptive = adaptive
+        self.initial_per_host = (
+            max_per_host if not adaptive else max(1, min(max_per_host, initial_per_host or max_per_host // 2))
+        )
+        self.fast_response = fast_response
+        self.robots = robots
+        self.max_crawl_delay = max_crawl_delay
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._domains = {}
+        self._loop = None
+
+    def _domain(self, host):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Le code e i timer appartengono a un event loop: con un nuovo loop restano solo limiti e statistiche
+            self._loop = loop
+            for domain in self._domains.values():
+                domain.active = 0
+                domain.waiters.clear()
+                domain.timer = None
+        if host not in self._domains:
+            self._domains[host] = DomainState(host, self.initial_per_host)
+        return self._domains[host]
+
+    async def check(self, url, host, executor=None):
+        """
+        Verifica le regole robots.txt del sito e ne applica il crawl-delay.
+
+        :return: Il motivo per cui l'URL non va scaricato, None se può esserlo.
+        """
+        if self.robots is None:
+            return None
+        parser = await self.robots.rules(url, executor)
+        domain = self._domain(host)
+        delay = self.robots.crawl_delay(parser)
+        if delay > self.max_crawl_delay:
+            domain.blocked += 1
+            return f"Crawl-delay di {delay}s oltre il limite di {self.max_crawl_delay}s"
+        domain.min_interval = max(domain.min_interval, delay)
+        if not self.robots.allowed(parser, url):
+            domain.blocked += 1
+            return "URL escluso da robots.txt"
+        return None
+
+    @contextlib.asynccontextmanager
+    async def slot(self, host):
+        """Attende in coda uno slot del dominio e lo tiene per la durata del blocco `async with`."""
+        domain = self._domain(host)
+        if domain.waiters or not self._can_start(domain):
+            waiter = asyncio.get_running_loop().create_future()
+            domain.waiters.append(waiter)
+            self._dispatch(domain)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Lo slot potrebbe essere già stato assegnato a questo task
+                if waiter.done() and not waiter.cancelled():
+                    self._release(domain)
+                raise
+        else:
+            self._start(domain)
+
+        try:
+            yield domain
+        finally:
+            self._release(domain)
+
+    def _can_start(self, domain):
+        return domain.active < domain.limit and domain.next_start <= time.monotonic()
+
+    def _start(self, domain):
+        now = time.monotonic()
+        domain.active += 1
+        domain.next_start = now + domain.min_interval
+        if domain.first_start is None:
+            domain.first_start = now
+
+    def _release(self, domain):
+        domain.active -= 1
+        self._dispatch(domain)
+
+    def _dispatch(self, domain):
+        """Fa partire i task in coda finché il dominio ha slot liberi e nessun ritardo da rispettare."""
+        while domain.waiters and domain.active < domain.limit:
+            delay = domain.next_start - time.monotonic()
+            if delay > 0:
+                if domain.timer is None:
+                    domain.timer = self._loop.call_later(delay, self._on_timer, domain)
+                return
+            waiter = domain.waiters.popleft()
+            if waiter.done():
+                continue
+            self._start(domain)
+            waiter.set_result(None)
+
+    def _on_timer(self, domain):
+        domain.timer = None
+        self._dispatch(domain)
+
+    def record(self, host, result):
+        """
+        Registra l'esito di un download e adatta la concorrenza del dominio.
+
+        :param host: Il dominio, come restituito da `host_of`.
+        :param result: Il `FetchResult` del download.
+        """
+        domain = self._domain(host)
+        now = time.monotonic()
+        domain.requests += 1
+        domain.elapsed += result.elapsed
+        domain.last_end = now
+
+        if result.ok:
+            domain.ok += 1
+            domain.chars += len(result.html)
+            domain.failures = 0
+            if self.adaptive and result.elapsed <= self.fast_response:
+                domain.streak += 1
+                if domain.streak >= domain.limit and domain.limit < self.max_per_host:
+                    domain.limit += 1
+                    domain.streak = 0
+            else:
+                domain.streak = 0
+        elif result.status_code in (429, 503):
+            domain.throttled += 1
+            domain.streak = 0
+            if self.adaptive:
+                domain.failures += 1
+                domain.limit = max(1, domain.limit // 2)
+                pause = result.retry_after
+                if pause is None:
+                    pause = self.base_backoff * 2 ** (domain.failures - 1)
+                domain.next_start = max(domain.next_start, now + min(self.max_backoff, pause))
+        else:
+            domain.errors += 1
+            domain.streak = 0
+            # Errori di rete e del server indicano un sito in difficoltà, non le pagine mancanti (4xx)
+            if self.adaptive and (result.status_code is None or result.status_code >= 500):
+                domain.limit = max(1, domain.limit - 1)
+
+        self._dispatch(domain)
+
+    def stats(self):
+        """
+        Restituisce le statistiche di ogni dominio: richieste, esiti, concorrenza raggiunta,
+        latenza media e pagine scaricate al secondo.
+
+        :return: Un dizionario {dominio: statistiche}.
+        """
+        return {host: domain.as_dict() for host, domain in self._domains.items()}
+
+    def report(self, top=20):
+        """Restituisce le statistiche dei `top` domini con più richieste come tabella di testo."""
+        lines = [f"{'dominio':<40}{'richieste':>10}{'ok':>7}{'errori':>8}{'429/503':>9}{'bloccati':>10}"
+                 f"{'conc.':>7}{'lat. s':>9}{'pag/s':>8}"]
+        stats = sorted(self.stats().items(), key=lambda item: item[1]["requests"], reverse=True)
+        for host, domain in stats[:top]:
+            lines.append(
+                f"{host[:39]:<40}{domain['requests']:>10}{domain['ok']:>7}{domain['errors']:>8}{domain['throttled']:>9}"
+                f"{domain['blocked']:>10}{domain['concurrency']:>7}{domain['mean_latency']:>9.3f}"
+                f"{domain['pages_per_second']:>8.2f}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """Scrive le statistiche per dominio in un file JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.stats(), f, indent=4)
+
+    def close(self):
+        if self.robots is not None:
+            self.robots.close()
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+from scraping.urls import canonical_url
+
+DEFAULT_SEEN_INDEX = "raw_text_data/seen_urls.sqlite"
+
+# Limite di SQLite ai parametri di una singola query, con margine
+_MAX_PARAMS = 500
+
+
+def url_hash(url):
+    """Hash a 64 bit dell'URL, usato come chiave compatta dell'indice."""
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+class SeenIndex:
+    """
+    Indice persistente degli URL già scaricati ed estratti, condiviso tra run e applicazioni
+    (AutoScraper, dashboard, ricerca di similarità) che puntano allo stesso file.
+
+    Ogni URL occupa un intero a 64 bit (l'hash dell'URL, chiave primaria della tabella) più il
+    riferimento all'archivio in cui è stato salvato l'articolo, così chi lo ritrova può
+    rileggerlo da lì invece di scaricarlo di nuovo.
+
+    Gli URL sono confrontati per chiave canonica (vedi `URLNormalizer`): le versioni mobile o AMP
+    e gli URL con parametri di tracciamento di un articolo già visto risultano già visti.
+    """
+
+    def __init__(self, path=DEFAULT_SEEN_INDEX, url_key=canonical_url):
+        """
+        :param path: Il file SQLite dell'indice. La directory viene creata se manca.
+        :param url_key: Funzione che calcola la chiave canonica di un URL; None per confrontare gli URL esatti.
+        """
+        self.path = path
+        self.url_key = url_key
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._store_ids = {}
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS stores (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen (hash INTEGER PRIMARY KEY, store_id INTEGER)")
+
+    def _store_id(self, store_path):
+        if store_path is None:
+            return None
+        store_path = os.path.abspath(store_path)
+        if store_path not in self._store_ids:
+            self._conn.execute("INSERT OR IGNORE INTO stores (path) VALUES (?)", (store_path,))
+            (store_id,) = self._conn.execute("SELECT id FROM stores WHERE path = ?", (store_path,)).fetchone()
+            self._store_ids[store_path] = store_id
+        return self._store_ids[store_path]
+
+    def _hash(self, url):
+        return url_hash(self.url_key(url) if self.url_key is not None else url)
+
+    def add(self, urls, store_path=None):
+        """
+        Segna gli URL come scaricati.
+
+        :param urls: Gli URL degli articoli salvati.
+        :param store_path: L'archivio (`ArticleStore`) in cui sono stati salvati.
+        """
+        urls = list(urls)
+        if not urls:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                store_id = self._store_id(store_path)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO seen (hash, store_id) VALUES (?, ?)",
+                    [(self._hash(url), store_id) for url in urls],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                # L'id dell'archivio potrebbe non essere stato salvato
+                self._store_ids.clear()
+                raise
+
+    def lookup(self, urls):
+        """
+        Restituisce gli URL di `urls` già scaricati, con l'archivio in cui si trovano.
+
+        :param urls: Gli URL da verificare.
+        :return: Un dizionario {url: percorso dell'archivio, o None se non noto}.
+        """
+        hashes = {}
+        for url in urls:
+            hashes.setdefault(self._hash(url), []).append(url)
+
+        keys = list(hashes)
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), _MAX_PARAMS):
+                chunk = keys[i:i + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT seen.hash, stores.path FROM seen LEFT JOIN stores ON stores.id = seen.store_id "
+                    f"WHERE seen.hash IN ({placeholders})", chunk
+                )
+                for key, store_path in rows:
+                    for url in hashes[key]:
+                        found[url] = store_path
+        return found
+
+    def __contains__(self, url):
+        return bool(self.lookup([url]))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
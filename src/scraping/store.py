@@ -0,0 +1,253 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from scraping.urls import canonical_url
+
+logger = logging.getLogger(__name__)
+
+ARTICLE_COLUMNS = ["url", "title", "language", "text"]
+
+# Limite di SQLite ai parametri di una singola query, con margine
+_MAX_PARAMS = 500
+
+_UPDATE = (
+    "DO UPDATE SET title = excluded.title, language = excluded.language, text = excluded.text, "
+    "saved_at = excluded.saved_at"
+)
+# Lo stesso URL ha sempre la stessa chiave, ma le righe importate prima della colonna url_key
+# possono averla vuota: servono entrambe le clausole
+_UPSERT = f"ON CONFLICT (url) {_UPDATE} ON CONFLICT (url_key) {_UPDATE}"
+
+
+def _exact_url(url):
+    return url
+
+
+def store_path_for(memory_file):
+    """Restituisce il file SQLite dello store corrispondente a un file di memoria, es. raw.json -> raw.sqlite."""
+    root, ext = os.path.splitext(memory_file)
+    return root + ".sqlite" if ext.lower() in (".json", ".jsonl") else memory_file
+
+
+class ArticleStore:
+    """
+    Archivio append-only degli articoli estratti, in un file SQLite con indici univoci sull'URL e
+    sulla sua chiave canonica.
+
+    Ogni salvataggio inserisce solo il nuovo batch (O(batch), invece di riscrivere tutto il file),
+    più processi possono scrivere sullo stesso file contemporaneamente (WAL e transazioni
+    `BEGIN IMMEDIATE`) e `known`/`has` verificano con l'indice se un URL è già presente.
+    A parità di chiave canonica (stesso URL, o sua versione mobile, AMP o con tracciamento) resta
+    il primo articolo salvato, anche tra batch e run diversi, salvo con `add(..., replace=True)`.
+    """
+
+    def __init__(self, path="raw_text_data/raw.sqlite", legacy_json=None, url_key=canonical_url):
+        """
+        :param path: Il file SQLite dell'archivio. La directory viene creata se manca.
+        :param legacy_json: File JSON (lista di articoli) scritto dalle versioni precedenti; se
+            esiste viene importato una sola volta, quando l'archivio è ancora vuoto.
+        :param url_key: Funzione che calcola la chiave canonica di un URL, salvata con l'articolo;
+            None per confrontare gli URL esatti. Chi scrive sullo stesso file deve usare le stesse regole.
+        """
+        self.path = path
+        self.url_key = url_key if url_key is not None else _exact_url
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            "id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, title TEXT, language TEXT, text TEXT, saved_at REAL, "
+            "url_key TEXT)"
+        )
+        self._add_url_keys()
+
+        if legacy_json and os.path.exists(legacy_json) and len(self) == 0:
+            self._import_json(legacy_json)
+
+    def _add_url_keys(self):
+        """
+        Aggiunge la colonna `url_key` e il suo indice univoco agli archivi creati senza, calcolando la
+        chiave degli articoli già salvati. Le altre versioni di un articolo già presente restano
+        senza chiave: non vengono cancellate, ma non bloccano i salvataggi successivi.
+        """
+        def has_index():
+            return self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'articles_url_key'"
+            ).fetchone() is not None
+
+        with self._lock:
+            # Controllo senza lock di scrittura: la migrazione serve una volta sola per file
+            if has_index():
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                columns = {row[1] for row in self._conn.execute("PRAGMA table_info(articles)")}
+                if "url_key" not in columns:
+                    self._conn.execute("ALTER TABLE articles ADD COLUMN url_key TEXT")
+                    keys = {}
+                    for row_id, url in self._conn.execute("SELECT id, url FROM articles ORDER BY id").fetchall():
+                        keys.setdefault(self.url_key(url), row_id)
+                    self._conn.executemany("UPDATE articles SET url_key = ? WHERE id = ?", keys.items())
+                self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS articles_url_key ON articles (url_key)")
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _import_json(self, json_path):
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                articles = json.load(f)
+        except (ValueError, OSError) as e:
+            logger.error("Impossibile importare %s: %s", json_path, e)
+            return
+        if isinstance(articles, list):
+            added = self.add(a for a in articles if isinstance(a, dict) and a.get("url"))
+            logger.info("Importati %d articoli da %s in %s.", added, json_path, self.path)
+
+    def add(self, entries, replace=False):
+        """
+        Salva un batch di articoli, ignorando quelli già presenti con la stessa chiave canonica.
+
+        :param entries: Dizionari con le chiavi 'url', 'title', 'language', 'text'.
+        :param replace: Se True gli articoli già presenti vengono aggiornati (es. dopo una nuova
+            estrazione), mantenendo il loro URL e la loro posizione nell'archivio.
+        :return: Il numero di articoli effettivamente aggiunti o aggiornati.
+        """
+        now = time.time()
+        rows = [tuple(entry.get(column) for column in ARTICLE_COLUMNS) + (now, self.url_key(entry.get("url")))
+                for entry in entries]
+        if not rows:
+            return 0
+
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO articles (url, title, language, text, saved_at, url_key) VALUES (?, ?, ?, ?, ?, ?) "
+                    + (_UPSERT if replace else "ON CONFLICT DO NOTHING"), rows
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return self._conn.total_changes - before
+
+    def has(self, url):
+        """Indica se l'URL è già nell'archivio."""
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM articles WHERE url = ?", (url,)).fetchone() is not None
+
+    def known(self, urls):
+        """
+        Restituisce gli URL di `urls` già presenti nell'archivio.
+
+        :param urls: Gli URL da verificare.
+        :return: Un set di URL.
+        """
+        urls = list(dict.fromkeys(urls))
+        found = set()
+        with self._lock:
+            for i in range(0, len(urls), _MAX_PARAMS):
+                chunk = urls[i:i + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(url for (url,) in self._conn.execute(
+                    f"SELECT url FROM articles WHERE url IN ({placeholders})", chunk
+                ))
+        return found
+
+    def get_many(self, urls):
+        """
+        Restituisce gli articoli salvati per gli URL di `urls`.
+
+        :param urls: Gli URL cercati.
+        :return: Un dizionario {url: articolo} con i soli URL presenti.
+        """
+        urls = list(dict.fromkeys(urls))
+        found = {}
+        with self._lock:
+            for i in range(0, len(urls), _MAX_PARAMS):
+                chunk = urls[i:i + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                for row in self._conn.execute(
+                    f"SELECT url, title, language, text FROM articles WHERE url IN ({placeholders})", chunk
+                ):
+                    found[row[0]] = dict(zip(ARTICLE_COLUMNS, row))
+        return found
+
+    def find_many(self, urls):
+        """
+        Restituisce gli articoli salvati per gli URL di `urls` o per un'altra loro versione (stessa
+        chiave canonica, es. la versione mobile o con parametri di tracciamento).
+
+        :param urls: Gli URL cercati.
+        :return: Un dizionario {url cercato: articolo salvato} con i soli URL ritrovati; l'articolo
+            conserva l'URL con cui è stato salvato.
+        """
+        by_key = {}
+        for url in dict.fromkeys(urls):
+            by_key.setdefault(self.url_key(url), []).append(url)
+
+        keys = list(by_key)
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), _MAX_PARAMS):
+                chunk = keys[i:i + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                for row in self._conn.execute(
+                    f"SELECT url_key, url, title, language, text FROM articles WHERE url_key IN ({placeholders})", chunk
+                ):
+                    for url in by_key[row[0]]:
+                        found[url] = dict(zip(ARTICLE_COLUMNS, row[1:]))
+
+        # Le versioni salvate prima della colonna url_key possono non avere la chiave
+        missing = [url for urls in by_key.values() for url in urls if url not in found]
+        if missing:
+            found.update(self.get_many(missing))
+        return found
+
+    def iter_articles(self, batch_size=1000):
+        """Itera sugli articoli in ordine di inserimento, leggendoli a blocchi."""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, url, title, language, text FROM articles WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(zip(ARTICLE_COLUMNS, row[1:]))
+            last_id = rows[-1][0]
+
+    def articles(self):
+        """Restituisce tutti gli articoli come lista di dizionari, in ordine di inserimento."""
+        return list(self.iter_articles())
+
+    def export_json(self, json_path):
+        """Esporta l'archivio nel formato JSON (lista di articoli) delle versioni precedenti."""
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(self.articles(), f, ensure_ascii=False, indent=4)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
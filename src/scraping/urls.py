@@ -0,0 +1,163 @@
+import itertools
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+# Parametri di query che identificano la campagna o il canale da cui arriva il lettore, non l'articolo
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "gclsrc", "dclid", "msclkid", "yclid", "twclid", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "ref", "ref_src", "ref_url", "cmpid", "ocid", "icid", "ito", "smid", "sr_share", "spm",
+    "xtor", "wt.mc_id", "at_medium", "at_campaign", "fromrss", "rss", "share", "s_cid", "taid",
+})
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_", "hsa_", "ns_")
+
+# Sottodomini delle versioni desktop, mobile e AMP dello stesso sito
+HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+
+# Estensioni che alcuni siti aggiungono o tolgono tra la versione desktop e quella AMP (es. .html -> .amp)
+PATH_SUFFIXES = (".html", ".htm", ".shtml")
+
+# Marcatori AMP nel percorso: /amp finale, /amp/ iniziale, .amp prima dell'estensione o in fondo, _amp prima dell'estensione
+_AMP_PATH = re.compile(r"(?:/amp)+/?$|^/amp(?=/)|\.amp(?=\.s?html?$|$)|[_-]amp(?=\.s?html?$)", re.IGNORECASE)
+_AMP_PARAMS = {"amp": None, "outputtype": "amp", "output": "amp"}
+
+
+class URLNormalizer:
+    """
+    Chiave canonica degli URL, per riconoscere lo stesso articolo restituito da GDELT con URL diversi:
+    versione mobile o AMP, parametri di tracciamento, http/https, 'www.', slash finale.
+
+    La chiave serve solo a confrontare gli URL (deduplicazione, indice degli URL visti, registro
+    degli errori): non è detto che sia un indirizzo valido, quindi le richieste usano l'URL originale.
+    Le regole si configurano dal costruttore; le chiavi calcolate restano in una cache LRU.
+
+    ```
+    normalizer = URLNormalizer(keep_params={"id"})
+    normalizer("https://m.sito.it/news/articolo.amp.html?utm_source=x")  # 'https://sito.it/news/articolo'
+    ```
+    """
+
+    def __init__(self, host_prefixes=HOST_PREFIXES, strip_amp=True, tracking_params=TRACKING_PARAMS,
+                 tracking_prefixes=TRACKING_PREFIXES, keep_params=None, sort_query=True, path_suffixes=PATH_SUFFIXES,
+                 strip_trailing_slash=True, ignore_scheme=True, cache_size=1 << 16):
+        """
+        :param host_prefixes: Prefissi dell'host da togliere (es. 'www.', 'm.'), anche più di uno di seguito.
+        :param strip_amp: Se True toglie i marcatori AMP da percorso e query (es. /amp, .amp.html, ?amp=1).
+        :param tracking_params: Nomi dei parametri di query da scartare, in minuscolo.
+        :param tracking_prefixes: Prefissi dei parametri di query da scartare (es. 'utm_').
+        :param keep_params: Se indicato, gli unici parametri di query conservati; gli altri vengono scartati.
+        :param sort_query: Se True ordina i parametri di query, così il loro ordine non conta.
+        :param path_suffixes: Estensioni da togliere dalla fine del percorso.
+        :param strip_trailing_slash: Se True toglie lo slash finale del percorso.
+        :param ignore_scheme: Se True http e https danno la stessa chiave.
+        :param cache_size: URL la cui chiave resta in cache, 0 per disattivarla.
+        """
+        self.host_prefixes = tuple(host_prefixes)
+        self.strip_amp = strip_amp
+        self.tracking_params = frozenset(name.lower() for name in tracking_params)
+        self.tracking_prefixes = tuple(tracking_prefixes)
+        self.keep_params = None if keep_params is None else frozenset(name.lower() for name in keep_params)
+        self.sort_query = sort_query
+        self.path_suffixes = tuple(suffix.lower() for suffix in path_suffixes)
+        self.strip_trailing_slash = strip_trailing_slash
+        self.ignore_scheme = ignore_scheme
+        self._key = lru_cache(maxsize=cache_size)(self.canonical) if cache_size else self.canonical
+
+    def __call__(self, url):
+        """Restituisce la chiave canonica dell'URL, usando la cache."""
+        return self._key(url)
+
+    def canonical(self, url):
+        """
+        Calcola la chiave canonica dell'URL. Gli URL senza host (o non validi) restano come sono.
+        """
+        if not isinstance(url, str):
+            return url
+        url = url.strip()
+        try:
+            scheme, netloc, path, query, _ = urlsplit(url)
+        except ValueError:
+            return url
+        if not netloc:
+            return url
+
+        scheme = scheme.lower()
+        if self.ignore_scheme and scheme == "http":
+            scheme = "https"
+        host = netloc.rpartition("@")[2].lower()
+        if host.endswith(":80") or host.endswith(":443"):
+            host = host.rpartition(":")[0]
+        stripped = True
+        while stripped:
+            stripped = False
+            for prefix in self.host_prefixes:
+                # Resta almeno un dominio con un punto: 'm.it' non diventa 'it'
+                if host.startswith(prefix) and "." in host[len(prefix):]:
+                    host = host[len(prefix):]
+                    stripped = True
+
+        if self.strip_amp and "amp" in path.lower():
+            path = _AMP_PATH.sub("", path)
+        lower_path = path.lower()
+        for suffix in self.path_suffixes:
+            if lower_path.endswith(suffix):
+                path = path[:-len(suffix)]
+                break
+        if self.strip_trailing_slash:
+            path = path.rstrip("/")
+
+        if query:
+            query = self._canonical_query(query)
+        return f"{scheme}://{host}{path}?{query}" if query else f"{scheme}://{host}{path}"
+
+    def _canonical_query(self, query):
+        params = []
+        for param in query.split("&"):
+            if not param:
+                continue
+            name, _, value = param.partition("=")
+            name_lower = name.lower()
+            if self.keep_params is not None:
+                if name_lower not in self.keep_params:
+                    continue
+            elif name_lower in self.tracking_params or name_lower.startswith(self.tracking_prefixes):
+                continue
+            if self.strip_amp and name_lower in _AMP_PARAMS and _AMP_PARAMS[name_lower] in (None, value.lower()):
+                continue
+            params.append(param)
+        if self.sort_query:
+            params.sort()
+        return "&".join(params)
+
+
+DEFAULT_NORMALIZER = URLNormalizer()
+
+
+def canonical_url(url):
+    """Chiave canonica dell'URL con le regole predefinite di `URLNormalizer`."""
+    return DEFAULT_NORMALIZER(url)
+
+
+def duplicated_urls(urls, aliases=None, key=canonical_url):
+    """
+    Indica, per ogni URL, se lo stesso articolo è già comparso in una posizione precedente.
+
+    GDELT restituisce per molti articoli anche `url_mobile`, che a volte punta a un percorso o a un
+    sito diverso (es. la versione AMP di un giornale dello stesso gruppo): passandolo in `aliases`,
+    due righe sono lo stesso articolo se hanno in comune la chiave dell'URL o di uno degli alias.
+
+    :param urls: Gli URL, in ordine.
+    :param aliases: URL alternativi della stessa riga (es. la colonna `url_mobile`), vuoti o None se assenti.
+    :param key: Funzione che calcola la chiave canonica di un URL.
+    :return: Una lista di bool, True per le righe da scartare; la prima occorrenza resta.
+    """
+    seen = set()
+    duplicated = []
+    for url, alias in zip(urls, aliases if aliases is not None else itertools.repeat(None)):
+        keys = {key(url)}
+        if isinstance(alias, str) and alias:
+            keys.add(key(alias))
+        duplicated.append(not seen.isdisjoint(keys))
+        seen.update(keys)
+    return duplicated
+
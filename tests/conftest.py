@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from gdeltdoc.replay import ReplayServer, replay_key
+
+
+class DocAPI:
+    """Local stand-in for the DOC API: serves the responses registered with `serve`."""
+
+    def __init__(self, server):
+        self.server = server
+        self.base_url = server.base_url
+
+    def serve(self, filters, result=None, status=200, content_type="application/json; charset=utf-8", body=None):
+        if body is None:
+            body = json.dumps(result).encode("utf-8")
+        key = replay_key(f"{self.base_url}?query={filters.query_string}&format=json")
+        self.server.recordings[key] = (status, content_type, body)
+
+    @property
+    def requests(self):
+        return self.server.stats["requests"]
+
+
+@pytest.fixture
+def doc_api():
+    with ReplayServer() as server:
+        yield DocAPI(server)
+
+
+def make_articles(n, prefix="https://example.com/a", seendate="20250101T000000Z"):
+    return [
+        {"url": f"{prefix}{i}", "url_mobile": "", "title": f"Title {prefix}{i}", "seendate": seendate,
+         "socialimage": "", "domain": "example.com", "language": "English", "sourcecountry": "United States"}
+        for i in range(n)
+    ]
+
+
+ARTICLE_HTML = (
+    "<html><head><title>Articolo {path}</title></head><body><article>"
+    + "<p>Testo dell'articolo, abbastanza lungo da essere estratto da trafilatura.</p>" * 20
+    + "</article></body></html>"
+)
+
+
+class Site:
+    """Sito locale per i test dello scraping: ogni percorso decide la risposta."""
+
+    def __init__(self, server):
+        self.server = server
+        self.requests = []
+        host, port = server.server_address[:2]
+        self.base_url = f"http://{host}:{port}"
+
+    def url(self, path):
+        return self.base_url + path
+
+
+def _site_handler(site):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            site.requests.append(self.path)
+            status, content_type, body = 200, "text/html; charset=utf-8", ARTICLE_HTML.format(path=self.path).encode()
+            if self.path.startswith("/404"):
+                status, body = 404, b"Not found"
+            elif self.path.startswith("/empty"):
+                body = b"<html><body></body></html>"
+            elif self.path.startswith("/pdf"):
+                content_type = "application/pdf"
+            elif self.path.startswith("/big"):
+                body = b"<html><body>" + b"x" * 200_000 + b"</body></html>"
+            elif self.path.startswith("/slow"):
+                time.sleep(1.5)
+
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+@pytest.fixture
+def site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BaseHTTPRequestHandler)
+    server.daemon_threads = True
+    site = Site(server)
+    server.RequestHandlerClass = _site_handler(site)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield site
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+import pytest
+
+from conftest import make_articles
+from gdeltdoc import Filters, GdeltDoc
+
+FILTERS = Filters(keyword="climate", start_date="20250101000000", end_date="20250101080000")
+
+
+def window(start, end):
+    return FILTERS.replace(start_date=f"20250101{start}0000", end_date=f"20250101{end}0000", timespan=None, num_records=250)
+
+
+def test_full_windows_are_split_in_halves(doc_api):
+    doc_api.serve(window("00", "08"), {"articles": make_articles(250, prefix="https://example.com/full")})
+    doc_api.serve(window("00", "04"), {"articles": make_articles(250, prefix="https://example.com/full")})
+    doc_api.serve(window("00", "02"), {"articles": make_articles(100, prefix="https://example.com/early")})
+    # The second quarter only repeats articles of the first one
+    doc_api.serve(window("02", "04"), {"articles": make_articles(50, prefix="https://example.com/early")})
+    doc_api.serve(window("04", "08"), {"articles": make_articles(10, prefix="https://example.com/late")})
+
+    with GdeltDoc(base_url=doc_api.base_url) as gd:
+        pages = list(gd.iter_article_search_all(FILTERS))
+        articles = gd.article_search_all(FILTERS)
+
+    # Oldest window first, the window with no new articles is skipped
+    assert [len(page) for page in pages] == [100, 10]
+    assert pages[0]["url"].str.contains("early").all()
+    assert len(articles) == 110
+    assert articles["url"].is_unique
+    assert doc_api.requests == 10
+
+
+def test_windows_are_not_split_below_min_window(doc_api):
+    doc_api.serve(window("00", "08"), {"articles": make_articles(250)})
+    doc_api.serve(window("00", "04"), {"articles": make_articles(250)})
+    doc_api.serve(window("04", "08"), {"articles": make_articles(250, prefix="https://example.com/b")})
+
+    with GdeltDoc(base_url=doc_api.base_url) as gd:
+        with pytest.warns(UserWarning, match="can't be split further"):
+            articles = gd.article_search_all(FILTERS, min_window=timedelta(hours=4))
+
+    assert len(articles) == 500
+    assert doc_api.requests == 3
+
+
+def test_empty_range(doc_api):
+    with GdeltDoc(base_url=doc_api.base_url) as gd:
+        assert gd.article_search_all(FILTERS).empty
+    assert doc_api.requests == 1
@@ -0,0 +1,57 @@
+from conftest import make_articles
+from gdeltdoc import Filters, GdeltDoc
+
+FILTERS = [
+    Filters(keyword=keyword, start_date="20250101000000", end_date="20250101080000")
+    for keyword in ["climate", "flood", "wildfire"]
+]
+
+
+def serve_overlapping(doc_api):
+    doc_api.serve(FILTERS[0], {"articles": make_articles(3)})
+    # The second search returns the articles of the first one again, plus two new ones
+    doc_api.serve(FILTERS[1], {"articles": make_articles(5)})
+    doc_api.serve(FILTERS[2], {})
+
+
+def test_results_are_combined_and_deduplicated(doc_api):
+    serve_overlapping(doc_api)
+    doc_api.server.latency = 0.1
+
+    with GdeltDoc(base_url=doc_api.base_url) as gd:
+        articles = gd.article_search_many(FILTERS, max_workers=3)
+
+    assert len(articles) == 5
+    assert articles["url"].is_unique
+    # Each article is credited to the filters which returned it first
+    first = articles.groupby("filter_index")["url"].apply(set).to_dict()
+    assert set().union(*first.values()) == {f"https://example.com/a{i}" for i in range(5)}
+    assert set(first) <= {0, 1}
+    assert doc_api.requests == 3
+
+
+def test_iter_yields_each_search_once(doc_api):
+    serve_overlapping(doc_api)
+
+    with GdeltDoc(base_url=doc_api.base_url) as gd:
+        results = list(gd.iter_article_search_many(FILTERS, max_workers=1))
+
+    # Filters with no new articles are skipped
+    assert [(index, len(articles)) for index, articles in results] == [(0, 3), (1, 2)]
+    assert all((articles["filter_index"] == index).all() for index, articles in results)
+
+
+def test_all_pages(doc_api):
+    for i, filters in enumerate(FILTERS):
+        doc_api.serve(filters.replace(num_records=250), {"articles": make_articles(2, prefix=f"https://example.com/{i}-")})
+
+    with GdeltDoc(base_url=doc_api.base_url) as gd:
+        articles = gd.article_search_many(FILTERS, all_pages=True)
+
+    assert len(articles) == 6
+    assert sorted(articles["filter_index"].unique()) == [0, 1, 2]
+
+
+def test_no_results(doc_api):
+    with GdeltDoc(base_url=doc_api.base_url) as gd:
+        assert gd.article_search_many(FILTERS).empty
@@ -0,0 +1,104 @@
+import os
+import time
+
+import pytest
+
+from gdeltdoc.cache import DiskCache, cache_key
+from scraping.html_cache import HtmlCache
+
+
+def stored_bytes(conn, table):
+    return conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+
+
+def random_html(size):
+    # Circa `size` byte una volta compresso
+    return os.urandom(size).hex()
+
+
+@pytest.fixture
+def html_cache(tmp_path):
+    with HtmlCache(str(tmp_path / "html.sqlite"), max_bytes=20_000) as cache:
+        yield cache
+
+
+def test_html_cache_total_matches_blobs(html_cache):
+    for i in range(30):
+        html_cache.put(f"https://example.com/{i % 20}", random_html(1500))
+        html_cache.put(f"https://mirror.com/{i}", "<html>stesso contenuto</html>")
+        assert html_cache.total_bytes() == stored_bytes(html_cache._conn, "blobs")
+        assert html_cache.total_bytes() <= html_cache.max_bytes
+    assert html_cache.evictions > 0
+
+
+def test_html_cache_evicts_least_recently_used(html_cache):
+    html_cache.put("https://example.com/old", random_html(8000))
+    html_cache.put("https://example.com/used", random_html(8000))
+    html_cache.get("https://example.com/used")
+    html_cache.put("https://example.com/new", random_html(8000))
+    assert "https://example.com/old" not in html_cache
+    assert "https://example.com/used" in html_cache
+    assert "https://example.com/new" in html_cache
+    assert html_cache.evictions == 1
+
+
+def test_html_cache_replaced_page_releases_orphan(html_cache):
+    html_cache.put("https://example.com/a", random_html(1000))
+    html_cache.put("https://example.com/a", random_html(1000))
+    assert html_cache._conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 1
+    assert html_cache.total_bytes() == stored_bytes(html_cache._conn, "blobs")
+
+
+def test_html_cache_total_survives_reopen(tmp_path):
+    path = str(tmp_path / "html.sqlite")
+    with HtmlCache(path) as cache:
+        cache.put("https://example.com/a", random_html(1000))
+        total = cache.total_bytes()
+    with HtmlCache(path) as cache:
+        assert cache.total_bytes() == total > 0
+
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    cache = DiskCache(str(tmp_path / "responses.sqlite"), max_bytes=20_000)
+    yield cache
+    cache.close()
+
+
+def test_disk_cache_total_matches_responses(disk_cache):
+    for i in range(30):
+        disk_cache.set("artlist", f"theme:T{i % 20}&timespan=1d", {"articles": random_html(1500)})
+        assert disk_cache.total_bytes() == stored_bytes(disk_cache._conn, "responses")
+        assert disk_cache.total_bytes() <= disk_cache.max_bytes
+    assert disk_cache.evictions > 0
+
+
+def test_disk_cache_evicts_least_recently_used(disk_cache):
+    disk_cache.set("artlist", "theme:OLD&timespan=1d", {"articles": random_html(8000)})
+    disk_cache.set("artlist", "theme:USED&timespan=1d", {"articles": random_html(8000)})
+    assert disk_cache.get("artlist", "theme:USED&timespan=1d") is not None
+    disk_cache.set("artlist", "theme:NEW&timespan=1d", {"articles": random_html(8000)})
+    assert disk_cache.get("artlist", "theme:OLD&timespan=1d") is None
+    assert disk_cache.get("artlist", "theme:USED&timespan=1d") is not None
+    assert disk_cache.evictions == 1
+
+
+def test_disk_cache_expired_responses_released(disk_cache, monkeypatch):
+    disk_cache.set("artlist", "theme:A&timespan=1d", {"articles": []})
+    total = disk_cache.total_bytes()
+    assert total == stored_bytes(disk_cache._conn, "responses") > 0
+
+    # Una risposta già scaduta esce subito, senza cambiare il totale
+    monkeypatch.setattr(disk_cache, "timespan_ttl", -1)
+    disk_cache.set("artlist", "theme:B&timespan=1d", {"articles": []})
+    assert disk_cache.total_bytes() == total
+    assert len(disk_cache) == 1
+
+    # Una risposta scaduta viene eliminata alla lettura
+    assert disk_cache._get(cache_key("artlist", "theme:A&timespan=1d"), time.time() + 10_000) is None
+    assert disk_cache.total_bytes() == stored_bytes(disk_cache._conn, "responses") == 0
+
+    monkeypatch.setattr(disk_cache, "timespan_ttl", 900)
+    disk_cache.set("artlist", "theme:C&timespan=1d", {"articles": []})
+    disk_cache.clear()
+    assert disk_cache.total_bytes() == 0
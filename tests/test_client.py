@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import pytest
+import requests
+
+from conftest import make_articles
+from gdeltdoc import AsyncGdeltDoc, Filters, GdeltDoc
+
+FILTERS = [
+    Filters(keyword=f"climate {i}", start_date="20250101000000", end_date="20250101080000")
+    for i in range(4)
+]
+
+
+def test_owned_session_is_pooled_and_closed(monkeypatch):
+    gd = GdeltDoc(pool_maxsize=4)
+    adapter = gd.session.get_adapter("https://api.gdeltproject.org")
+    assert adapter._pool_maxsize == 4
+
+    closed = []
+    monkeypatch.setattr(gd.session, "close", lambda: closed.append(True))
+    with gd:
+        pass
+    assert closed == [True]
+
+
+def test_supplied_session_is_left_open(monkeypatch):
+    session = requests.Session()
+    closed = []
+    monkeypatch.setattr(session, "close", lambda: closed.append(True))
+    with GdeltDoc(session=session) as gd:
+        assert gd.session is session
+    assert closed == []
+
+
+def test_queries_reuse_the_session(doc_api):
+    for i, filters in enumerate(FILTERS):
+        doc_api.serve(filters, {"articles": make_articles(i + 1)})
+    with GdeltDoc(base_url=doc_api.base_url) as gd:
+        assert [len(gd.article_search(filters)) for filters in FILTERS] == [1, 2, 3, 4]
+    assert doc_api.requests == 4
+
+
+def test_async_searches_run_concurrently(doc_api):
+    for i, filters in enumerate(FILTERS):
+        doc_api.serve(filters, {"articles": make_articles(i + 1)})
+    doc_api.server.latency = 0.3
+
+    async def search_all(max_concurrency):
+        client = GdeltDoc(base_url=doc_api.base_url, pool_maxsize=max_concurrency)
+        async with AsyncGdeltDoc(max_concurrency=max_concurrency, client=client) as gd:
+            return await asyncio.gather(*(gd.article_search(filters) for filters in FILTERS))
+
+    start = time.monotonic()
+    results = asyncio.run(search_all(4))
+    concurrent = time.monotonic() - start
+    # Results come back in the order of the filters
+    assert [len(articles) for articles in results] == [1, 2, 3, 4]
+
+    start = time.monotonic()
+    asyncio.run(search_all(1))
+    serial = time.monotonic() - start
+
+    assert concurrent < 0.9
+    assert serial >= 4 * 0.3
+
+
+def test_async_client_leaves_supplied_client_open(doc_api):
+    client = GdeltDoc(base_url=doc_api.base_url)
+
+    async def search():
+        async with AsyncGdeltDoc(client=client) as gd:
+            return await gd.article_search(FILTERS[0])
+
+    assert asyncio.run(search()).empty
+    assert client.session.get_adapter(doc_api.base_url).poolmanager.pools
+    client.close()
+
+
+def test_async_concurrency_is_validated():
+    with pytest.raises(ValueError):
+        AsyncGdeltDoc(max_concurrency=0)
@@ -0,0 +1,46 @@
+import os
+import signal
+import time
+
+import pandas as pd
+
+from conftest import ARTICLE_HTML
+from scraping.extract import extract_article
+from URLtextProcessor import URLTextProcessor
+
+
+def rows(site, n, prefix="/news/"):
+    urls = [site.url(f"{prefix}{i}") for i in range(n)]
+    return pd.DataFrame({"url": urls, "title": [f"Titolo {i}" for i in range(n)], "language": "Italian"})
+
+
+def test_extract_article():
+    text, _, _ = extract_article(ARTICLE_HTML.format(path="/a"), "https://example.com/a")
+    assert "Testo dell'articolo" in text
+    assert extract_article("", "https://example.com/a") == (None, None, None)
+
+
+def test_extraction_in_a_process_pool(tmp_path, site):
+    with URLTextProcessor(memory_file=str(tmp_path / "raw.json"), extract_workers=2, polite=False) as processor:
+        entries = processor._process_texts(rows(site, 6))
+        assert sorted(entry["url"] for entry in entries) == sorted(rows(site, 6)["url"])
+        assert processor._extract_pool is not None
+    # close() chiude anche il pool
+    assert processor._extract_pool is None
+
+
+def test_broken_pool_is_replaced(tmp_path, site):
+    with URLTextProcessor(memory_file=str(tmp_path / "raw.json"), extract_workers=1, polite=False) as processor:
+        pool = processor._extraction_executor()
+        # Avvia il processo del pool, poi lo termina come farebbe l'OOM killer
+        pool.submit(time.sleep, 0).result()
+        for process in list(pool._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+            process.join()
+
+        processor._process_texts(rows(site, 2))
+        assert processor.metrics.summary()["counters"]["extract_errors"] >= 1
+        assert processor._extract_pool is not pool
+
+        entries = processor._process_texts(rows(site, 2, prefix="/other/"))
+        assert len(entries) == 2
@@ -0,0 +1,104 @@
+import pytest
+
+from scraping import failures as failures_module
+from scraping.failures import EMPTY, PERMANENT, TRANSIENT, FailureRegistry
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(failures_module, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def registry(tmp_path, clock):
+    with FailureRegistry(str(tmp_path / "failures.sqlite"), permanent_ttl=1000, base_backoff=10, max_backoff=40,
+                         max_attempts=4, domain_min_failures=3, domain_failure_ratio=0.9, domain_ttl=500) as registry:
+        yield registry
+
+
+def retry_at(registry, url):
+    return registry._conn.execute("SELECT retry_at FROM failures WHERE url = ?", (url,)).fetchone()[0]
+
+
+def test_transient_backoff_doubles_up_to_max(registry, clock):
+    url = "https://example.com/a"
+    delays = []
+    for _ in range(3):
+        registry.record_failures([(url, TRANSIENT, "timeout")])
+        delays.append(retry_at(registry, url) - clock.now)
+    assert delays == [10, 20, 40]
+    assert url in registry.blocked([url])
+    assert registry.due() == []
+
+    clock.now += 40
+    assert registry.blocked([url]) == {}
+    assert registry.due() == [url]
+
+
+def test_transient_becomes_permanent_after_max_attempts(registry, clock):
+    url = "https://example.com/a"
+    for _ in range(4):
+        registry.record_failures([(url, TRANSIENT, "HTTP 503")])
+    assert registry.stats()["failures"] == {PERMANENT: 1}
+    assert retry_at(registry, url) - clock.now == 1000
+
+
+def test_permanent_ttl(registry, clock):
+    url = "https://example.com/a"
+    registry.record_failures([(url, EMPTY, "nessun testo estratto")])
+    assert registry.blocked([url]) == {url: f"{EMPTY}: nessun testo estratto"}
+    clock.now += 999
+    assert url in registry.blocked([url])
+    clock.now += 1
+    assert registry.blocked([url]) == {}
+
+
+def test_success_clears_failure(registry):
+    url = "https://example.com/a"
+    registry.record_failures([(url, TRANSIENT, "timeout")])
+    registry.record_successes([url])
+    assert len(registry) == 0
+    assert registry.blocked([url]) == {}
+
+
+def test_failures_match_other_versions_of_the_url(registry):
+    registry.record_failures([("https://www.example.com/a/amp?utm_source=x", PERMANENT, "HTTP 404")])
+    assert "http://example.com/a" in registry.blocked(["http://example.com/a"])
+
+
+def test_domain_blocked_after_mostly_permanent_failures(registry, clock):
+    urls = [f"https://paywall.com/{i}" for i in range(3)]
+    registry.record_failures([(url, PERMANENT, "HTTP 403") for url in urls[:2]])
+    assert registry.blocked(["https://paywall.com/new"]) == {}
+
+    registry.record_failures([(urls[2], PERMANENT, "HTTP 403")])
+    assert registry.blocked(["https://paywall.com/new"]) == {"https://paywall.com/new": "dominio escluso: HTTP 403"}
+    assert registry.stats()["blocked_domains"] == ["paywall.com"]
+
+    clock.now += 500
+    assert registry.blocked(["https://paywall.com/new"]) == {}
+
+
+def test_domain_with_successes_not_blocked(registry):
+    registry.record_successes([f"https://news.com/ok{i}" for i in range(10)])
+    registry.record_failures([(f"https://news.com/{i}", PERMANENT, "HTTP 404") for i in range(3)])
+    assert registry.blocked(["https://news.com/new"]) == {}
+    assert registry.stats()["blocked_domains"] == []
+
+
+def test_registry_persists(tmp_path, clock):
+    path = str(tmp_path / "failures.sqlite")
+    with FailureRegistry(path) as registry:
+        registry.record_failures([("https://example.com/a", TRANSIENT, "timeout")])
+    with FailureRegistry(path) as registry:
+        assert "https://example.com/a" in registry.blocked(["https://example.com/a"])
@@ -0,0 +1,120 @@
+import asyncio
+import collections
+import threading
+import time
+
+import requests
+
+from scraping.fetcher import AsyncFetcher, FetchResult, host_of, parse_retry_after
+
+
+def fetch_all(fetcher, urls):
+    async def collect():
+        return [result async for result in fetcher.fetch_many(urls)]
+
+    return asyncio.run(collect())
+
+
+def test_host_of():
+    assert host_of("https://WWW.Example.com:8080/a?b=1") == "example.com"
+    assert host_of("http://news.example.com/a") == "news.example.com"
+    assert host_of("not a url") == ""
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("domani") is None
+    # Una data già passata non fa attendere
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_pages_are_downloaded(site):
+    urls = [site.url(f"/news/{i}") for i in range(5)] + [site.url("/404")]
+    with AsyncFetcher(max_concurrency=4, max_per_host=2) as fetcher:
+        results = {result.url: result for result in fetch_all(fetcher, urls)}
+
+    assert set(results) == set(urls)
+    assert all(results[url].ok and "Articolo /news/" in results[url].html for url in urls[:5])
+    missing = results[site.url("/404")]
+    assert (missing.ok, missing.status_code) == (False, 404)
+    assert sorted(site.requests) == sorted(url[len(site.base_url):] for url in urls)
+
+
+def test_global_and_per_host_limits(monkeypatch):
+    lock = threading.Lock()
+    active = collections.Counter()
+    peak = collections.Counter()
+
+    def fetch_sync(url):
+        # Download finto: conta i download in corso, in totale e per dominio
+        host = host_of(url)
+        with lock:
+            active[host] += 1
+            active["*"] += 1
+            peak[host] = max(peak[host], active[host])
+            peak["*"] = max(peak["*"], active["*"])
+        time.sleep(0.05)
+        with lock:
+            active[host] -= 1
+            active["*"] -= 1
+        return FetchResult(url, 200, "<html></html>", elapsed=0.05)
+
+    hosts = ["a.example", "b.example", "c.example"]
+    urls = [f"https://{host}/{i}" for host in hosts for i in range(6)]
+    with AsyncFetcher(max_concurrency=4, max_per_host=2) as fetcher:
+        monkeypatch.setattr(fetcher, "fetch_sync", fetch_sync)
+        results = fetch_all(fetcher, urls)
+
+    assert len(results) == len(urls) and all(result.ok for result in results)
+    assert all(peak[host] <= 2 for host in hosts)
+    # I domini scaricano in parallelo fino al limite globale
+    assert 2 < peak["*"] <= 4
+
+
+def test_supplied_session_is_left_open(monkeypatch):
+    session = requests.Session()
+    closed = []
+    monkeypatch.setattr(session, "close", lambda: closed.append(True))
+    with AsyncFetcher(session=session):
+        pass
+    assert closed == []
+
+
+def test_unsupported_content_type_is_dropped(site):
+    with AsyncFetcher() as fetcher:
+        result = fetcher.fetch_sync(site.url("/pdf"))
+    assert not result.ok and result.permanent
+    assert "application/pdf" in result.error
+
+
+def test_large_pages_are_dropped(site, monkeypatch):
+    with AsyncFetcher(max_bytes=100_000) as fetcher:
+        declared = fetcher.fetch_sync(site.url("/big"))
+        assert not declared.ok and declared.permanent
+        assert "dichiarati" in declared.error
+
+        # Senza Content-Length il download si ferma appena supera il limite
+        monkeypatch.setattr("scraping.fetcher._CHUNK_SIZE", 16 * 1024)
+        get = fetcher.session.get
+
+        def get_without_length(*args, **kwargs):
+            response = get(*args, **kwargs)
+            del response.headers["Content-Length"]
+            return response
+
+        monkeypatch.setattr(fetcher.session, "get", get_without_length)
+        streamed = fetcher.fetch_sync(site.url("/big"))
+        assert not streamed.ok and streamed.permanent
+        assert "oltre 100000 byte" in streamed.error
+
+    with AsyncFetcher(max_bytes=None) as fetcher:
+        assert fetcher.fetch_sync(site.url("/big")).ok
+
+
+def test_slow_pages_hit_the_deadline(site):
+    with AsyncFetcher(deadline=0.5) as fetcher:
+        result = fetcher.fetch_sync(site.url("/slow"))
+    # Un sito lento può rispondere in tempo al prossimo tentativo
+    assert not result.ok and not result.permanent
+    assert "Durata massima" in result.error
@@ -0,0 +1,64 @@
+import pytest
+
+from gdeltdoc import Filters
+from gdeltdoc.filters import near, repeat
+
+EQUIVALENT = [
+    (
+        Filters(start_date="2025-01-01", end_date="2025-01-02", keyword="climate change"),
+        Filters(start_date="20250101000000", end_date="20250102", keyword=["climate change"]),
+    ),
+    (
+        Filters(timespan="24hours", country=["US", "IT"], tone="> 5"),
+        Filters(timespan="24h", country=["IT", "US"], tone=">5"),
+    ),
+    (
+        Filters(timespan="7d", domain=["cnn.com"], near=near(5, "airline", "climate")),
+        Filters(timespan="7days", domain="cnn.com", near='near5:"airline  climate"'),
+    ),
+    (
+        Filters(timespan="1d", keyword=["wildfire", "flood"], repeat=repeat(2, "fire")),
+        Filters(timespan="1d", keyword=["flood", " wildfire"], repeat='repeat2:"fire"'),
+    ),
+]
+
+
+@pytest.mark.parametrize("a, b", EQUIVALENT)
+def test_equivalent_filters_send_the_same_query(a, b):
+    assert a == b and hash(a) == hash(b)
+    assert a.fingerprint() == b.fingerprint()
+    assert a.query_string == b.query_string
+
+
+def test_dates_are_sent_in_full():
+    f = Filters(start_date="2025-01-01", end_date="2025-01-02")
+    assert "&startdatetime=20250101000000&enddatetime=20250102000000" in f.query_string
+
+
+def test_different_searches_differ():
+    base = Filters(timespan="1d", keyword="climate")
+    for other in [base.replace(keyword="weather"), base.replace(timespan="2d"), base.replace(num_records=10),
+                  base.replace(keyword=["climate", "weather"]), base.replace(sort="datedesc")]:
+        assert other != base
+        assert other.fingerprint() != base.fingerprint()
+        assert other.query_string != base.query_string
+
+
+def test_filters_are_immutable():
+    f = Filters(timespan="1d", keyword=["climate"])
+    with pytest.raises(AttributeError):
+        f.keyword = "weather"
+    assert f.replace(keyword="weather").query_string.startswith('"weather" ')
+    assert {f: 1}[Filters(timespan="1d", keyword="climate")] == 1
+
+
+@pytest.mark.parametrize("arguments", [
+    dict(keyword="climate"),
+    dict(timespan="1d", start_date="2025-01-01", end_date="2025-01-02"),
+    dict(timespan="10min"),
+    dict(timespan="3y"),
+    dict(timespan="1d", num_records=251),
+])
+def test_invalid_filters(arguments):
+    with pytest.raises(ValueError):
+        Filters(**arguments)
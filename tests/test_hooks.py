@@ -0,0 +1,58 @@
+import pytest
+
+from conftest import make_articles
+from gdeltdoc import Filters, GdeltDoc, MemoryCache, RequestStats
+
+FILTERS = Filters(keyword="climate", start_date="20250101000000", end_date="20250101080000")
+
+
+def test_events_describe_each_query(doc_api):
+    events = []
+    stats = RequestStats()
+    doc_api.serve(FILTERS, {"articles": make_articles(3)})
+    with GdeltDoc(base_url=doc_api.base_url, cache=MemoryCache(), observers=[events.append, stats]) as gd:
+        gd.article_search(FILTERS)
+        gd.article_search(FILTERS)
+
+    first, second = events
+    assert (first.mode, first.status_code, first.rows, first.cache_hit) == ("artlist", 200, 3, False)
+    assert first.response_bytes > 0 and first.latency > 0
+    assert (second.cache_hit, second.rows, second.response_bytes) == (True, 3, 0)
+
+    summary = stats.summary()["artlist"]
+    assert (summary["requests"], summary["cache_hits"], summary["rows"], summary["errors"]) == (2, 1, 6, 0)
+    assert "artlist" in stats.report()
+
+
+def test_parse_failures_and_repairs_are_recorded(doc_api, caplog):
+    events = []
+    broken = FILTERS.replace(keyword="broken")
+    repaired = FILTERS.replace(keyword="repaired")
+    doc_api.serve(broken, body=b'{"articles": [')
+    doc_api.serve(repaired, body=b'{"articles": [{"url": "https://example.com/a", "title": "L\\\'Italia"}]}')
+    with GdeltDoc(base_url=doc_api.base_url, observers=[events.append]) as gd:
+        assert gd.article_search(broken).empty
+        assert len(gd.article_search(repaired)) == 1
+
+    assert events[0].parse_failed and "Could not parse the response" in caplog.text
+    assert (events[1].parse_failed, events[1].parse_repairs) == (False, 1)
+
+
+def test_errors_are_recorded_and_raised(doc_api):
+    events = []
+    doc_api.serve(FILTERS, status=500, content_type="text/html", body=b"Internal Server Error")
+    with GdeltDoc(base_url=doc_api.base_url, observers=[events.append]) as gd:
+        with pytest.raises(ValueError):
+            gd.article_search(FILTERS)
+    assert isinstance(events[0].error, ValueError)
+    assert events[0].status_code == 500
+
+
+def test_broken_observer_does_not_break_the_query(doc_api):
+    def broken(event):
+        raise RuntimeError("boom")
+
+    doc_api.serve(FILTERS, {"articles": make_articles(1)})
+    with GdeltDoc(base_url=doc_api.base_url, observers=[broken]) as gd:
+        with pytest.warns(UserWarning, match="boom"):
+            assert len(gd.article_search(FILTERS)) == 1
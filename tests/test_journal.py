@@ -0,0 +1,117 @@
+import sqlite3
+
+import pytest
+
+from gdeltdoc import plan_queries
+from scraping.journal import RunJournal
+from URLtextProcessor import URLTextProcessor
+
+WINDOW = ("20250101000000", "20250101080000")
+
+
+@pytest.fixture
+def plan():
+    return plan_queries([WINDOW], ["US", "IT"], ["ELECTION"], [">0", ">5"], merge_countries=False, mode="artlist")
+
+
+def articles(*names):
+    return [{"url": f"https://example.com/{name}"} for name in names]
+
+
+def crash(journal):
+    # Il processo muore: la connessione si chiude senza scrivere gli articoli in memoria
+    journal._conn.close()
+
+
+def test_resume_after_unflushed_crash(tmp_path, plan):
+    path = str(tmp_path / "journal.sqlite")
+    first, second = plan.queries
+
+    journal = RunJournal(path, batch_size=3, flush_interval=1e9)
+    journal.record_articles(first, articles("a", "b"))
+    journal.finish(first, 2)
+    journal.record_articles(second, articles("c", "d", "e"))
+    journal.record_articles(second, articles("f"))
+    crash(journal)
+
+    with RunJournal(path, batch_size=3, flush_interval=1e9) as journal:
+        # La prima query è completa, della seconda restano solo i blocchi già scritti
+        assert journal.pending(plan.queries) == [second]
+        assert journal.fetched_urls(second) == {f"https://example.com/{name}" for name in "cde"}
+
+        journal.record_articles(second, articles("f", "g"))
+        journal.finish(second, 5)
+        assert journal.pending(plan.queries) == []
+        assert journal.window_urls(WINDOW) == [f"https://example.com/{name}" for name in "abcdefg"]
+        assert journal.stats() == {"units": 4, "queries": 2, "articles": 7}
+
+
+def test_finish_writes_buffered_articles(tmp_path, plan):
+    path = str(tmp_path / "journal.sqlite")
+    query = plan.queries[0]
+
+    journal = RunJournal(path, batch_size=100, flush_interval=1e9)
+    journal.record_articles(query, articles("a", "b"))
+    journal.finish(query, 2)
+    crash(journal)
+
+    with RunJournal(path) as journal:
+        assert journal.is_finished(query)
+        assert journal.fetched_urls(query) == {"https://example.com/a", "https://example.com/b"}
+
+
+def test_unfinished_query_stays_pending(tmp_path, plan):
+    path = str(tmp_path / "journal.sqlite")
+    with RunJournal(path) as journal:
+        journal.record_articles(plan.queries[0], articles("a"))
+    with RunJournal(path) as journal:
+        assert journal.pending(plan.queries) == plan.queries
+        assert journal.fetched_urls(plan.queries[0]) == {"https://example.com/a"}
+
+
+def test_every_outcome_is_recorded(tmp_path, plan):
+    path = str(tmp_path / "journal.sqlite")
+    query = plan.queries[0]
+    journal = RunJournal(path, batch_size=2, flush_interval=1e9)
+    journal.record_outcomes(query, [("https://example.com/a", "failed"), ("https://example.com/b", "empty")])
+    journal.record_articles(query, articles("c"))
+    # Un URL fallito e poi salvato risulta salvato, non il contrario
+    journal.record_outcomes(query, [("https://example.com/c", "skipped")])
+    journal.record_articles(query, articles("a"))
+    journal.flush()
+    crash(journal)
+
+    with RunJournal(path) as journal:
+        assert journal.fetched_urls(query) == {f"https://example.com/{name}" for name in "abc"}
+        assert journal.window_urls(WINDOW) == ["https://example.com/c", "https://example.com/a"]
+        assert journal.stats() == {"units": 0, "queries": 0, "articles": 2, "empty": 1}
+
+
+def test_old_journals_get_outcomes(tmp_path, plan):
+    path = str(tmp_path / "journal.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE fetches (query TEXT NOT NULL, url TEXT NOT NULL, window_start TEXT NOT NULL, "
+                 "window_end TEXT NOT NULL, fetched_at REAL NOT NULL, PRIMARY KEY (query, url)) WITHOUT ROWID")
+    conn.execute("INSERT INTO fetches VALUES (?, ?, ?, ?, 0)", (plan.queries[0].filters.query_string, "https://example.com/a", *WINDOW))
+    conn.commit()
+    conn.close()
+
+    with RunJournal(path) as journal:
+        journal.record_outcomes(plan.queries[0], [("https://example.com/b", "failed")])
+        assert journal.window_urls(WINDOW) == ["https://example.com/a"]
+        assert journal.fetched_urls(plan.queries[0]) == {"https://example.com/a", "https://example.com/b"}
+
+
+def test_stream_reports_urls_without_articles(tmp_path, site):
+    outcomes = {}
+    urls = [site.url("/news/1"), site.url("/404"), site.url("/empty"), site.url("/pdf")]
+    with URLTextProcessor(memory_file=str(tmp_path / "raw.json"), extract_workers=0, polite=False,
+                          seen_index=str(tmp_path / "seen.sqlite")) as processor:
+        saved = list(processor.stream_articles(urls, save=True, on_outcome=lambda url, outcome: outcomes.update({url: outcome})))
+        assert [article["url"] for article in saved] == [site.url("/news/1")]
+        assert outcomes == {site.url("/404"): "failed", site.url("/empty"): "empty", site.url("/pdf"): "failed"}
+
+        # Al secondo passaggio l'articolo è già stato scaricato
+        outcomes.clear()
+        assert list(processor.stream_articles(urls[:1], on_outcome=lambda url, outcome: outcomes.update({url: outcome}))) == []
+        assert outcomes == {site.url("/news/1"): "skipped"}
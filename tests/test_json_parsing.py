@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from gdeltdoc.helpers import load_json, parse_json, sanitize_json
+
+
+def test_valid_document_is_not_repaired():
+    document = json.dumps({"articles": [{"title": "Caffè \"corretto\"\n"}]})
+    assert parse_json(document) == (json.loads(document), 0)
+
+
+def test_invalid_escapes_and_control_characters_are_replaced():
+    document = '{"articles": [{"title": "L\\\'Italia\tvota\nancora", "url": "https://example.com/a\\b"}]}'
+    sanitized, repairs = sanitize_json(document)
+    assert repairs == 3
+    assert json.loads(sanitized)["articles"][0]["title"] == "L 'Italia vota ancora"
+
+
+def test_valid_escapes_are_kept():
+    document = '{"title": "\\"a\\" \\\\ \\u00e8 \\n", "bad": "\\x"}'
+    result, repairs = parse_json(document.encode("utf-8"))
+    assert repairs == 1
+    assert result == {"title": '"a" \\ è \n', "bad": " x"}
+
+
+def test_max_repairs():
+    document = '{"title": "' + "\\'" * 150 + '"}'
+    with pytest.raises(ValueError):
+        load_json(document)
+    assert parse_json(document, max_repairs=None)[1] == 150
+    assert load_json(document, max_repairs=200)["title"] == " '" * 150
+
+
+def test_unrecoverable_document():
+    with pytest.raises(ValueError):
+        parse_json('{"articles": [')
+
+
+def test_parsing_is_linear_in_repairs():
+    # The old recursive parser hit the recursion limit with thousands of characters to replace
+    document = '{"title": "' + "\\'" * 20_000 + '"}'
+    assert parse_json(document, max_repairs=None)[1] == 20_000
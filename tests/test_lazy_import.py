@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import gdeltdoc
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+LIGHT_CODE = """
+import sys
+from gdeltdoc import Filters, MemoryCache, RateLimiter, plan_queries
+
+Filters(keyword="climate", timespan="1d").query_string
+plan_queries([("2025-01-01", "2025-01-02")], ["US", "IT"], ["ELECTION"], [">5"])
+MemoryCache(max_entries=10)
+RateLimiter()
+print(",".join(m for m in ["pandas", "numpy", "requests", "pyarrow", "trafilatura"] if m in sys.modules))
+"""
+
+
+def test_light_names_do_not_load_heavy_modules():
+    # A fresh interpreter, since the test session has already imported pandas and requests
+    env = {**os.environ, "PYTHONPATH": SRC}
+    result = subprocess.run([sys.executable, "-c", LIGHT_CODE], env=env, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
+
+
+@pytest.mark.parametrize("name", gdeltdoc.__all__)
+def test_public_names_resolve(name):
+    assert getattr(gdeltdoc, name) is not None
+    assert name in dir(gdeltdoc)
+
+
+def test_unknown_name():
+    with pytest.raises(AttributeError):
+        gdeltdoc.NotAClient
@@ -0,0 +1,72 @@
+import json
+import logging
+
+from scraping.fetcher import FetchResult
+from scraping.metrics import LatencyHistogram, ScrapeMetrics, error_kind
+from URLtextProcessor import URLTextProcessor
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) == 0.0
+    for seconds in [0.003] * 90 + [0.2] * 9 + [7.5]:
+        histogram.observe(seconds)
+
+    # I percentili cadono al limite del bucket, senza superare il massimo osservato
+    assert histogram.percentile(50) == 0.005
+    assert histogram.percentile(95) == 0.25
+    assert histogram.percentile(99) == 0.25
+    assert histogram.percentile(100) == 7.5
+    summary = histogram.as_dict()
+    assert (summary["count"], summary["max"], summary["buckets"]["0.005"]) == (100, 7.5, 90)
+
+    histogram.observe(120)
+    assert histogram.as_dict()["buckets"]["inf"] == 1 and histogram.percentile(100) == 120
+
+
+def test_errors_keep_a_few_samples(tmp_path):
+    metrics = ScrapeMetrics(error_samples=2)
+    for i in range(5):
+        metrics.error("fetch", "HTTP 404", f"https://example.com/{i}", "Not found")
+    try:
+        raise ValueError("pagina non valida")
+    except ValueError as e:
+        metrics.error("extract", "ValueError", "https://example.com/x", str(e), exc=e)
+    metrics.count("fetch_ok", 3)
+    metrics.observe("fetch", 0.1)
+
+    summary = metrics.summary()
+    assert summary["counters"] == {"fetch_ok": 3}
+    assert summary["latency"]["fetch"]["count"] == 1
+    assert summary["errors"]["fetch: HTTP 404"]["count"] == 5
+    assert len(summary["errors"]["fetch: HTTP 404"]["samples"]) == 2
+    assert "pagina non valida" in summary["errors"]["extract: ValueError"]["samples"][0]["traceback"]
+    assert "HTTP 404" in metrics.report()
+
+    metrics.dump(str(tmp_path / "metrics.json"))
+    with open(tmp_path / "metrics.json", encoding="utf-8") as f:
+        assert json.load(f)["counters"] == {"fetch_ok": 3}
+
+    metrics.reset()
+    assert metrics.summary()["counters"] == {} and metrics.summary()["errors"] == {}
+
+
+def test_error_kind():
+    assert error_kind(FetchResult("u", 503, error="503 Server Error")) == "HTTP 503"
+    assert error_kind(FetchResult("u", error="Timeout raggiunto: read timed out")) == "Timeout raggiunto"
+    assert error_kind(FetchResult("u")) == "sconosciuto"
+
+
+def test_processor_records_metrics(tmp_path, site, caplog):
+    urls = [site.url("/news/1"), site.url("/news/2"), site.url("/404")]
+    with caplog.at_level(logging.DEBUG, logger="URLtextProcessor"):
+        with URLTextProcessor(memory_file=str(tmp_path / "raw.json"), extract_workers=0, polite=False) as processor:
+            articles = list(processor.stream_articles(urls))
+            summary = processor.metrics.summary()
+
+    assert len(articles) == 2
+    assert summary["latency"]["fetch"]["count"] == 3
+    assert summary["latency"]["extract"]["count"] == 2
+    assert summary["errors"]["fetch: HTTP 404"]["samples"][0]["url"] == site.url("/404")
+    # I messaggi per singolo URL vanno al logger a livello DEBUG
+    assert any(record.levelno == logging.DEBUG and site.url("/news/1") in record.getMessage() for record in caplog.records)
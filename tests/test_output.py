@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+
+from conftest import make_articles
+from gdeltdoc import Filters, GdeltDoc
+from gdeltdoc.helpers import compact_articles
+
+FILTERS = Filters(keyword="climate", start_date="20250101000000", end_date="20250101080000")
+
+
+def articles_frame():
+    articles = pd.DataFrame(make_articles(3, seendate="20250528T004500Z"))
+    articles.loc[2, "seendate"] = "not a date"
+    return articles
+
+
+def test_compact_dtypes():
+    articles = compact_articles(articles_frame())
+
+    for column in ["domain", "language", "sourcecountry"]:
+        assert isinstance(articles[column].dtype, pd.CategoricalDtype)
+    assert str(articles["seendate"].dt.tz) == "UTC"
+    assert articles.loc[0, "seendate"] == pd.Timestamp("2025-05-28 00:45:00", tz="UTC")
+    assert pd.isna(articles.loc[2, "seendate"])
+    # The other columns are left alone
+    assert articles["url"].tolist() == articles_frame()["url"].tolist()
+
+
+def test_object_output_is_unchanged():
+    articles = articles_frame()
+    assert compact_articles(articles, "object") is articles
+
+
+def test_arrow_dtypes():
+    pytest.importorskip("pyarrow")
+    articles = compact_articles(articles_frame(), "arrow")
+
+    assert all(isinstance(dtype, pd.ArrowDtype) for dtype in articles.dtypes)
+    assert articles.loc[0, "seendate"] == pd.Timestamp("2025-05-28 00:45:00", tz="UTC")
+
+
+def test_unknown_output():
+    with pytest.raises(ValueError):
+        compact_articles(articles_frame(), "parquet")
+    with pytest.raises(ValueError):
+        GdeltDoc(output="parquet")
+
+
+def test_client_output(doc_api):
+    # Two windows with different categories, concatenated by article_search_all
+    doc_api.serve(FILTERS, {"articles": make_articles(250)})
+    first = make_articles(2, prefix="https://example.com/b")
+    second = make_articles(2, prefix="https://example.com/c")
+    for article in second:
+        article["sourcecountry"] = "Italy"
+    doc_api.serve(FILTERS.replace(end_date="20250101040000"), {"articles": first})
+    doc_api.serve(FILTERS.replace(start_date="20250101040000"), {"articles": second})
+
+    with GdeltDoc(base_url=doc_api.base_url, output="compact") as gd:
+        page = gd.article_search(FILTERS.replace(end_date="20250101040000"))
+        articles = gd.article_search_all(FILTERS)
+
+    assert isinstance(page["domain"].dtype, pd.CategoricalDtype)
+    assert isinstance(articles["sourcecountry"].dtype, pd.CategoricalDtype)
+    assert set(articles["sourcecountry"]) == {"United States", "Italy"}
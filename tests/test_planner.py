@@ -0,0 +1,75 @@
+from itertools import product
+
+import pandas as pd
+
+from conftest import make_articles
+from gdeltdoc import GdeltDoc, plan_queries
+from gdeltdoc.planner import load_country_names
+
+WINDOWS = [("20250101000000", "20250101080000"), ("20250101080000", "20250101160000")]
+COUNTRIES = ["US", "UK", "IT"]
+THEMES = ["ELECTION", "ELECTION_FRAUD", "GOV_REFORM"]
+TONES = [">0", ">5", ">10"]
+COUNTRY_NAMES = {"US": "United States", "UK": "United Kingdom", "IT": "Italy"}
+
+
+def test_plan_covers_every_bucket_once():
+    plan = plan_queries(WINDOWS, COUNTRIES, THEMES, TONES, max_or_terms=2, mode="artlist")
+
+    buckets = [bucket for query in plan for bucket in query.buckets]
+    assert sorted(buckets) == sorted(product(WINDOWS, COUNTRIES, THEMES, TONES))
+    # 2 windows x 2 country groups x 2 theme groups x the loosest tone
+    assert (plan.naive_calls, plan.planned_calls) == (54, 8)
+    assert all(query.tone_abs == ">0" for query in plan)
+    assert list(plan.by_window()) == WINDOWS
+
+
+def test_unmerged_plan_is_the_original_loop():
+    plan = plan_queries(WINDOWS, COUNTRIES, THEMES, TONES, merge_countries=False, merge_themes=False, merge_tones=False)
+    assert plan.planned_calls == plan.naive_calls == 54 and plan.calls_saved == 0
+    assert [query.buckets for query in plan] == [[bucket] for bucket in product(WINDOWS, COUNTRIES, THEMES, TONES)]
+
+
+def test_merged_results_split_back_into_buckets(doc_api):
+    # The merged query returns the union of the articles of the per-country queries
+    merged = plan_queries(WINDOWS[:1], COUNTRIES, ["ELECTION"], TONES).queries[0]
+    split = plan_queries(WINDOWS[:1], COUNTRIES, ["ELECTION"], TONES, merge_countries=False).queries
+    per_country = {}
+    for query in split:
+        country = query.countries[0]
+        articles = make_articles(3, prefix=f"https://{country.lower()}.example.com/a")
+        for article in articles:
+            article["sourcecountry"] = COUNTRY_NAMES[country]
+        per_country[country] = articles
+        doc_api.serve(query.filters, {"articles": articles})
+    doc_api.serve(merged.filters, {"articles": [a for articles in per_country.values() for a in articles]})
+
+    with GdeltDoc(base_url=doc_api.base_url) as gd:
+        labelled = merged.assign_buckets(gd.article_search(merged.filters), COUNTRY_NAMES)
+        for query in split:
+            expected = query.assign_buckets(gd.article_search(query.filters))
+            country = query.countries[0]
+            assert labelled[labelled["country"] == country]["url"].tolist() == expected["url"].tolist()
+            assert (expected["country"] == country).all()
+
+    assert (labelled["theme"] == "ELECTION").all() and (labelled["tone_abs"] == ">0").all()
+
+
+def test_assign_buckets_limit():
+    query = plan_queries(WINDOWS[:1], COUNTRIES, THEMES[:2], TONES).queries[0]
+    articles = pd.DataFrame({
+        "url": [f"https://example.com/{i}" for i in range(10)],
+        "sourcecountry": ["Italy"] * 5 + ["United States"] + ["Atlantis"] * 4,
+    })
+
+    limited = query.assign_buckets(articles, COUNTRY_NAMES, limit=1)
+    # Two themes merged: two articles per country; the unresolved country stands for all three
+    assert limited["url"].str[-1].tolist() == ["0", "1", "5", "6", "7", "8", "9"]
+    assert limited["country"].isna().sum() == 4
+    assert query.assign_buckets(articles.iloc[:0], COUNTRY_NAMES, limit=1).empty
+
+
+def test_load_country_names(tmp_path):
+    path = tmp_path / "countries.txt"
+    path.write_bytes(b"IT\tItaly  \r\nUK\tUnited Kingdom\r\n\r\n")
+    assert load_country_names(str(path)) == {"IT": "Italy", "UK": "United Kingdom"}
@@ -0,0 +1,114 @@
+import asyncio
+import time
+import urllib.robotparser
+
+from scraping.fetcher import FetchResult
+from scraping.politeness import DomainScheduler, RobotsCache
+
+ROBOTS = """
+User-agent: *
+Disallow: /private
+Crawl-delay: 2
+"""
+
+
+def robots_cache(text):
+    robots = RobotsCache(user_agent="test-bot")
+    downloads = []
+
+    def download(origin):
+        downloads.append(origin)
+        parser = urllib.robotparser.RobotFileParser()
+        parser.parse(text.splitlines())
+        return parser, robots.ttl
+
+    robots.download = download
+    return robots, downloads
+
+
+def test_robots_rules_and_crawl_delay():
+    robots, downloads = robots_cache(ROBOTS)
+    scheduler = DomainScheduler(robots=robots)
+
+    async def check():
+        return [
+            await scheduler.check("https://example.com/news/1", "example.com"),
+            await scheduler.check("https://example.com/private/1", "example.com"),
+        ]
+
+    allowed, blocked = asyncio.run(check())
+    assert allowed is None
+    assert "robots.txt" in blocked
+    # Il robots.txt viene scaricato una sola volta per origine
+    assert downloads == ["https://example.com"]
+    stats = scheduler.stats()["example.com"]
+    assert (stats["crawl_delay"], stats["blocked"]) == (2.0, 1)
+
+    strict = DomainScheduler(robots=robots, max_crawl_delay=1)
+    assert "Crawl-delay" in asyncio.run(strict.check("https://example.com/news/1", "example.com"))
+
+
+def test_crawl_delay_spaces_requests_out():
+    # Una richiesta ogni 0.2 secondi (Crawl-delay accetta solo secondi interi)
+    robots, _ = robots_cache("User-agent: *\nRequest-rate: 5/1\n")
+    scheduler = DomainScheduler(max_per_host=4, adaptive=False, robots=robots)
+    starts = []
+
+    async def download(url):
+        await scheduler.check(url, "example.com")
+        async with scheduler.slot("example.com"):
+            starts.append(time.monotonic())
+
+    async def main():
+        await asyncio.gather(*(download(f"https://example.com/{i}") for i in range(3)))
+
+    asyncio.run(main())
+    assert all(later - earlier >= 0.19 for earlier, later in zip(starts, starts[1:]))
+
+
+def test_slots_are_limited_per_domain():
+    scheduler = DomainScheduler(max_per_host=2, adaptive=False)
+    active = {"a": 0, "b": 0}
+    peak = {"a": 0, "b": 0}
+
+    async def download(host):
+        async with scheduler.slot(host):
+            active[host] += 1
+            peak[host] = max(peak[host], active[host])
+            await asyncio.sleep(0.01)
+            active[host] -= 1
+
+    async def main():
+        await asyncio.gather(*(download(host) for host in "ab" * 5))
+
+    asyncio.run(main())
+    assert peak == {"a": 2, "b": 2}
+
+
+def test_adaptive_concurrency():
+    scheduler = DomainScheduler(max_per_host=4, initial_per_host=2, base_backoff=10)
+
+    async def main():
+        for _ in range(2):
+            scheduler.record("example.com", FetchResult("u", 200, "<html></html>", elapsed=0.1))
+        ramped = scheduler.stats()["example.com"]["concurrency"]
+
+        scheduler.record("example.com", FetchResult("u", 500, error="errore"))
+        after_error = scheduler.stats()["example.com"]["concurrency"]
+        scheduler.record("example.com", FetchResult("u", 404, error="mancante"))
+        after_missing = scheduler.stats()["example.com"]["concurrency"]
+
+        scheduler.record("example.com", FetchResult("u", 429, error="troppe richieste", retry_after=30))
+        domain = scheduler._domain("example.com")
+        return ramped, after_error, after_missing, domain.limit, domain.next_start - time.monotonic()
+
+    ramped, after_error, after_missing, throttled, pause = asyncio.run(main())
+    # Una serie di risposte veloci alza il limite, un errore del server lo abbassa, una pagina mancante no
+    assert (ramped, after_error, after_missing) == (3, 2, 2)
+    # Un 429 dimezza il limite e sospende il dominio per il tempo di Retry-After
+    assert throttled == 1
+    assert 29 < pause <= 30
+
+    stats = scheduler.stats()["example.com"]
+    assert (stats["requests"], stats["ok"], stats["errors"], stats["throttled"]) == (5, 2, 2, 1)
+    assert "example.com" in scheduler.report()
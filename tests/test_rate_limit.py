@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from conftest import make_articles
+from gdeltdoc import Filters, GdeltDoc, RateLimiter
+from gdeltdoc.errors import RateLimitError
+from gdeltdoc.rate_limit import is_throttled
+from gdeltdoc.replay import THROTTLE_BODY
+
+FILTERS = Filters(keyword="climate", start_date="20250101000000", end_date="20250101080000")
+
+
+def test_is_throttled():
+    assert is_throttled(429, "text/plain", b"")
+    assert is_throttled(200, "text/html", THROTTLE_BODY)
+    assert not is_throttled(200, "application/json", THROTTLE_BODY)
+    assert not is_throttled(200, "text/html", b"<html>Invalid query</html>")
+
+
+def test_rates_are_validated():
+    with pytest.raises(ValueError):
+        RateLimiter(rate=2, max_rate=1)
+
+
+def test_acquire_spaces_requests_out():
+    limiter = RateLimiter(rate=20, max_rate=20, burst=1)
+    start = time.monotonic()
+    waits = [limiter.acquire() for _ in range(4)]
+    elapsed = time.monotonic() - start
+
+    assert waits[0] == 0.0
+    assert elapsed >= 3 / 20 * 0.9
+    assert limiter.stats()["held_back"] == 3
+
+
+def test_rate_ramps_up_and_halves_down():
+    limiter = RateLimiter(rate=0.5, max_rate=0.6, min_rate=0.1, increase_step=0.25, base_delay=1, max_delay=2)
+    limiter.on_success()
+    assert limiter.rate == 0.6
+
+    delays = [limiter.on_throttle(attempt) for attempt in range(4)]
+    assert limiter.rate == 0.1
+    assert all(0 <= delay <= 2 for delay in delays)
+    assert (limiter.throttled, limiter.retries) == (4, 4)
+
+
+def test_throttled_requests_are_retried(doc_api, monkeypatch):
+    events = []
+    respond = doc_api.server.respond
+    throttled = iter([True, True])
+    # The first two requests are throttled, the following ones answered normally
+    monkeypatch.setattr(doc_api.server, "respond", lambda url: (
+        (429, "text/plain", THROTTLE_BODY) if next(throttled, False) else respond(url)
+    ))
+    doc_api.serve(FILTERS, {"articles": make_articles(2)})
+    limiter = RateLimiter(rate=40, max_rate=40, burst=10, base_delay=0.01)
+    with GdeltDoc(base_url=doc_api.base_url, rate_limiter=limiter, observers=[events.append]) as gd:
+        assert len(gd.article_search(FILTERS)) == 2
+
+    assert events[0].retries == limiter.retries == 2
+    assert limiter.rate == 40 / 4 + limiter.increase_step
+
+
+def test_exhausted_retries_only_back_off_for_actual_retries(doc_api):
+    doc_api.server.throttle_rate = 1.0
+    limiter = RateLimiter(rate=40, max_rate=40, min_rate=0.01, burst=10, max_retries=2, base_delay=0.01)
+    with GdeltDoc(base_url=doc_api.base_url, rate_limiter=limiter) as gd:
+        with pytest.raises(RateLimitError):
+            gd.article_search(FILTERS)
+
+    assert doc_api.requests == 3
+    assert (limiter.throttled, limiter.retries) == (2, 2)
+    assert limiter.rate == 10
+
+
+def test_throttling_without_limiter_raises(doc_api):
+    doc_api.server.throttle_rate = 1.0
+    with GdeltDoc(base_url=doc_api.base_url) as gd:
+        with pytest.raises(RateLimitError):
+            gd.article_search(FILTERS)
+    assert doc_api.requests == 1
@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from conftest import make_articles
+from gdeltdoc import Filters, GdeltDoc
+from gdeltdoc.errors import RateLimitError
+from gdeltdoc.replay import THROTTLE_BODY, RecordingSession, ReplayServer, load_recordings, replay_key
+
+FILTERS = Filters(keyword="climate change", start_date="20250101000000", end_date="20250101080000")
+
+
+def test_replay_key_ignores_encoding_order_and_format():
+    key = replay_key('http://127.0.0.1/api/v2/doc/doc?query="climate change"&mode=artlist&format=json')
+    assert key == replay_key("http://other/api/v2/doc/doc?mode=artlist&query=%22climate+change%22")
+    assert key == replay_key('http://other/api/v2/doc/doc?query="climate   change"&mode=artlist')
+    assert key != replay_key('http://other/api/v2/doc/doc?query="climate change"&mode=timelinevol')
+
+
+def test_recorded_responses_are_replayed(doc_api, tmp_path):
+    doc_api.serve(FILTERS, {"articles": make_articles(3)})
+    other = FILTERS.replace(keyword="flood")
+    doc_api.serve(other, body=b'{"articles": [{"url": "https://example.com/\\x"}]}')
+
+    with GdeltDoc(base_url=doc_api.base_url, session=RecordingSession(str(tmp_path))) as gd:
+        recorded = gd.article_search(FILTERS)
+        gd.article_search(other)
+        assert gd.session.recorded == 2
+
+    # Malformed bodies are saved as they are
+    recordings = load_recordings(str(tmp_path))
+    assert b"\\x" in recordings[replay_key(f"?query={other.query_string}")][2]
+
+    with ReplayServer(str(tmp_path)) as server:
+        with GdeltDoc(base_url=server.base_url) as gd:
+            pd.testing.assert_frame_equal(gd.article_search(FILTERS), recorded)
+            assert gd.article_search(FILTERS.replace(keyword="wildfire")).empty
+        assert (server.stats["replayed"], server.stats["missing"]) == (1, 1)
+
+
+def test_throttled_recordings_are_left_out(tmp_path):
+    session = RecordingSession(str(tmp_path))
+    session.record(f"?query={FILTERS.query_string}", 200, "application/json", b'{"articles": []}')
+    session.record(f"?query={FILTERS.query_string}", 429, "text/plain", THROTTLE_BODY)
+
+    assert load_recordings(str(tmp_path)) == {
+        replay_key(f"?query={FILTERS.query_string}"): (200, "application/json", b'{"articles": []}')
+    }
+
+
+def test_errors_and_throttling():
+    with ReplayServer(error_rate=1.0) as server:
+        with GdeltDoc(base_url=server.base_url) as gd:
+            with pytest.raises(ValueError, match="non-successful"):
+                gd.article_search(FILTERS)
+        assert server.stats["errors"] == 1
+
+    with ReplayServer(throttle_rate=1.0) as server:
+        with GdeltDoc(base_url=server.base_url) as gd:
+            with pytest.raises(RateLimitError):
+                gd.article_search(FILTERS)
+        assert server.stats["throttled"] == 1
+
+
+def test_max_rps():
+    server = ReplayServer(max_rps=2)
+    statuses = [server.respond(f"?query={FILTERS.query_string}")[0] for _ in range(4)]
+    assert statuses == [200, 200, 429, 429]
+    assert server.stats["throttled"] == 2
+    server._server.server_close()
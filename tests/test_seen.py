@@ -0,0 +1,51 @@
+from scraping.seen import SeenIndex
+from scraping.store import ArticleStore
+from URLtextProcessor import URLTextProcessor
+
+
+def article(url, text="testo"):
+    return {"url": url, "title": "Titolo", "language": "it", "text": text}
+
+
+def test_index_finds_other_versions(tmp_path):
+    with SeenIndex(str(tmp_path / "seen.sqlite")) as index:
+        index.add(["https://www.example.com/news/1"], str(tmp_path / "raw.sqlite"))
+        found = index.lookup(["https://m.example.com/news/1?utm_source=x", "https://example.com/news/2"])
+        assert found == {"https://m.example.com/news/1?utm_source=x": str(tmp_path / "raw.sqlite")}
+        assert len(index) == 1
+
+
+def test_index_with_exact_urls(tmp_path):
+    with SeenIndex(str(tmp_path / "seen.sqlite"), url_key=None) as index:
+        index.add(["https://www.example.com/news/1"])
+        assert "https://www.example.com/news/1" in index
+        assert "https://example.com/news/1" not in index
+
+
+def test_store_finds_other_versions(tmp_path):
+    with ArticleStore(str(tmp_path / "raw.sqlite")) as store:
+        store.add([article("https://www.example.com/news/1")])
+        found = store.find_many(["https://example.com/news/1?fbclid=1", "https://example.com/news/2"])
+        assert found == {"https://example.com/news/1?fbclid=1": article("https://www.example.com/news/1")}
+
+
+def test_seen_variants_are_reused_not_refetched(tmp_path):
+    with URLTextProcessor(memory_file=str(tmp_path / "raw.json"), extract_workers=0, polite=False,
+                          seen_index=str(tmp_path / "seen.sqlite"), reuse_seen=True) as processor:
+        processor._save_links([article("https://example.com/news/1")])
+
+        rows = [{"url": "https://amp.example.com/news/1?utm_campaign=x"}, {"url": "https://example.com/news/2"}]
+        to_fetch, reused = processor._split_seen(rows)
+
+        assert to_fetch == [{"url": "https://example.com/news/2"}]
+        assert reused == [article("https://example.com/news/1")]
+        assert processor.skipped_fetches == 1
+        assert processor.fetch_and_process_single_url("https://m.example.com/news/1")["text"] == "testo"
+
+
+def test_seen_urls_are_skipped_without_reuse(tmp_path):
+    with URLTextProcessor(memory_file=str(tmp_path / "raw.json"), extract_workers=0, polite=False,
+                          seen_index=str(tmp_path / "seen.sqlite")) as processor:
+        processor._save_links([article("https://example.com/news/1")])
+        to_fetch, reused = processor._split_seen([{"url": "https://www.example.com/news/1"}])
+        assert (to_fetch, reused) == ([], [])
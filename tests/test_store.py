@@ -0,0 +1,116 @@
+import json
+import sqlite3
+import threading
+
+from scraping.store import ArticleStore, store_path_for
+from URLtextProcessor import URLTextProcessor
+
+
+def article(url, text="testo"):
+    return {"url": url, "title": "Titolo", "language": "it", "text": text}
+
+
+def test_other_versions_are_ignored_across_batches(tmp_path):
+    with ArticleStore(str(tmp_path / "raw.sqlite")) as store:
+        assert store.add([article("https://www.example.com/news/1")]) == 1
+        # Versione mobile, AMP e con tracciamento dello stesso articolo, in batch successivi
+        assert store.add([article("https://m.example.com/news/1/amp")]) == 0
+        assert store.add([article("https://example.com/news/1?utm_source=x"), article("https://example.com/news/2")]) == 1
+        assert [a["url"] for a in store.articles()] == ["https://www.example.com/news/1", "https://example.com/news/2"]
+
+
+def test_replace_updates_the_saved_version(tmp_path):
+    with ArticleStore(str(tmp_path / "raw.sqlite")) as store:
+        store.add([article("https://example.com/news/1", "vecchio")])
+        assert store.add([article("https://amp.example.com/news/1", "nuovo")], replace=True) == 1
+        assert store.articles() == [article("https://example.com/news/1", "nuovo")]
+
+
+def test_exact_urls_without_url_key(tmp_path):
+    with ArticleStore(str(tmp_path / "raw.sqlite"), url_key=None) as store:
+        assert store.add([article("https://example.com/news/1"), article("https://www.example.com/news/1")]) == 2
+
+
+def test_old_stores_get_url_keys(tmp_path):
+    path = str(tmp_path / "raw.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE articles (id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, title TEXT, "
+                 "language TEXT, text TEXT, saved_at REAL)")
+    # Due versioni dello stesso articolo salvate prima della chiave canonica
+    conn.executemany("INSERT INTO articles (url, text) VALUES (?, ?)",
+                     [("https://www.example.com/news/1", "a"), ("https://example.com/news/1?fbclid=1", "b")])
+    conn.commit()
+    conn.close()
+
+    with ArticleStore(path) as store:
+        assert len(store) == 2
+        assert store.add([article("https://m.example.com/news/1")]) == 0
+        assert store.add([article("https://example.com/news/1?fbclid=1", "c")], replace=True) == 1
+        assert [a["text"] for a in store.articles()] == ["a", "c"]
+
+    # La migrazione avviene una sola volta
+    with ArticleStore(path) as store:
+        assert len(store) == 2
+
+
+def test_processor_saves_one_version_per_article(tmp_path):
+    with URLTextProcessor(memory_file=str(tmp_path / "raw.json"), extract_workers=0, polite=False) as processor:
+        assert processor._save_links([article("https://example.com/news/1")]) == 1
+        assert processor._save_links([article("https://www.example.com/news/1/"), article("https://example.com/news/2")]) == 1
+        assert len(processor.store) == 2
+
+
+def test_lookups(tmp_path):
+    with ArticleStore(str(tmp_path / "raw.sqlite")) as store:
+        store.add([article(f"https://example.com/news/{i}") for i in range(3)])
+        assert store.has("https://example.com/news/1") and not store.has("https://example.com/news/9")
+        assert store.known(["https://example.com/news/0", "https://example.com/news/9"]) == {"https://example.com/news/0"}
+        assert list(store.get_many(["https://example.com/news/2", "https://example.com/news/9"])) == ["https://example.com/news/2"]
+        assert len(store) == 3
+
+
+def test_articles_keep_insertion_order_across_read_batches(tmp_path):
+    urls = [f"https://example.com/news/{i}" for i in range(25)]
+    with ArticleStore(str(tmp_path / "raw.sqlite")) as store:
+        for i in range(0, 25, 10):
+            store.add(article(url) for url in urls[i:i + 10])
+        assert [a["url"] for a in store.iter_articles(batch_size=7)] == urls
+
+
+def test_legacy_json_is_imported_once_and_exported_back(tmp_path):
+    legacy = tmp_path / "raw.json"
+    legacy.write_text(json.dumps([article("https://example.com/news/1"), {"title": "senza url"}]), encoding="utf-8")
+
+    with ArticleStore(str(tmp_path / "raw.sqlite"), legacy_json=str(legacy)) as store:
+        assert store.articles() == [article("https://example.com/news/1")]
+        store.add([article("https://example.com/news/2")])
+        store.export_json(str(legacy))
+
+    assert [a["url"] for a in json.loads(legacy.read_text(encoding="utf-8"))] == [
+        "https://example.com/news/1", "https://example.com/news/2"]
+    with ArticleStore(str(tmp_path / "raw.sqlite"), legacy_json=str(legacy)) as store:
+        assert len(store) == 2
+
+
+def test_concurrent_writers(tmp_path):
+    path = str(tmp_path / "raw.sqlite")
+    stores = [ArticleStore(path) for _ in range(4)]
+
+    def write(store, worker):
+        for i in range(20):
+            store.add([article(f"https://example.com/{worker}/{i}"), article(f"https://example.com/shared/{i}")])
+
+    threads = [threading.Thread(target=write, args=(store, worker)) for worker, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(stores[0]) == 4 * 20 + 20
+    for store in stores:
+        store.close()
+
+
+def test_store_path_for():
+    assert store_path_for("raw_text_data/raw.json") == "raw_text_data/raw.sqlite"
+    assert store_path_for("raw_text_data/raw.sqlite") == "raw_text_data/raw.sqlite"
@@ -0,0 +1,41 @@
+from URLtextProcessor import URLTextProcessor
+
+
+def test_duplicates_are_processed_once(tmp_path, site):
+    urls = [site.url("/news/1"), site.url("/news/1?utm_source=x"), site.url("/news/2"), site.url("/news/1")]
+    with URLTextProcessor(memory_file=str(tmp_path / "raw.json"), extract_workers=0, polite=False) as processor:
+        articles = list(processor.stream_articles(iter(urls), max_in_flight=2))
+
+    assert sorted(article["url"] for article in articles) == [site.url("/news/1"), site.url("/news/2")]
+    assert sorted(site.requests) == ["/news/1", "/news/2"]
+
+
+def test_stream_is_bounded_and_can_be_closed(tmp_path, site):
+    pulled = []
+
+    def urls():
+        for i in range(600):
+            pulled.append(i)
+            yield site.url(f"/news/{i}")
+
+    with URLTextProcessor(memory_file=str(tmp_path / "raw.json"), extract_workers=0, polite=False) as processor:
+        stream = processor.stream_articles(urls(), max_in_flight=4, save=True)
+        first = [next(stream) for _ in range(3)]
+        stream.close()
+
+        # Oltre agli articoli letti, al più max_in_flight righe in lavorazione e max_in_flight articoli in coda
+        assert len(site.requests) <= 3 + 2 * 4
+        assert len(pulled) < 600
+        # Chiudendo lo stream gli articoli già restituiti vengono salvati
+        assert processor.store.known([article["url"] for article in first]) == {article["url"] for article in first}
+
+
+def test_saved_batches(tmp_path, site):
+    batches = []
+    urls = [site.url(f"/news/{i}") for i in range(5)]
+    with URLTextProcessor(memory_file=str(tmp_path / "raw.json"), extract_workers=0, polite=False) as processor:
+        articles = list(processor.stream_articles(urls, save=True, on_saved=batches.append))
+        assert len(processor.store) == 5
+
+    assert len(articles) == 5
+    assert sorted(article["url"] for batch in batches for article in batch) == sorted(urls)
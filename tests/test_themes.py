@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from gdeltdoc import Filters
+from gdeltdoc.themes import ThemeRegistry
+
+LOOKUP = "ELECTION\t900\nTAX_FNCACT_POLITICIANS\t50\nTAX_FNCACT_MAYOR\t70\nWB_2433_CONFLICT\t10\nWB_678_DIGITAL\t30\nPROTEST\t400\n"
+
+
+@pytest.fixture
+def lookup(tmp_path):
+    path = tmp_path / "LOOKUP-GKGTHEMES.TXT"
+    path.write_text(LOOKUP + "ELECTION\t5\nEMPTY\n", encoding="utf-8")
+    return str(path)
+
+
+def test_lookup_is_parsed(lookup):
+    registry = ThemeRegistry.from_lookup(lookup)
+    assert len(registry) == 7
+    assert registry.count("ELECTION") == 900 and registry.count("EMPTY") == 0
+    assert "PROTEST" in registry and "PROTESTS" not in registry
+    assert registry.unknown(["PROTEST", "NOPE"]) == ["NOPE"]
+
+
+def test_search(lookup):
+    registry = ThemeRegistry.from_lookup(lookup)
+    assert registry.search("TAX_FNCACT_*") == ["TAX_FNCACT_MAYOR", "TAX_FNCACT_POLITICIANS"]
+    assert registry.search("tax_fnc", by_volume=False, limit=1) == ["TAX_FNCACT_MAYOR"]
+    assert registry.search("WB_", limit=1) == ["WB_678_DIGITAL"]
+    assert registry.search("WB_9") == [] and registry.search("ZZZ") == []
+    assert registry.top(2) == ["ELECTION", "PROTEST"]
+    assert registry.families() == {"ELECTION": 1, "EMPTY": 1, "PROTEST": 1, "TAX": 2, "WB": 2}
+
+
+def test_index_round_trip(lookup):
+    registry = ThemeRegistry.from_lookup(lookup)
+    registry.write_index(lookup + ".idx", lookup)
+
+    loaded = ThemeRegistry.read_index(lookup + ".idx", lookup)
+    assert loaded.names == registry.names and loaded.counts == registry.counts
+
+
+def test_loading_never_writes_the_index(lookup):
+    registry = ThemeRegistry.load(lookup)
+    assert len(registry) == 7 and registry.path == lookup
+    assert os.listdir(os.path.dirname(lookup)) == ["LOOKUP-GKGTHEMES.TXT"]
+
+
+def test_stale_index_is_ignored(lookup):
+    ThemeRegistry.from_lookup(lookup).write_index(lookup + ".idx", lookup)
+    with open(lookup, "a", encoding="utf-8") as f:
+        f.write("NEW_THEME\t1\n")
+
+    assert ThemeRegistry.read_index(lookup + ".idx", lookup) is None
+    assert "NEW_THEME" in ThemeRegistry.load(lookup)
+
+
+def test_touched_lookup_falls_back_to_the_hash(lookup, monkeypatch):
+    ThemeRegistry.from_lookup(lookup).write_index(lookup + ".idx", lookup)
+    hashed = []
+    monkeypatch.setattr("gdeltdoc.themes._file_sha1", lambda path: hashed.append(path) or "")
+
+    # Same size and modification time: the file isn't hashed
+    assert ThemeRegistry.read_index(lookup + ".idx", lookup) is not None and not hashed
+
+    stat = os.stat(lookup)
+    os.utime(lookup, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert ThemeRegistry.read_index(lookup + ".idx", lookup) is None and hashed == [lookup]
+
+
+def test_filters_validate_themes_on_request(lookup):
+    registry = ThemeRegistry.from_lookup(lookup)
+    filters = Filters(timespan="1d", theme=["ELECTION", "NOT_A_THEME"])
+
+    with pytest.raises(ValueError, match="NOT_A_THEME"):
+        filters.validate_themes(registry)
+    filters.replace(theme="ELECTION").validate_themes(registry)
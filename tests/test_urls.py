@@ -0,0 +1,60 @@
+import pytest
+
+from scraping.urls import URLNormalizer, canonical_url, duplicated_urls
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://www.example.com/news/story", "https://example.com/news/story"),
+    ("http://example.com/news/story", "https://example.com/news/story"),
+    ("https://EXAMPLE.com:443/news/story", "https://example.com/news/story"),
+    ("https://m.www.example.com/news/story", "https://example.com/news/story"),
+    ("https://amp.example.com/news/story", "https://example.com/news/story"),
+    ("https://example.com/news/story/", "https://example.com/news/story"),
+    ("https://example.com/news/story.html", "https://example.com/news/story"),
+    ("https://example.com/news/story/amp", "https://example.com/news/story"),
+    ("https://example.com/amp/news/story", "https://example.com/news/story"),
+    ("https://example.com/news/story.amp.html", "https://example.com/news/story"),
+    ("https://example.com/news/story_amp.html", "https://example.com/news/story"),
+    ("https://example.com/news/story?amp=1", "https://example.com/news/story"),
+    ("https://example.com/news/story?outputType=amp", "https://example.com/news/story"),
+    ("https://example.com/news/story?utm_source=x&fbclid=y&ref=z", "https://example.com/news/story"),
+    ("https://example.com/news?b=2&a=1", "https://example.com/news?a=1&b=2"),
+    ("https://user@example.com/news/story", "https://example.com/news/story"),
+])
+def test_canonical_rules(url, expected):
+    assert URLNormalizer().canonical(url) == expected
+
+
+def test_canonical_keeps_short_hosts_and_invalid_urls():
+    normalizer = URLNormalizer()
+    assert normalizer.canonical("https://m.it/news") == "https://m.it/news"
+    assert normalizer.canonical("not a url") == "not a url"
+    assert normalizer.canonical(None) is None
+    # Le pagine che contengono "amp" nel nome non sono versioni AMP
+    assert normalizer.canonical("https://example.com/camping/lamp") == "https://example.com/camping/lamp"
+
+
+def test_canonical_options():
+    url = "http://www.example.com/news/story.html?id=3&utm_source=x&page=2"
+    assert URLNormalizer(keep_params={"id"}).canonical(url) == "https://example.com/news/story?id=3"
+    assert URLNormalizer(ignore_scheme=False).canonical(url).startswith("http://")
+    assert URLNormalizer(host_prefixes=()).canonical(url).startswith("https://www.example.com/")
+    assert URLNormalizer(path_suffixes=()).canonical(url).startswith("https://example.com/news/story.html?")
+    assert URLNormalizer(sort_query=False).canonical(url).endswith("?id=3&page=2")
+
+
+def test_cached_and_uncached_keys_match():
+    url = "https://www.example.com/a/amp/?utm_medium=social"
+    assert URLNormalizer(cache_size=0)(url) == URLNormalizer()(url) == canonical_url(url)
+
+
+def test_duplicated_urls_with_aliases():
+    urls = [
+        "https://www.example.com/a",
+        "http://example.com/a/?utm_source=x",
+        "https://example.com/b",
+        "https://other.com/c",
+    ]
+    aliases = [None, None, "https://example.com/b/amp", "https://m.example.com/b"]
+    assert duplicated_urls(urls) == [False, True, False, False]
+    assert duplicated_urls(urls, aliases) == [False, True, False, True]